@@ -1,22 +1,113 @@
 from __future__ import annotations
 
+from concurrent.futures import Future, ProcessPoolExecutor
+from html import escape
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Callable, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+import json
+import multiprocessing
+import os
 import sqlite3
-import io
+import sys
+import tempfile
+import threading
+import time
 
+import numpy as np
 import pandas as pd
-from fastapi import FastAPI, UploadFile, File, Query
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query
 from fastapi.responses import HTMLResponse
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR / "src") not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from jit_rca import analysis_views, colstore, columnar, db, jit_engine, scenarios, shards, sql_engine  # noqa: E402
+from jit_rca.cache import ResultCache  # noqa: E402
+from jit_rca.ingest import (  # noqa: E402
+    DAY_COLUMN,
+    DICT_COLUMNS,
+    INGEST_MODES,
+    MINUTE_COLUMNS,
+    add_time_minutes,
+    apply_dtypes,
+    decode_dims,
+    ensure_indexes,
+    init_dims,
+)
+from jit_rca.jobs import (  # noqa: E402
+    DATASET_META_SQL,
+    JOBS_SCHEMA_SQL,
+    create_job,
+    dataset_version,
+    get_job,
+    list_jobs,
+    run_ingest_job,
+    update_job,
+)
+from jit_rca.rollups import read_rollup, refresh_rollups, rollups_outdated  # noqa: E402
+from jit_rca.stop_facts import read_stops, refresh_stops, stops_outdated  # noqa: E402
+from jit_rca.timekernel import format_hhmm, parse_minutes  # noqa: E402
+
 app = FastAPI(title="JIT KPI RCA")
 
 # ------------------------------------------------------------
 # Pad naar SQLite database
 # ------------------------------------------------------------
-ROOT_DIR = Path(__file__).resolve().parent.parent
 DB_PATH = ROOT_DIR / "jit.sqlite"
 
+# Opslag voor load_orders: "sqlite" (standaard), "parquet" (kolomgewijs, gepartitioneerd per dag/RFX)
+# of "mmap" (memory-mapped kolommen, gedeeld door alle API-workers)
+ORDERS_BACKEND = os.environ.get("JIT_ORDERS_BACKEND", "sqlite").lower()
+PARQUET_DIR = ROOT_DIR / "data" / "orders_parquet"
+MMAP_DIR = ROOT_DIR / "data" / "orders_mmap"
+
+# Maandshards (data/orders_shards): jit.sqlite houdt de laatste JIT_HOT_MONTHS maanden (0 = geen shards);
+# shards ouder dan JIT_RETENTION_MONTHS maanden gaan gecomprimeerd naar data/orders_archive (0 = nooit)
+HOT_MONTHS = int(os.environ.get("JIT_HOT_MONTHS", str(shards.HOT_MONTHS)))
+RETENTION_MONTHS = int(os.environ.get("JIT_RETENTION_MONTHS", str(shards.RETENTION_MONTHS)))
+
+# Aggregaties: "pandas" (standaard) of "duckdb" (SQL op de Parquet dataset, vereist de parquet backend)
+SQL_ENGINE = os.environ.get("JIT_SQL_ENGINE", "pandas").lower()
+
+# Eigen JIT scenario's naast S1/S2 (JSON lijst, zie jit_rca.scenarios.load_scenarios)
+SCENARIOS_FILE = os.environ.get("JIT_SCENARIOS", "")
+if SCENARIOS_FILE:
+    scenarios.load_scenarios(SCENARIOS_FILE)
+
+# Uploads worden in blokken van 1 MB naar schijf gespoold
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Geheugenbudget (MB) voor de cache van geladen/afgeleide DataFrames per API-worker
+CACHE_MB = int(os.environ.get("JIT_CACHE_MB", "256"))
+RESULT_CACHE = ResultCache(max_bytes=CACHE_MB * 1024 * 1024)
+
+# Aantal parallelle ingest-processen (parsen/normaliseren/schrijven)
+INGEST_WORKERS = int(os.environ.get("JIT_INGEST_WORKERS", "2"))
+
+_ingest_pool: Optional[ProcessPoolExecutor] = None
+_ingest_pool_lock = threading.Lock()
+
+def _get_ingest_pool() -> ProcessPoolExecutor:
+    """Process pool wordt pas bij de eerste upload gestart (spawn: geen fork van de server)."""
+    global _ingest_pool
+    with _ingest_pool_lock:
+        if _ingest_pool is None:
+            _ingest_pool = ProcessPoolExecutor(
+                max_workers=INGEST_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _ingest_pool
+
+@app.on_event("shutdown")
+def _shutdown_ingest_pool() -> None:
+    global _ingest_pool
+    with _ingest_pool_lock:
+        if _ingest_pool is not None:
+            _ingest_pool.shutdown(wait=False, cancel_futures=True)
+            _ingest_pool = None
+
 # ------------------------------------------------------------
 # Helper: basis HTML layout met navigatie
 # ------------------------------------------------------------
@@ -153,12 +244,14 @@ def _layout(title: str, body_html: str) -> HTMLResponse:
           <div class="nav-links">
             <a href="/">🏠 Home</a>
             <a href="/upload">📁 Upload</a>
+            <a href="/jobs_html">⏳ Jobs</a>
             <a href="/dataset_html">📊 Dataset</a>
             <a href="/routes_html">🚛 Routes &amp; JIT</a>
             <a href="/waits_html">⏱ Wachttijden</a>
             <a href="/rca_delay_drivers_html">🧩 RCA</a>
             <a href="/jit_outside_daily_html">⛔ Outside JIT</a>
             <a href="/outside_jit_daily_html">📦 Buckets Outside</a>
+            <a href="/jit_tolerance_sweep_html">📈 Tolerantie</a>
             <a href="/transport_manager_html">🧭 Transport</a>
           </div>
         </div>
@@ -172,138 +265,409 @@ def _layout(title: str, body_html: str) -> HTMLResponse:
 # ------------------------------------------------------------
 # Database helpers
 # ------------------------------------------------------------
-def ensure_db() -> None:
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS orders (
-                date_dos TEXT,
-                cnr_tour TEXT,
-                cnr_cust TEXT,
-                "RFX Activity" TEXT,
-                "RFX Year" TEXT,
-                "RFX Preperation" TEXT,
-                nm_short_unload TEXT,
-                "Win FROM" TEXT,
-                "Win UNTIL" TEXT,
-                Planned TEXT,
-                P_Depart TEXT,
-                DurationP REAL,
-                Actual TEXT,
-                A_Depart TEXT,
-                DurationA REAL
-            )
-            """
+def _create_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS orders (
+            date_dos TEXT,
+            cnr_tour INTEGER,
+            cnr_cust TEXT,
+            "RFX Activity" INTEGER,
+            "RFX Year" INTEGER,
+            "RFX Preperation" TEXT,
+            nm_short_unload TEXT,
+            "Win FROM" TEXT,
+            "Win UNTIL" TEXT,
+            Planned TEXT,
+            P_Depart TEXT,
+            DurationP REAL,
+            Actual TEXT,
+            A_Depart TEXT,
+            DurationA REAL,
+            win_from_min INTEGER,
+            win_until_min INTEGER,
+            planned_min INTEGER,
+            actual_min INTEGER,
+            p_depart_min INTEGER,
+            a_depart_min INTEGER,
+            day_num INTEGER,
+            store_id INTEGER,
+            cust_id INTEGER
         )
-        conn.commit()
-    finally:
-        conn.close()
+        """
+    )
+    init_dims(conn)
+    if stops_outdated(conn):
+        # Databases van vóór (deze versie van) de stops tabel: één keer volledig opbouwen
+        refresh_stops(conn, None)
+        refresh_rollups(conn, None)
+    elif rollups_outdated(conn):
+        refresh_rollups(conn, None)
+    conn.execute(JOBS_SCHEMA_SQL)
+    conn.execute(DATASET_META_SQL)
+    # Databases van vóór de automatische indexen
+    ensure_indexes(conn, analyze=False)
 
-def load_orders(
+def ensure_db() -> None:
+    """Schema + WAL: één keer per proces (bij startup), daarna een no-op."""
+    db.setup(DB_PATH, _create_schema)
+
+@app.on_event("startup")
+def _startup_db() -> None:
+    ensure_db()
+
+@app.on_event("shutdown")
+def _shutdown_db() -> None:
+    db.close_pool(DB_PATH)
+
+def _orders_where(
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
     rfx_activity: Optional[str] = None,
     cnr_tour: Optional[str] = None,
-) -> pd.DataFrame:
-    ensure_db()
-    if not DB_PATH.exists():
-        return pd.DataFrame()
-
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        where = []
-        params: list = []
+) -> Tuple[str, list]:
+    """WHERE-clausule + parameters voor de filters van load_orders."""
+    where = []
+    params: list = []
+    if date_from and date_from == date_to:
+        # één dag: gelijkheid, zodat (date_dos, cnr_tour) volledig bruikbaar is
+        where.append("date_dos = ?")
+        params.append(date_from)
+    else:
         if date_from:
             where.append("date_dos >= ?")
             params.append(date_from)
         if date_to:
             where.append("date_dos <= ?")
             params.append(date_to)
-        if rfx_activity:
-            where.append('"RFX Activity" = ?')
-            params.append(rfx_activity)
-        if cnr_tour:
-            where.append("cnr_tour = ?")
-            params.append(str(cnr_tour))
-
-        where_sql = " WHERE " + " AND ".join(where) if where else ""
-        sql = "SELECT * FROM orders" + where_sql
-        df = pd.read_sql_query(sql, conn, params=params)
-    finally:
-        conn.close()
+    if rfx_activity:
+        where.append('"RFX Activity" = ?')
+        params.append(rfx_activity)
+    if cnr_tour:
+        where.append("cnr_tour = ?")
+        params.append(str(cnr_tour))
+    return (" WHERE " + " AND ".join(where) if where else ""), params
+
+def _projection(columns: Sequence[str]) -> List[str]:
+    """
+    Gevraagde kolommen + wat nodig is om ze te gebruiken: de minutenkolom en
+    day_num bij elke tijdkolom (of date_dos om ze af te leiden bij oude data).
+    """
+    wanted = list(dict.fromkeys(columns))
+    for col in list(wanted):
+        if col in MINUTE_COLUMNS:
+            wanted += [MINUTE_COLUMNS[col], DAY_COLUMN, "date_dos"]
+    return list(dict.fromkeys(wanted))
+
+def _dataset_version() -> int:
+    ensure_db()
+    return dataset_version(db.reader(DB_PATH))
+
+def _filter_key(date_from, date_to, rfx_activity, cnr_tour) -> tuple:
+    return tuple(str(v) if v not in (None, "") else None for v in (date_from, date_to, rfx_activity, cnr_tour))
+
+def load_orders(
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    rfx_activity: Optional[str] = None,
+    cnr_tour: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    Orders volgens de filters. `columns` = enkel deze kolommen lezen
+    (None = alle kolommen); elk endpoint geeft zijn eigen kolomlijst mee.
+
+    Resultaten worden per datasetversie gecachet; een entry met dezelfde
+    filters en (een superset van) de gevraagde kolommen wordt hergebruikt.
+    """
+    wanted = _projection(columns) if columns is not None else None
+    if _use_mmap():
+        # Slicen van de gedeelde mapping is goedkoop: geen kopie per worker in de cache
+        return _load_orders_uncached(date_from, date_to, rfx_activity, cnr_tour, wanted)
+    version = _dataset_version()
+    filters = _filter_key(date_from, date_to, rfx_activity, cnr_tour)
 
+    def covers(key: tuple) -> bool:
+        return key[:2] == ("orders", filters) and (key[2] is None or (wanted is not None and set(wanted) <= key[2]))
+
+    hit = RESULT_CACHE.find(version, covers)
+    if hit is not None:
+        return hit.copy() if wanted is None else hit[[c for c in hit.columns if c in wanted]].copy()
+
+    df = _load_orders_uncached(date_from, date_to, rfx_activity, cnr_tour, wanted)
+    RESULT_CACHE.put(version, ("orders", filters, frozenset(wanted) if wanted is not None else None), df)
+    return df.copy()
+
+def load_stops(
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    rfx_activity: Optional[str] = None,
+    cnr_tour: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Stop-level feiten (tabel `stops`, bij ingest opgebouwd) volgens dezelfde filters als load_orders.
+    Enkel leveringen: stops zonder route of leverpunt (is_delivery = 0) tellen in de rollups
+    enkel als order en verschijnen op geen enkele stop-pagina.
+    """
+    version = _dataset_version()
+    key = ("stops", _filter_key(date_from, date_to, rfx_activity, cnr_tour))
+    return RESULT_CACHE.get_or_compute(
+        version,
+        key,
+        lambda: read_stops(db.reader(DB_PATH), date_from, date_to, rfx_activity, cnr_tour, deliveries_only=True),
+    )
+
+def load_kpi(
+    by: List[str],
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    rfx_activity: Optional[str] = None,
+    table: str = "kpi_day",
+) -> pd.DataFrame:
+    """Opgetelde KPI tellers uit de rollup tabellen (kpi_day/kpi_week/kpi_month, kpi_jit_day/kpi_wait_day) per `by`."""
+    version = _dataset_version()
+    key = ("kpi", table, tuple(by), _filter_key(date_from, date_to, rfx_activity, None))
+    return RESULT_CACHE.get_or_compute(
+        version, key, lambda: read_rollup(db.reader(DB_PATH), table, date_from, date_to, rfx_activity, by)
+    )
+
+def _use_mmap() -> bool:
+    return ORDERS_BACKEND == "mmap" and colstore.has_store(MMAP_DIR)
+
+def _use_sql_engine() -> bool:
+    return SQL_ENGINE == "duckdb" and ORDERS_BACKEND == "parquet" and sql_engine.supports(PARQUET_DIR)
+
+def load_aggregate(name: str, compute: Callable[[], pd.DataFrame], *filters: object) -> pd.DataFrame:
+    """Resultaat van een sql_engine aggregatie, gecachet per datasetversie en filters."""
+    key = ("sql", name, tuple(str(v) if v not in (None, "") else None for v in filters))
+    return RESULT_CACHE.get_or_compute(_dataset_version(), key, compute)
+
+def _qcol(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _orders_select(source: sqlite3.Connection, out_columns: Sequence[str]) -> str:
+    """SELECT-lijst voor `out_columns` in deze bron (jit.sqlite of een maandshard)."""
+    # Winkel/klant enkel als code lezen; decode_dims maakt er categoricals van
+    available = [r[1] for r in source.execute('PRAGMA table_info("orders")')]
+    cols = []
+    for c in out_columns:
+        code = DICT_COLUMNS[c][1] if c in DICT_COLUMNS else None
+        cols.append(code if code in available else c)
+    return ", ".join(_qcol(c) for c in dict.fromkeys(cols) if c in available)
+
+def _load_orders_uncached(
+    date_from: Optional[str],
+    date_to: Optional[str],
+    rfx_activity: Optional[str],
+    cnr_tour: Optional[str],
+    wanted: Optional[List[str]],
+) -> pd.DataFrame:
+
+    if ORDERS_BACKEND == "parquet" and columnar.has_dataset(PARQUET_DIR):
+        df = columnar.read_orders(PARQUET_DIR, date_from, date_to, rfx_activity, cnr_tour, columns=wanted)
+        return _clean_orders(df)
+    if _use_mmap():
+        df = colstore.read_orders(MMAP_DIR, date_from, date_to, rfx_activity, cnr_tour, columns=wanted)
+        return _clean_orders(df)
+
+    ensure_db()
+    conn = db.reader(DB_PATH)
+    where_sql, params = _orders_where(date_from, date_to, rfx_activity, cnr_tour)
+
+    table_columns = [r[1] for r in conn.execute('PRAGMA table_info("orders")')]
+    out_columns = [c for c in table_columns if wanted is None or c in wanted]
+
+    def read(source: sqlite3.Connection) -> pd.DataFrame:
+        select = _orders_select(source, out_columns)
+        return pd.read_sql_query(f"SELECT {select} FROM orders" + where_sql, source, params=params)
+
+    # Enkel de maandshards die de periode overlappen; recente periodes lezen er geen
+    frames = [*shards.read_shards(conn, read, date_from, date_to), read(conn)]
+    frames = [f for f in frames if not f.empty] or frames[-1:]
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    df = decode_dims(conn, df)
+
+    return _clean_orders(df[[c for c in out_columns if c in df.columns]])
+
+def _clean_orders(df: pd.DataFrame) -> pd.DataFrame:
+    """Zelfde kolomtypes, ongeacht de backend waaruit gelezen werd."""
     if df.empty:
         return df
 
-    if "cnr_tour" in df.columns:
-        df["cnr_tour"] = df["cnr_tour"].astype(str).str.replace(r"\.0$", "", regex=True)
+    # Codekolommen zijn intern (Parquet bevat zowel tekst als code)
+    df = df.drop(columns=[code for _, code in DICT_COLUMNS.values()], errors="ignore")
+    df = apply_dtypes(df)
 
-    for col in ["RFX Activity", "RFX Year", "RFX Preperation", "cnr_cust"]:
-        if col in df.columns:
-            df[col] = df[col].astype(str)
+    # Data van vóór de minutenkolommen: eenmalig afleiden bij het laden
+    missing = [c for t, c in MINUTE_COLUMNS.items() if t in df.columns and c not in df.columns]
+    has_times = any(t in df.columns for t in MINUTE_COLUMNS)
+    if missing or (has_times and DAY_COLUMN not in df.columns):
+        df = add_time_minutes(df)
 
     return df
 
+# Dataset viewer: keyset paginatie op (date_dos, cnr_tour, rowid) = idx_orders_date_tour
+PAGE_KEY = ["date_dos", "cnr_tour"]
+PAGE_ROWS = 500
+MAX_PAGE_ROWS = 5000
+
+def _keyset_where(keys: Sequence[str], cursor: Sequence[object], after: bool) -> Tuple[str, list]:
+    """
+    Voorwaarde "rij komt na (after) / vóór de cursor" in de volgorde
+    ORDER BY keys..., rowid (oplopend; SQLite zet NULL eerst).
+    cursor = [waarde per sleutel..., rowid].
+    """
+    *values, rowid = cursor
+    cond, params = ("rowid > ?" if after else "rowid < ?"), [rowid]
+    for key, value in reversed(list(zip(keys, values))):
+        col = _qcol(key)
+        if after:
+            past, past_params = (f"{col} > ?", [value]) if value is not None else (f"{col} IS NOT NULL", [])
+        else:
+            past, past_params = (f"({col} < ? OR {col} IS NULL)", [value]) if value is not None else ("0", [])
+        cond = f"({past} OR ({col} IS ? AND {cond}))"
+        params = [*past_params, value, *params]
+    # Extra grens op de eerste sleutel: zo wordt de index een range scan
+    first, value = _qcol(keys[0]), values[0]
+    if value is not None:
+        bound = f"{first} >= ?" if after else f"({first} <= ? OR {first} IS NULL)"
+        cond, params = f"{bound} AND {cond}", [value, *params]
+    return cond, params
+
+def load_orders_page(
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    rfx_activity: Optional[str] = None,
+    cnr_tour: Optional[str] = None,
+    sort: Optional[str] = None,
+    descending: bool = False,
+    after: Optional[Sequence[object]] = None,
+    before: Optional[Sequence[object]] = None,
+    limit: int = PAGE_ROWS,
+) -> Tuple[pd.DataFrame, Optional[list], Optional[list], bool]:
+    """
+    Eén pagina orders met LIMIT in de query (altijd uit SQLite, ongeacht de backend).
+
+    Volgorde = `sort` (optioneel), date_dos, cnr_tour, rowid; `after`/`before` zijn
+    de cursors van de vorige pagina. Retourneert (pagina, cursor eerste rij,
+    cursor laatste rij, meer rijen in de bladerrichting). Met de standaardvolgorde
+    en de datumfilters leest elke bron enkel de rijen van de pagina via de index.
+    """
+    keys = list(dict.fromkeys([*([sort] if sort else []), *PAGE_KEY]))
+    cursor = before if before is not None else after
+    # Oplopend in SQLite = "na de cursor"; bij aflopend sorteren omgekeerd
+    forward = before is None
+    query_after = forward != descending
+    direction = "ASC" if query_after else "DESC"
+
+    ensure_db()
+    conn = db.reader(DB_PATH)
+    where_sql, params = _orders_where(date_from, date_to, rfx_activity, cnr_tour)
+    if cursor is not None:
+        cond, cond_params = _keyset_where(keys, cursor, query_after)
+        where_sql = (where_sql + " AND " if where_sql else " WHERE ") + cond
+        params = [*params, *cond_params]
+    order_sql = ", ".join(f"{_qcol(k)} {direction}" for k in [*keys, "rowid"])
+
+    table_columns = [r[1] for r in conn.execute('PRAGMA table_info("orders")')]
+    out_columns = [c for c in table_columns if c not in keys]
+
+    def read(source: sqlite3.Connection) -> pd.DataFrame:
+        select = _orders_select(source, out_columns)
+        key_sql = ", ".join(_qcol(k) for k in keys)
+        return pd.read_sql_query(
+            f"SELECT {key_sql}, rowid AS _rowid{', ' + select if select else ''} FROM orders"
+            f"{where_sql} ORDER BY {order_sql} LIMIT ?",
+            source,
+            params=[*params, limit + 1],
+        )
+
+    # Maandshards vóór/na de cursordatum bevatten geen rijen van deze pagina
+    lo, hi = date_from, date_to
+    if cursor is not None and keys[0] == "date_dos" and cursor[0] is not None:
+        if query_after:
+            lo = max(lo or "", str(cursor[0]))
+        else:
+            hi = min(hi, str(cursor[0])) if hi else str(cursor[0])
+    frames = [*shards.read_shards(conn, read, lo, hi), read(conn)]
+    frames = [f for f in frames if not f.empty] or frames[-1:]
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if len(frames) > 1:
+        df = df.sort_values(
+            [*keys, "_rowid"], ascending=query_after, na_position="first" if query_after else "last", kind="stable"
+        )
+    more = len(df) > limit
+    df = df.head(limit)
+    if not forward:
+        df = df.iloc[::-1]
+    df = df.reset_index(drop=True)
+
+    def cursor_of(i: int) -> list:
+        row = df[[*keys, "_rowid"]].iloc[i]
+        return [None if pd.isna(v) else v.item() if isinstance(v, np.generic) else v for v in row]
+
+    first = cursor_of(0) if len(df) else None
+    last = cursor_of(len(df) - 1) if len(df) else None
+    df = decode_dims(conn, df.drop(columns=["_rowid"]))
+    df = _clean_orders(df[[c for c in table_columns if c in df.columns]])
+    return df, first, last, more
+
 # ------------------------------------------------------------
 # Tijdhelpers & JIT berekening
 # ------------------------------------------------------------
-def _combine_datetime(df: pd.DataFrame, date_col: str, time_col: str) -> pd.Series:
-    """
-    Combineer datum + tijd tot datetime.
-    Ondersteunt HH:MM én HH:MM:SS. Verwacht date_dos als YYYY-MM-DD.
-    """
-    date_str = df[date_col].astype(str)
-    time_str = df[time_col].astype(str)
-
-    s = date_str + " " + time_str
-    dt = pd.to_datetime(s, format="%Y-%m-%d %H:%M", errors="coerce")
-
-    mask = dt.isna() & time_str.notna()
-    if mask.any():
-        s2 = date_str[mask] + " " + time_str[mask]
-        dt2 = pd.to_datetime(s2, format="%Y-%m-%d %H:%M:%S", errors="coerce")
-        dt.loc[mask] = dt2
-
-    return dt
-
-def _fmt_hhmm(x: object) -> str:
-    """Toon altijd short time HH:MM (als het op tijd lijkt)."""
-    if x is None or (isinstance(x, float) and pd.isna(x)):
-        return ""
-    s = str(x).strip()
-    if s.lower() in ("nan", "none", ""):
-        return ""
-    if len(s) >= 5 and s[2] == ":":
-        return s[:5]
-    t = pd.to_datetime(s, errors="coerce")
-    if pd.isna(t):
-        return s
-    return t.strftime("%H:%M")
+def _abs_minutes(df: pd.DataFrame, time_col: str) -> pd.Series:
+    """
+    Tijdstip als minuten sinds 1970-01-01 (day_num * 1440 + minuten sinds middernacht),
+    rechtstreeks uit de kolommen die bij ingest berekend werden. Ontbreekt = NaN.
+    """
+    mcol = MINUTE_COLUMNS[time_col]
+    if mcol not in df.columns or DAY_COLUMN not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return df[DAY_COLUMN].astype(float) * 1440.0 + df[mcol].astype(float)
+
+def _fmt_at(at: pd.Series) -> pd.Series:
+    """Absolute minuten (stops tabel) -> HH:MM, leeg als de tijd ontbreekt."""
+    return pd.Series(format_hhmm(at), index=at.index)
+
+def _fmt_hhmm_col(values: pd.Series) -> pd.Series:
+    """
+    Tijdkolom -> short time HH:MM in één keer (timekernel). Leeg/NaN -> "";
+    tekst die niet als tijd te lezen is blijft ongewijzigd.
+    """
+    s = values.astype(object)
+    txt = s.astype(str).str.strip()
+    empty = s.isna().to_numpy() | txt.str.lower().isin(["nan", "none", ""]).to_numpy()
+    minutes = parse_minutes(txt.where(~empty))
+    out = np.where(np.isnan(minutes), txt.to_numpy(dtype=object), format_hhmm(minutes))
+    out[empty] = ""
+    return pd.Series(out, index=values.index, dtype=object)
+
+# Kolommen die compute_jit nodig heeft
+JIT_COLUMNS = ["date_dos", "cnr_tour", "cnr_cust", "nm_short_unload", "Win FROM", "Win UNTIL", "Planned", "Actual"]
+
+def _jit_columns() -> List[str]:
+    """JIT_COLUMNS + de tijdkolommen van de geregistreerde scenario's."""
+    return list(dict.fromkeys(JIT_COLUMNS + scenarios.scenario_time_columns(scenarios.scenario_names())))
 
 def compute_jit(route_orders: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Scenario 1 (S1): Actual >= Win FROM én Actual <= Win UNTIL.
     Scenario 2 (S2): Actual <= Win UNTIL (te vroeg = ook JIT).
     Eén order binnen venster => volledige levering JIT.
+    Plus jit_<scenario>_order / jit_<scenario>_delivery per geregistreerd scenario.
+    Vlaggen via jit_engine; hier enkel de detailkolommen voor route_detail_html.
     """
     df = route_orders.copy()
 
-    df["win_from_dt"] = _combine_datetime(df, "date_dos", "Win FROM")
-    df["win_until_dt"] = _combine_datetime(df, "date_dos", "Win UNTIL")
-    df["actual_dt"] = _combine_datetime(df, "date_dos", "Actual")
-    df["planned_dt"] = _combine_datetime(df, "date_dos", "Planned")
-
-    s1 = (df["actual_dt"] >= df["win_from_dt"]) & (df["actual_dt"] <= df["win_until_dt"])
-    s2 = df["actual_dt"] <= df["win_until_dt"]
+    df["planned_at"] = _abs_minutes(df, "Planned")
+    df["jit_s1_order"], df["jit_s2_order"] = jit_engine.order_flags(df)
+    flags = jit_engine.scenario_flags(df)
+    for name, flag in flags.items():
+        df[f"jit_{name}_order"] = flag
 
-    df["jit_s1_order"] = s1.fillna(False)
-    df["jit_s2_order"] = s2.fillna(False)
-
-    grp_cols = ["date_dos", "cnr_tour", "nm_short_unload"]
+    grp_cols = jit_engine.STOP_KEY
     deliveries = (
-        df.groupby(grp_cols, as_index=False)
+        df.groupby(grp_cols, as_index=False, observed=True)
         .agg(
             orders=("cnr_cust", "count"),
             win_from=("Win FROM", "first"),
@@ -312,12 +676,33 @@ def compute_jit(route_orders: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]
             first_actual=("Actual", "first"),
             jit_s1_delivery=("jit_s1_order", "any"),
             jit_s2_delivery=("jit_s2_order", "any"),
-            first_planned_dt=("planned_dt", "min"),
+            **{f"jit_{name}_delivery": (f"jit_{name}_order", "any") for name in flags},
+            first_planned_at=("planned_at", "min"),
         )
-        .sort_values(["first_planned_dt", "nm_short_unload"])
+        .sort_values(["first_planned_at", "nm_short_unload"])
     )
     return df, deliveries
 
+# Tellingen per route (routes_html); zelfde kolommen als sql_engine.route_jit
+ROUTE_JIT_COUNTS = ["date_dos", "cnr_tour", "deliveries", "jit_s1_del", "jit_s2_del", "orders", "jit_s1_ord", "jit_s2_ord"]
+
+def _route_jit_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per (date_dos, cnr_tour): leveringen en orders, totaal en JIT S1/S2, plus
+    jit_<scenario>_del / jit_<scenario>_ord per scenario (één pass via jit_engine).
+    """
+    names = scenarios.scenario_names()
+    columns = ROUTE_JIT_COUNTS + [c for n in names for c in (f"jit_{n}_del", f"jit_{n}_ord")]
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+    _, deliveries = jit_engine.evaluate(df, scenarios=names)
+    counts = jit_engine.summarize(deliveries, ["date_dos", "cnr_tour"])
+    return counts.rename(columns={
+        f"{kind}_jit_{n}": f"jit_{n}_{suffix}"
+        for n in ["s1", "s2", *names]
+        for kind, suffix in (("deliveries", "del"), ("orders", "ord"))
+    })[columns]
+
 # ------------------------------------------------------------
 # HOME
 # ------------------------------------------------------------
@@ -330,7 +715,7 @@ def home():
     <div class="grid-cards">
       <div class="card">
         <h3>1. Dataset uploaden</h3>
-        <p>Laad de OTIF Excel in, de orders-tabel wordt leeggemaakt en opnieuw opgebouwd.</p>
+        <p>Laad de OTIF Excel in: orders-tabel vervangen of nieuwe dagen toevoegen / bijwerken.</p>
         <p style="margin-top:10px"><a href="/upload" class="btn btn-primary">📁 Upload dataset</a></p>
       </div>
 
@@ -371,7 +756,13 @@ def home():
       </div>
 
       <div class="card">
-        <h3>8. Transport manager analyse</h3>
+        <h3>8. JIT% per tolerantie</h3>
+        <p>Curve van JIT% S1/S2 (leveringen &amp; orders) bij 0, 5, 10, 15, 30 en 60 min tolerantie, per kanaal en per dag.</p>
+        <p style="margin-top:10px"><a href="/jit_tolerance_sweep_html" class="btn">📈 Tolerantie-sweep</a></p>
+      </div>
+
+      <div class="card">
+        <h3>9. Transport manager analyse</h3>
         <p>Volgorde drops vs planning, vertrek reëel vs gepland, en planned+wait vs reële levertijd+wachttijd.</p>
         <p style="margin-top:10px"><a href="/transport_manager_html" class="btn">🧭 Open transport analyse</a></p>
       </div>
@@ -386,10 +777,21 @@ def home():
 def upload_form():
     body = """
     <h1>Dataset uploaden</h1>
-    <p class="sub">Laad hier de OTIF Excel file op. De bestaande tabel <code>orders</code> wordt vervangen.</p>
+    <p class="sub">
+      Laad hier de OTIF export op (Excel of CSV).<br/>
+      <strong>Vervangen</strong>: de bestaande tabel <code>orders</code> wordt vervangen.<br/>
+      <strong>Toevoegen / bijwerken</strong>: enkel nieuwe of gewijzigde orders worden geschreven
+      (sleutel: date_dos, cnr_tour, nm_short_unload, cnr_cust, Planned); bestaande historiek blijft behouden.
+    </p>
     <form action="/upload" method="post" enctype="multipart/form-data">
-      <label class="small">Excel bestand (.xlsx)</label><br/>
-      <input type="file" name="file" accept=".xlsx" required />
+      <label class="small">Bestand (.xlsx / .xls / .csv)</label><br/>
+      <input type="file" name="file" accept=".xlsx,.xlsm,.xls,.csv" required />
+      <br/><br/>
+      <label class="small">Modus</label><br/>
+      <select name="mode">
+        <option value="replace">Vervangen</option>
+        <option value="upsert">Toevoegen / bijwerken</option>
+      </select>
       <br/><br/>
       <button type="submit" class="btn btn-primary">Upload &amp; verwerk</button>
     </form>
@@ -397,78 +799,248 @@ def upload_form():
     return _layout("Upload", body)
 
 @app.post("/upload", response_class=HTMLResponse)
-async def upload(file: UploadFile = File(...)):
+async def upload(file: UploadFile = File(...), mode: str = Form("replace")):
+    if mode not in INGEST_MODES:
+        raise HTTPException(status_code=400, detail=f"Onbekende modus: {mode}")
     ensure_db()
-    raw = await file.read()
-    excel = io.BytesIO(raw)
-
-    df = pd.read_excel(excel, dtype=str)
-    df.columns = [str(c).strip() for c in df.columns]
-
-    if "date_dos" in df.columns:
-        df["date_dos"] = pd.to_datetime(df["date_dos"], errors="coerce").dt.strftime("%Y-%m-%d")
-
-    for col in ["cnr_tour", "cnr_cust", "RFX Activity", "RFX Year", "RFX Preperation"]:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip()
 
-    # Short time HH:MM
-    time_cols = ["Win FROM", "Win UNTIL", "Planned", "Actual", "P_Depart", "A_Depart"]
-    for col in time_cols:
-        if col in df.columns:
-            t = pd.to_datetime(df[col], errors="coerce").dt.strftime("%H:%M")
-            df[col] = t
-
-    conn = sqlite3.connect(DB_PATH)
+    # Spool de upload naar schijf i.p.v. het volledige bestand in geheugen te lezen
+    suffix = Path(file.filename or "").suffix or ".xlsx"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        spool_path = Path(tmp.name)
+        while True:
+            block = await file.read(UPLOAD_CHUNK_BYTES)
+            if not block:
+                break
+            tmp.write(block)
+
+    # Parsen + wegschrijven gebeurt in een process-pool worker; de request keert meteen terug
+    job_id = create_job(DB_PATH, file.filename or spool_path.name, mode)
     try:
-        df.to_sql("orders", conn, if_exists="replace", index=False)
-        conn.commit()
-    finally:
-        conn.close()
+        parquet_dir = str(PARQUET_DIR) if ORDERS_BACKEND == "parquet" else None
+        mmap_dir = str(MMAP_DIR) if ORDERS_BACKEND == "mmap" else None
+        future = _get_ingest_pool().submit(
+            run_ingest_job, job_id, str(spool_path), str(DB_PATH), mode, parquet_dir,
+            HOT_MONTHS, RETENTION_MONTHS, mmap_dir,
+        )
+    except Exception:
+        spool_path.unlink(missing_ok=True)
+        update_job(DB_PATH, job_id, status="failed", error="Kon job niet starten", finished_at=time.time())
+        raise
+    future.add_done_callback(lambda f: _on_ingest_job_done(job_id, f))
 
     body = f"""
-    <h1>Upload resultaat</h1>
+    <h1>Upload ontvangen</h1>
     <p class="sub">
-      Bestand <strong>{file.filename}</strong> werd verwerkt.
-      Aantal rijen in tabel <code>orders</code>: {len(df)}.
+      Bestand <strong>{file.filename}</strong> wordt op de achtergrond verwerkt (modus: {mode}).<br/>
+      Job id: <code>{job_id}</code> – status als JSON: <a href="/jobs/{job_id}">/jobs/{job_id}</a>
     </p>
     <p>
+      <a href="/jobs_html" class="btn btn-primary">⏳ Volg importjobs</a>
+      &nbsp;
       <a href="/dataset_html" class="btn">📊 Bekijk dataset</a>
       &nbsp;
       <a href="/routes_html" class="btn">🚛 Naar routes analyse</a>
-      &nbsp;
-      <a href="/waits_html" class="btn">⏱ Naar wachttijden</a>
-      &nbsp;
-      <a href="/transport_manager_html" class="btn">🧭 Transport</a>
     </p>
     """
-    return _layout("Upload OK", body)
+    return _layout("Upload ontvangen", body)
+
+def _on_ingest_job_done(job_id: str, future: Future) -> None:
+    """Vangnet: als de worker crasht vóór hij zelf een status kon schrijven."""
+    exc = future.exception()
+    if exc is None:
+        return
+    job = get_job(DB_PATH, job_id)
+    if job and job["status"] not in ("done", "failed"):
+        update_job(DB_PATH, job_id, status="failed", error=f"{type(exc).__name__}: {exc}", finished_at=time.time())
+
+# ------------------------------------------------------------
+# IMPORTJOBS – status
+# ------------------------------------------------------------
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    """Voortgang van één importjob: rijen ingelezen/geschreven, doorlooptijd en fouten."""
+    job = get_job(DB_PATH, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Onbekende job: {job_id}")
+    return job
+
+@app.get("/db_stats")
+def db_stats():
+    """Verbindingspool van deze API-worker: open lezers, schrijfacties en wachttijd op locks."""
+    ensure_db()
+    conn = db.reader(DB_PATH)
+    stats = db.pool_stats(DB_PATH)
+    stats["journal_mode"] = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    wal = Path(str(DB_PATH) + "-wal")
+    stats["wal_bytes"] = wal.stat().st_size if wal.exists() else 0
+    return stats
+
+@app.get("/cache_stats")
+def cache_stats():
+    """Resultatencache van deze API-worker: versie, grootte, hits/misses en evicties."""
+    stats = RESULT_CACHE.stats()
+    stats["dataset_version"] = _dataset_version()
+    return stats
+
+@app.get("/jobs_html", response_class=HTMLResponse)
+def jobs_html():
+    ensure_db()
+    jobs = list_jobs(DB_PATH)
+    running = any(j["status"] in ("queued", "running") for j in jobs)
+
+    rows_html = ""
+    for j in jobs:
+        if j["status"] == "done":
+            cls = "jit-ok"
+        elif j["status"] == "failed":
+            cls = "jit-root"
+        else:
+            cls = "jit-late"
+        error = (j["error"] or "").splitlines()[0] if j["error"] else ""
+        rows_html += f"""
+        <tr class="{cls}">
+          <td class="mono"><a href="/jobs/{j['job_id']}">{j['job_id'][:8]}</a></td>
+          <td>{j['filename']}</td>
+          <td>{j['mode']}</td>
+          <td>{j['status']}</td>
+          <td class="mono">{int(j['rows_parsed'] or 0)}</td>
+          <td class="mono">{int(j['rows_written'] or 0)}</td>
+          <td class="mono">{float(j['elapsed_s']):.1f}</td>
+          <td>{error}</td>
+        </tr>
+        """
+
+    table_html = f"""
+    <div class="topbar">
+      <div class="sub">Laatste {len(jobs)} importjobs{" – pagina ververst automatisch" if running else ""}.</div>
+      <button class="copy-btn" onclick="copyTable('tblJobs')">📋 Kopieer tabel</button>
+    </div>
+    <div class="table-wrapper">
+      <table id="tblJobs">
+        <thead>
+          <tr>
+            <th>Job</th>
+            <th>Bestand</th>
+            <th>Modus</th>
+            <th>Status</th>
+            <th>Rijen ingelezen</th>
+            <th>Rijen geschreven</th>
+            <th>Doorlooptijd (s)</th>
+            <th>Fout</th>
+          </tr>
+        </thead>
+        <tbody>{rows_html}</tbody>
+      </table>
+    </div>
+    """
+
+    refresh = '<meta http-equiv="refresh" content="2">' if running else ""
+    body = f"""
+    {refresh}
+    <h1>Importjobs</h1>
+    <p class="sub">Uploads worden op de achtergrond verwerkt; meerdere bestanden kunnen parallel importeren.</p>
+    {table_html}
+    <p style="margin-top:12px;"><a href="/upload" class="btn">📁 Nieuwe upload</a></p>
+    """
+    return _layout("Importjobs", body)
 
 # ------------------------------------------------------------
 # DATASET VIEWER
 # ------------------------------------------------------------
+def _fmt_cell(v: object) -> object:
+    """Getypeerde waarden tonen zoals de tekstkolommen vroeger: 11 i.p.v. 11.0, None voor NULL."""
+    if v is pd.NA or (isinstance(v, float) and v != v):
+        return None
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    return v
+
+def _parse_cursor(raw: Optional[str], size: int) -> Optional[list]:
+    if not raw:
+        return None
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = None
+    if not isinstance(value, list) or len(value) != size:
+        raise HTTPException(status_code=400, detail="Ongeldige paginacursor")
+    return value
+
+def _estimate_orders(date_from, date_to, rfx_activity, cnr_tour) -> int:
+    """
+    Aantal orders volgens kpi_day: een schatting zonder COUNT(*) over orders
+    (orderregels zonder datum of klant tellen er niet in mee).
+    """
+    kpi = load_kpi(["cnr_tour"] if cnr_tour else [], date_from, date_to, rfx_activity)
+    if cnr_tour and not kpi.empty:
+        kpi = kpi[kpi["cnr_tour"].astype(str) == str(cnr_tour)]
+    return int(pd.to_numeric(kpi["orders"], errors="coerce").fillna(0).sum()) if not kpi.empty else 0
+
 @app.get("/dataset_html", response_class=HTMLResponse)
 def dataset_html(
     date_from: Optional[str] = Query(None),
     date_to: Optional[str] = Query(None),
     rfx_activity: Optional[str] = Query(None),
     cnr_tour: Optional[str] = Query(None),
+    sort: Optional[str] = Query(None),
+    order: str = Query("asc"),
+    after: Optional[str] = Query(None),
+    before: Optional[str] = Query(None),
+    limit: int = Query(PAGE_ROWS),
 ):
-    df = load_orders(date_from, date_to, rfx_activity, cnr_tour)
+    ensure_db()
+    hidden = {*MINUTE_COLUMNS.values(), DAY_COLUMN, *(code for _, code in DICT_COLUMNS.values())}
+    sortable = [r[1] for r in db.reader(DB_PATH).execute('PRAGMA table_info("orders")') if r[1] not in hidden]
+    if sort and sort not in sortable:
+        raise HTTPException(status_code=400, detail=f"Onbekende sorteerkolom: {sort}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail=f"Onbekende sorteervolgorde: {order}")
+    limit = max(1, min(limit, MAX_PAGE_ROWS))
+    n_keys = len(dict.fromkeys([*([sort] if sort else []), *PAGE_KEY])) + 1
+
+    df, first, last, more = load_orders_page(
+        date_from, date_to, rfx_activity, cnr_tour,
+        sort=sort, descending=order == "desc",
+        after=_parse_cursor(after, n_keys), before=_parse_cursor(before, n_keys), limit=limit,
+    )
+
+    filters = {"date_from": date_from, "date_to": date_to, "rfx_activity": rfx_activity, "cnr_tour": cnr_tour}
+
+    def page_url(**extra: object) -> str:
+        params = {k: v for k, v in {**filters, "sort": sort, "order": order, "limit": limit, **extra}.items() if v}
+        if params.get("order") == "asc":
+            del params["order"]
+        if params.get("limit") == PAGE_ROWS:
+            del params["limit"]
+        return "/dataset_html?" + urlencode(params) if params else "/dataset_html"
 
-    max_rows = 500
     if df.empty:
         table_html = "<p class='sub'>Geen gegevens beschikbaar (controleer filters of upload eerst een dataset).</p>"
     else:
-        df_view = df.head(max_rows) if len(df) > max_rows else df
-        headers = "".join(f"<th>{c}</th>" for c in df_view.columns)
+        # afgeleide minutenkolommen zijn intern; toon de brondata
+        df_view = df.drop(columns=[*MINUTE_COLUMNS.values(), DAY_COLUMN], errors="ignore")
+        headers = ""
+        for c in df_view.columns:
+            flip = "desc" if c == sort and order == "asc" else "asc"
+            arrow = (" ▲" if order == "asc" else " ▼") if c == sort else ""
+            headers += f'<th><a href="{escape(page_url(sort=c, order=flip))}">{c}{arrow}</a></th>'
         rows = ""
         for _, row in df_view.iterrows():
-            cells = "".join(f"<td>{row[c]}</td>" for c in df_view.columns)
+            cells = "".join(f"<td>{_fmt_cell(row[c])}</td>" for c in df_view.columns)
             rows += f"<tr>{cells}</tr>"
+
+        has_prev = (after is not None) if before is None else more
+        has_next = more if before is None else True
+        nav = []
+        if has_prev:
+            nav.append(f'<a href="{escape(page_url(before=json.dumps(first)))}" class="btn">← Vorige</a>')
+        if has_next:
+            nav.append(f'<a href="{escape(page_url(after=json.dumps(last)))}" class="btn">Volgende →</a>')
+        estimate = _estimate_orders(date_from, date_to, rfx_activity, cnr_tour)
         table_html = f"""
         <div class="topbar">
-          <div class="sub">Aantal rijen getoond: {len(df_view)} (beperkt tot {max_rows}).</div>
+          <div class="sub">Aantal rijen getoond: {len(df_view)} (pagina's van {limit}; ca. {estimate:,} orders in totaal).</div>
           <button class="copy-btn" onclick="copyTable('tblDataset')">📋 Kopieer tabel</button>
         </div>
         <div class="table-wrapper">
@@ -477,6 +1049,7 @@ def dataset_html(
             <tbody>{rows}</tbody>
           </table>
         </div>
+        {"<p>" + " &nbsp; ".join(nav) + "</p>" if nav else ""}
         """
 
     filter_html = f"""
@@ -489,6 +1062,8 @@ def dataset_html(
       <input type="text" name="rfx_activity" value="{rfx_activity or ''}" placeholder="bv. 4">
       <label class="small">Route (cnr_tour)</label>
       <input type="text" name="cnr_tour" value="{cnr_tour or ''}" placeholder="bv. 776907">
+      <input type="hidden" name="sort" value="{escape(sort or '')}">
+      <input type="hidden" name="order" value="{order}">
       <button type="submit" class="btn">Filter</button>
       <a href="/dataset_html" class="btn">Reset</a>
     </form>
@@ -496,7 +1071,8 @@ def dataset_html(
 
     body = f"""
     <h1>Dataset viewer</h1>
-    <p class="sub">Ruwe data uit de tabel <code>orders</code>. Gebruik filters om subset te bekijken.</p>
+    <p class="sub">Ruwe data uit de tabel <code>orders</code>, per pagina gelezen (standaard op datum en route;
+    klik op een kolomtitel om te sorteren). Gebruik filters om subset te bekijken.</p>
     {filter_html}
     <br/>
     {table_html}
@@ -518,48 +1094,49 @@ def routes_html(
     if not cnr_tour_filter and route_select and route_select != "ALL":
         cnr_tour_filter = route_select
 
-    df = load_orders(date_from, date_to, rfx_activity, cnr_tour_filter)
+    if _use_sql_engine():
+        counts = load_aggregate(
+            "route_jit",
+            lambda: sql_engine.route_jit(PARQUET_DIR, date_from, date_to, rfx_activity, cnr_tour_filter),
+            date_from, date_to, rfx_activity, cnr_tour_filter,
+        )
+        route_values = counts["cnr_tour"]
+    else:
+        df = load_orders(date_from, date_to, rfx_activity, cnr_tour_filter, columns=_jit_columns())
+        counts = _route_jit_counts(df)
+        route_values = df["cnr_tour"] if not df.empty else counts["cnr_tour"]
 
-    if df.empty:
+    if counts.empty:
         routes_table = "<p class='sub'>Geen gegevens beschikbaar (controleer filters of upload eerst een dataset).</p>"
         route_options = '<option value="ALL">(geen selectie)</option>'
     else:
-        unique_routes = df["cnr_tour"].dropna().astype(str).drop_duplicates().sort_values()
+        unique_routes = route_values.dropna().astype(str).drop_duplicates().sort_values()
         route_options = '<option value="ALL">(geen selectie)</option>' + "".join(
             f'<option value="{r}" {"selected" if cnr_tour_filter==str(r) else ""}>{r}</option>'
             for r in unique_routes
         )
 
+        names = scenarios.scenario_names()
         route_rows = []
-        for (date_dos, cnr_tour), g in df.groupby(["date_dos", "cnr_tour"]):
-            work, deliveries = compute_jit(g)
-
-            n_del = len(deliveries)
-            s1_del = int(deliveries["jit_s1_delivery"].sum())
-            s2_del = int(deliveries["jit_s2_delivery"].sum())
-            s1_pct = (s1_del / n_del * 100.0) if n_del else 0.0
-            s2_pct = (s2_del / n_del * 100.0) if n_del else 0.0
-
-            n_ord = len(work)
-            s1_ord = int(work["jit_s1_order"].sum())
-            s2_ord = int(work["jit_s2_order"].sum())
-            s1_ord_pct = (s1_ord / n_ord * 100.0) if n_ord else 0.0
-            s2_ord_pct = (s2_ord / n_ord * 100.0) if n_ord else 0.0
-
+        for r in counts.itertuples(index=False):
+            n_del, s1_del, s2_del = int(r.deliveries), int(r.jit_s1_del), int(r.jit_s2_del)
+            n_ord, s1_ord, s2_ord = int(r.orders), int(r.jit_s1_ord), int(r.jit_s2_ord)
+            sc_del = {n: int(getattr(r, f"jit_{n}_del")) for n in names}
             route_rows.append(
                 dict(
-                    date_dos=str(date_dos),
-                    cnr_tour=str(cnr_tour),
+                    date_dos=str(r.date_dos),
+                    cnr_tour=str(r.cnr_tour),
                     deliveries=n_del,
                     jit_s1_del=s1_del,
                     jit_s2_del=s2_del,
-                    jit_s1_del_pct=s1_pct,
-                    jit_s2_del_pct=s2_pct,
+                    jit_s1_del_pct=(s1_del / n_del * 100.0) if n_del else 0.0,
+                    jit_s2_del_pct=(s2_del / n_del * 100.0) if n_del else 0.0,
                     orders=n_ord,
                     jit_s1_ord=s1_ord,
                     jit_s2_ord=s2_ord,
-                    jit_s1_ord_pct=s1_ord_pct,
-                    jit_s2_ord_pct=s2_ord_pct,
+                    jit_s1_ord_pct=(s1_ord / n_ord * 100.0) if n_ord else 0.0,
+                    jit_s2_ord_pct=(s2_ord / n_ord * 100.0) if n_ord else 0.0,
+                    **{f"jit_{n}_del_pct": (v / n_del * 100.0) if n_del else 0.0 for n, v in sc_del.items()},
                 )
             )
 
@@ -579,6 +1156,9 @@ def routes_html(
               <th>JIT S1 %</th>
               <th>JIT S2 orders</th>
               <th>JIT S2 %</th>
+            """ + "".join(
+                f"<th>JIT {escape(str(scenarios.SCENARIOS[n]['label']))} (leveringen %)</th>" for n in names
+            ) + """
               <th>Detail</th>
             """
 
@@ -606,6 +1186,7 @@ def routes_html(
                   <td class="mono">{r['jit_s1_ord_pct']:.2f}%</td>
                   <td class="mono">{int(r['jit_s2_ord'])}</td>
                   <td class="mono">{r['jit_s2_ord_pct']:.2f}%</td>
+                  {"".join(f'<td class="mono">{r[f"jit_{n}_del_pct"]:.2f}%</td>' for n in names)}
                   <td><a class="btn" href="{link}">🔍 Detail</a></td>
                 </tr>
                 """
@@ -665,7 +1246,12 @@ def route_detail_html(
     cnr_tour: str,
     view: str = Query("delivery", description="delivery|order"),
 ):
-    df = load_orders(date_from=date, date_to=date, cnr_tour=cnr_tour)
+    df = load_orders(
+        date_from=date,
+        date_to=date,
+        cnr_tour=cnr_tour,
+        columns=_jit_columns() + ["RFX Activity", "RFX Year", "RFX Preperation"],
+    )
     if df.empty:
         return _layout(
             "Route detail",
@@ -673,15 +1259,19 @@ def route_detail_html(
         )
 
     work, deliveries = compute_jit(df)
+    names = scenarios.scenario_names()
+    sc_headers = "".join(f"<th>JIT {escape(str(scenarios.SCENARIOS[n]['label']))}</th>" for n in names)
 
     n_orders = len(work)
     s1_ord_pct = work["jit_s1_order"].mean() * 100 if n_orders else 0.0
     s2_ord_pct = work["jit_s2_order"].mean() * 100 if n_orders else 0.0
 
-    work = work.sort_values(["planned_dt", "nm_short_unload"])
-    deliveries = deliveries.sort_values(["first_planned_dt", "nm_short_unload"])
+    work = work.sort_values(["planned_at", "nm_short_unload"])
+    deliveries = deliveries.sort_values(["first_planned_at", "nm_short_unload"])
 
     if view == "order":
+        for c in ("Win FROM", "Win UNTIL", "Planned", "Actual"):
+            work[c] = _fmt_hhmm_col(work[c])
         rows_html = ""
         for _, r in work.iterrows():
             if r["jit_s2_order"]:
@@ -691,16 +1281,17 @@ def route_detail_html(
 
             rows_html += f"""
             <tr class="{row_class}">
-              <td>{r.get("nm_short_unload","")}</td>
-              <td>{r.get("RFX Activity","")}</td>
-              <td>{r.get("RFX Year","")}</td>
-              <td>{r.get("RFX Preperation","")}</td>
-              <td class="mono">{_fmt_hhmm(r.get("Win FROM",""))}</td>
-              <td class="mono">{_fmt_hhmm(r.get("Win UNTIL",""))}</td>
-              <td class="mono">{_fmt_hhmm(r.get("Planned",""))}</td>
-              <td class="mono">{_fmt_hhmm(r.get("Actual",""))}</td>
+              <td>{_fmt_cell(r.get("nm_short_unload",""))}</td>
+              <td>{_fmt_cell(r.get("RFX Activity",""))}</td>
+              <td>{_fmt_cell(r.get("RFX Year",""))}</td>
+              <td>{_fmt_cell(r.get("RFX Preperation",""))}</td>
+              <td class="mono">{r["Win FROM"]}</td>
+              <td class="mono">{r["Win UNTIL"]}</td>
+              <td class="mono">{r["Planned"]}</td>
+              <td class="mono">{r["Actual"]}</td>
               <td>{"✔" if r["jit_s1_order"] else "✖"}</td>
               <td>{"✔" if r["jit_s2_order"] else "✖"}</td>
+              {"".join(f'<td>{"✔" if r[f"jit_{n}_order"] else "✖"}</td>' for n in names)}
             </tr>
             """
 
@@ -723,6 +1314,7 @@ def route_detail_html(
                 <th>Actual</th>
                 <th>JIT S1</th>
                 <th>JIT S2</th>
+                {sc_headers}
               </tr>
             </thead>
             <tbody>{rows_html}</tbody>
@@ -730,6 +1322,8 @@ def route_detail_html(
         </div>
         """
     else:
+        for c in ("win_from", "win_until", "first_planned", "first_actual"):
+            deliveries[c] = _fmt_hhmm_col(deliveries[c])
         rows_html = ""
         for _, r in deliveries.iterrows():
             if r["jit_s2_delivery"]:
@@ -739,14 +1333,15 @@ def route_detail_html(
 
             rows_html += f"""
             <tr class="{row_class}">
-              <td>{r['nm_short_unload']}</td>
+              <td>{_fmt_cell(r['nm_short_unload'])}</td>
               <td class="mono">{int(r['orders'])}</td>
-              <td class="mono">{_fmt_hhmm(r['win_from'])}</td>
-              <td class="mono">{_fmt_hhmm(r['win_until'])}</td>
-              <td class="mono">{_fmt_hhmm(r['first_planned'])}</td>
-              <td class="mono">{_fmt_hhmm(r['first_actual'])}</td>
+              <td class="mono">{r['win_from']}</td>
+              <td class="mono">{r['win_until']}</td>
+              <td class="mono">{r['first_planned']}</td>
+              <td class="mono">{r['first_actual']}</td>
               <td>{"✔" if r["jit_s1_delivery"] else "✖"}</td>
               <td>{"✔" if r["jit_s2_delivery"] else "✖"}</td>
+              {"".join(f'<td>{"✔" if r[f"jit_{n}_delivery"] else "✖"}</td>' for n in names)}
             </tr>
             """
 
@@ -767,6 +1362,7 @@ def route_detail_html(
                 <th>Eerste Actual</th>
                 <th>JIT S1</th>
                 <th>JIT S2</th>
+                {sc_headers}
               </tr>
             </thead>
             <tbody>{rows_html}</tbody>
@@ -806,41 +1402,24 @@ def waits_html(
     date_from: Optional[str] = Query(None),
     date_to: Optional[str] = Query(None),
 ):
-    df = load_orders(date_from=date_from, date_to=date_to)
-
-    if df.empty:
-        body = """
-        <h1>Analyse wachttijden (totaal per klant)</h1>
-        <p class="sub">Geen gegevens beschikbaar (controleer filters of upload eerst een dataset).</p>
-        <p><a href="/" class="btn">⬅️ Terug naar dashboard</a></p>
-        """
-        return _layout("Wachttijden per klant", body)
-
-    df["DurationA_min"] = pd.to_numeric(df.get("DurationA", pd.NA), errors="coerce")
-    df = df.dropna(subset=["DurationA_min"]).copy()
-    if df.empty:
-        body = """
-        <h1>Analyse wachttijden (totaal per klant)</h1>
-        <p class="sub">Er zijn geen rijen met DurationA (wachttijd) aanwezig.</p>
-        <p><a href="/" class="btn">⬅️ Terug naar dashboard</a></p>
-        """
-        return _layout("Wachttijden per klant", body)
-
-    # per levering
-    delivery_grp = ["date_dos", "cnr_tour", "RFX Activity", "nm_short_unload"]
-    deliveries = df.groupby(delivery_grp, as_index=False).agg(avg_wait_min=("DurationA_min", "mean"))
-
-    # per klant
-    cust_agg = (
-        deliveries.groupby("RFX Activity", as_index=False)
-        .agg(
-            deliveries=("avg_wait_min", "size"),
-            leverpunten=("nm_short_unload", "nunique"),
-            total_wait_min=("avg_wait_min", "sum"),
-            avg_wait_per_delivery=("avg_wait_min", "mean"),
-        )
-        .sort_values("total_wait_min", ascending=False)
+    no_data = """
+    <h1>Analyse wachttijden (totaal per klant)</h1>
+    <p class="sub">Geen gegevens beschikbaar (controleer filters of upload eerst een dataset).</p>
+    <p><a href="/" class="btn">⬅️ Terug naar dashboard</a></p>
+    """
+    # Per dag bijgehouden bij ingest (rollups.kpi_wait_day): per klant × leverpunt optellen
+    kpi = load_kpi(["rfx_activity", "nm_short_unload"], date_from=date_from, date_to=date_to, table="kpi_wait_day")
+    if kpi.empty:
+        return _layout("Wachttijden per klant", no_data)
+
+    cust_agg = kpi.groupby("rfx_activity", as_index=False).agg(
+        deliveries=("deliveries", "sum"),
+        leverpunten=("nm_short_unload", "size"),
+        total_wait_min=("wait_min_sum", "sum"),
     )
+    cust_agg["avg_wait_per_delivery"] = cust_agg["total_wait_min"] / cust_agg["deliveries"]
+    cust_agg["RFX Activity"] = cust_agg.pop("rfx_activity").astype("Int16")
+    cust_agg = cust_agg.sort_values("total_wait_min", ascending=False)
 
     headers = """
       <th>RFX Activity</th>
@@ -902,29 +1481,41 @@ def waits_html(
     """
     return _layout("Wachttijden per klant", body)
 
+# Wachttijden per leverpunt (DurationA)
+WAITS_DETAIL_COLUMNS = ["date_dos", "cnr_tour", "nm_short_unload", "DurationA"]
+
 @app.get("/waits_customer_detail_html", response_class=HTMLResponse)
 def waits_customer_detail_html(
     rfx_activity: str,
     date_from: Optional[str] = Query(None),
     date_to: Optional[str] = Query(None),
 ):
-    df = load_orders(date_from=date_from, date_to=date_to, rfx_activity=rfx_activity)
-    if df.empty:
-        return _layout("Wachttijden detail", f"<h1>Wachttijden – detail klant {rfx_activity}</h1><p class='sub'>Geen data.</p>")
+    if _use_sql_engine():
+        deliveries = load_aggregate(
+            "wait_deliveries",
+            lambda: sql_engine.wait_deliveries(PARQUET_DIR, date_from, date_to, rfx_activity),
+            date_from, date_to, rfx_activity,
+        )
+        if deliveries.empty:
+            return _layout("Wachttijden detail", f"<h1>Wachttijden – detail klant {rfx_activity}</h1><p class='sub'>Geen data.</p>")
+    else:
+        df = load_orders(date_from=date_from, date_to=date_to, rfx_activity=rfx_activity, columns=WAITS_DETAIL_COLUMNS)
+        if df.empty:
+            return _layout("Wachttijden detail", f"<h1>Wachttijden – detail klant {rfx_activity}</h1><p class='sub'>Geen data.</p>")
 
-    df["DurationA_min"] = pd.to_numeric(df.get("DurationA", pd.NA), errors="coerce")
-    df = df.dropna(subset=["DurationA_min"]).copy()
-    if df.empty:
-        return _layout("Wachttijden detail", f"<h1>Wachttijden – detail klant {rfx_activity}</h1><p class='sub'>Geen DurationA data.</p>")
+        df["DurationA_min"] = pd.to_numeric(df.get("DurationA", pd.NA), errors="coerce")
+        df = df.dropna(subset=["DurationA_min"]).copy()
+        if df.empty:
+            return _layout("Wachttijden detail", f"<h1>Wachttijden – detail klant {rfx_activity}</h1><p class='sub'>Geen DurationA data.</p>")
 
-    deliveries = (
-        df.groupby(["date_dos", "cnr_tour", "nm_short_unload"], as_index=False)
-        .agg(avg_wait_min=("DurationA_min", "mean"))
-        .sort_values("avg_wait_min", ascending=False)
-    )
+        # Lege route telt mee als levering (zoals kpi_wait_day), leeg leverpunt niet
+        deliveries = df.dropna(subset=["nm_short_unload"]).groupby(
+            ["date_dos", "cnr_tour", "nm_short_unload"], as_index=False, observed=True, dropna=False
+        ).agg(avg_wait_min=("DurationA_min", "mean"))
+    deliveries = deliveries.sort_values("avg_wait_min", ascending=False)
 
     store_agg = (
-        deliveries.groupby("nm_short_unload", as_index=False)
+        deliveries.groupby("nm_short_unload", as_index=False, observed=True)
         .agg(
             deliveries=("avg_wait_min", "size"),
             total_wait_min=("avg_wait_min", "sum"),
@@ -973,12 +1564,14 @@ def waits_customer_detail_html(
     """
     rows2 = ""
     for _, r in deliveries.iterrows():
-        link = f"/route_detail_html?date={r['date_dos']}&cnr_tour={r['cnr_tour']}&view=delivery"
-        tlink = f"/transport_route_detail_html?date={r['date_dos']}&cnr_tour={r['cnr_tour']}"
+        # Lege route zoals vroeger als tekst "nan" (ook als de kolom float is)
+        tour = "nan" if pd.isna(r["cnr_tour"]) else int(r["cnr_tour"])
+        link = f"/route_detail_html?date={r['date_dos']}&cnr_tour={tour}&view=delivery"
+        tlink = f"/transport_route_detail_html?date={r['date_dos']}&cnr_tour={tour}"
         rows2 += f"""
         <tr>
           <td class="mono">{r['date_dos']}</td>
-          <td class="mono">{r['cnr_tour']}</td>
+          <td class="mono">{tour}</td>
           <td>{r['nm_short_unload']}</td>
           <td class="mono">{r['avg_wait_min']:.1f}</td>
           <td><a class="btn" href="{link}">🔍 Route</a></td>
@@ -1013,6 +1606,11 @@ def waits_customer_detail_html(
     """
     return _layout("Wachttijden detail", body)
 
+WAITS_ORDER_COLUMNS = [
+    "date_dos", "cnr_tour", "cnr_cust", "nm_short_unload",
+    "Win FROM", "Win UNTIL", "Planned", "Actual", "A_Depart", "DurationA",
+]
+
 @app.get("/waits_store_orders_html", response_class=HTMLResponse)
 def waits_store_orders_html(
     rfx_activity: str,
@@ -1020,7 +1618,7 @@ def waits_store_orders_html(
     date_from: Optional[str] = Query(None),
     date_to: Optional[str] = Query(None),
 ):
-    df = load_orders(date_from=date_from, date_to=date_to, rfx_activity=rfx_activity)
+    df = load_orders(date_from=date_from, date_to=date_to, rfx_activity=rfx_activity, columns=WAITS_ORDER_COLUMNS)
     if df.empty:
         return _layout("Wachttijden orders", f"<h1>Geen data</h1><p class='sub'>Geen gegevens.</p>")
 
@@ -1030,8 +1628,11 @@ def waits_store_orders_html(
     if df.empty:
         return _layout("Wachttijden orders", f"<h1>Geen DurationA</h1><p class='sub'>Geen wachttijden.</p>")
 
-    df["planned_dt"] = _combine_datetime(df, "date_dos", "Planned")
-    df = df.sort_values(["date_dos", "cnr_tour", "planned_dt", "Actual"])
+    df["planned_at"] = _abs_minutes(df, "Planned")
+    df = df.sort_values(["date_dos", "cnr_tour", "planned_at", "Actual"])
+    for c in ("Win FROM", "Win UNTIL", "Planned", "Actual", "A_Depart"):
+        if c in df.columns:
+            df[c] = _fmt_hhmm_col(df[c])
 
     headers = """
       <th>Datum</th>
@@ -1057,11 +1658,11 @@ def waits_store_orders_html(
           <td class="mono">{r['cnr_tour']}</td>
           <td class="mono">{r['cnr_cust']}</td>
           <td>{r['nm_short_unload']}</td>
-          <td class="mono">{_fmt_hhmm(r['Win FROM'])}</td>
-          <td class="mono">{_fmt_hhmm(r['Win UNTIL'])}</td>
-          <td class="mono">{_fmt_hhmm(r['Planned'])}</td>
-          <td class="mono">{_fmt_hhmm(r['Actual'])}</td>
-          <td class="mono">{_fmt_hhmm(r.get('A_Depart',''))}</td>
+          <td class="mono">{r['Win FROM']}</td>
+          <td class="mono">{r['Win UNTIL']}</td>
+          <td class="mono">{r['Planned']}</td>
+          <td class="mono">{r['Actual']}</td>
+          <td class="mono">{r.get('A_Depart','')}</td>
           <td class="mono">{r['DurationA_min']:.1f}</td>
           <td><a class="btn" href="{link}">🔍 Route</a></td>
           <td><a class="btn" href="{tlink}">🧭 Transport</a></td>
@@ -1093,51 +1694,20 @@ def waits_store_orders_html(
 # ------------------------------------------------------------
 # Outside JIT helpers (S2): stop-level table
 # ------------------------------------------------------------
-def _stop_level_outside_s2(df: pd.DataFrame) -> pd.DataFrame:
+def _outside_s2_stops(stops: pd.DataFrame) -> pd.DataFrame:
     """
-    Bouw 1 rij per levering = (date_dos, cnr_tour, nm_short_unload).
-    late_minutes = max(0, Actual - Win UNTIL) in minuten.
-    outside = True als Actual > Win UNTIL, of als Actual/Win UNTIL ontbreekt.
+    Stop-level voor de outside-JIT views, uit de stops tabel.
+    late_minutes = max(0, Actual − Win UNTIL) in minuten (vroegste Actual).
+    outside_s2 = True als Actual > Win UNTIL, of als Actual/Win UNTIL ontbreekt.
     """
-    if df.empty:
-        return df
-
-    tmp = df.copy()
-    tmp["actual_dt"] = _combine_datetime(tmp, "date_dos", "Actual") if "Actual" in tmp.columns else pd.NaT
-    tmp["win_until_dt"] = _combine_datetime(tmp, "date_dos", "Win UNTIL") if "Win UNTIL" in tmp.columns else pd.NaT
-    tmp["planned_dt"] = _combine_datetime(tmp, "date_dos", "Planned") if "Planned" in tmp.columns else pd.NaT
-
-    grp = ["date_dos", "cnr_tour", "nm_short_unload"]
-    stops = (
-        tmp.groupby(grp, as_index=False)
-        .agg(
-            rfx_activity=("RFX Activity", "first"),
-            actual_dt=("actual_dt", "min"),
-            win_until_dt=("win_until_dt", "first"),
-            planned_dt=("planned_dt", "min"),
-            actual=("Actual", "first"),
-            win_until=("Win UNTIL", "first"),
-            planned=("Planned", "first"),
-            orders=("cnr_cust", "count"),
-        )
-    )
-
-    diff = (stops["actual_dt"] - stops["win_until_dt"])
-    late_min = diff.dt.total_seconds() / 60.0
-    stops["late_minutes"] = late_min
-
-    stops["outside_s2"] = False
-    has_both = stops["actual_dt"].notna() & stops["win_until_dt"].notna()
-    stops.loc[has_both, "outside_s2"] = stops.loc[has_both, "actual_dt"] > stops.loc[has_both, "win_until_dt"]
-    stops.loc[~has_both, "outside_s2"] = True
-
-    stops.loc[has_both, "late_minutes"] = stops.loc[has_both, "late_minutes"].apply(lambda v: max(0.0, float(v)) if pd.notna(v) else pd.NA)
-
-    stops["actual"] = stops["actual"].apply(_fmt_hhmm)
-    stops["win_until"] = stops["win_until"].apply(_fmt_hhmm)
-    stops["planned"] = stops["planned"].apply(_fmt_hhmm)
-
-    return stops
+    if stops.empty:
+        return stops
+    out = stops[["date_dos", "cnr_tour", "nm_short_unload", "rfx_activity", "orders", "outside_s2"]].copy()
+    out["late_minutes"] = stops["late_min"]
+    out["actual"] = _fmt_at(stops["actual_first_at"])
+    out["win_until"] = _fmt_at(stops["win_until_first_at"])
+    out["planned"] = _fmt_at(stops["planned_first_at"])
+    return out
 
 # ------------------------------------------------------------
 # JIT OUTSIDE (S2) – per dag aantal leverpunten buiten JIT + detail link
@@ -1148,8 +1718,7 @@ def jit_outside_daily_html(
     date_to: Optional[str] = Query(None),
     rfx_activity: Optional[str] = Query(None),
 ):
-    df = load_orders(date_from=date_from, date_to=date_to, rfx_activity=rfx_activity)
-    stops = _stop_level_outside_s2(df)
+    kpi = load_kpi(["date_dos", "nm_short_unload"], date_from=date_from, date_to=date_to, rfx_activity=rfx_activity)
 
     filter_html = f"""
     <form class="inline" method="get" action="/jit_outside_daily_html">
@@ -1164,14 +1733,15 @@ def jit_outside_daily_html(
     </form>
     """
 
-    if stops.empty:
+    if kpi.empty:
         return _layout("JIT outside – daily", f"<h1>Leverpunten buiten JIT (S2) – per dag</h1><p class='sub'>Geen data.</p>{filter_html}")
 
+    kpi = kpi[kpi["deliveries"] > 0]
     daily = (
-        stops.groupby("date_dos", as_index=False)
+        kpi.groupby("date_dos", as_index=False, observed=True)
         .agg(
             leverpunten=("nm_short_unload", "nunique"),
-            leverpunten_outside=("outside_s2", lambda s: int(s.sum())),
+            leverpunten_outside=("outside_s2", "sum"),
         )
         .sort_values("date_dos", ascending=True)
     )
@@ -1231,8 +1801,7 @@ def jit_outside_points_html(
     date: str,
     rfx_activity: Optional[str] = Query(None),
 ):
-    df = load_orders(date_from=date, date_to=date, rfx_activity=(rfx_activity or None))
-    stops = _stop_level_outside_s2(df)
+    stops = _outside_s2_stops(load_stops(date_from=date, date_to=date, rfx_activity=(rfx_activity or None)))
     if stops.empty:
         return _layout("Outside leverpunten", f"<h1>Outside JIT – {date}</h1><p class='sub'>Geen data.</p><p><a class='btn' href='/jit_outside_daily_html'>⬅️ Terug</a></p>")
 
@@ -1309,8 +1878,7 @@ def outside_jit_daily_html(
     date_to: Optional[str] = Query(None),
     rfx_activity: Optional[str] = Query(None),
 ):
-    df = load_orders(date_from=date_from, date_to=date_to, rfx_activity=rfx_activity)
-    stops = _stop_level_outside_s2(df)
+    kpi = load_kpi(["date_dos"], date_from=date_from, date_to=date_to, rfx_activity=rfx_activity)
 
     filter_html = f"""
     <form class="inline" method="get" action="/outside_jit_daily_html">
@@ -1325,50 +1893,20 @@ def outside_jit_daily_html(
     </form>
     """
 
-    if stops.empty:
+    if kpi.empty:
         return _layout("Buckets outside JIT", f"<h1>Analyse buiten JIT per dag (buckets)</h1><p class='sub'>Geen data.</p>{filter_html}")
 
-    deliveries_all = stops.groupby(["date_dos", "cnr_tour", "nm_short_unload"], as_index=False).size()
-    totals_day = deliveries_all.groupby("date_dos", as_index=False).size().rename(columns={"size": "total_deliveries"})
-
-    outside = stops[stops["outside_s2"] == True].copy()  # noqa: E712
-
-    def bucket(v: object) -> str:
-        if v is None or pd.isna(v):
-            return "unknown"
-        x = float(v)
-        if x <= 15:
-            return "0-15"
-        if x <= 30:
-            return "15-30"
-        if x <= 45:
-            return "30-45"
-        if x <= 60:
-            return "45-60"
-        return "60+"
-
-    outside["bucket"] = outside["late_minutes"].apply(bucket)
+    # Buckets (min te laat) komen voorgeteld uit kpi_day; enkel dagen met leveringen buiten JIT
+    buckets = {"late_0_15": "0-15", "late_15_30": "15-30", "late_30_45": "30-45", "late_45_60": "45-60", "late_60_plus": "60+", "late_unknown": "unknown"}
     labels = ["0-15", "15-30", "30-45", "45-60", "60+"]
-
-    summary = (
-        outside.groupby(["date_dos", "bucket"], as_index=False)
-        .size()
-        .rename(columns={"size": "outside_cnt"})
+    pivot = (
+        kpi[kpi["outside_s2"] > 0]
+        .rename(columns={**buckets, "deliveries": "total_deliveries"})
+        [["date_dos", *buckets.values(), "total_deliveries"]]
+        .astype({c: int for c in [*buckets.values(), "total_deliveries"]})
+        .reset_index(drop=True)
     )
 
-    pivot_cnt = (
-        summary.pivot(index="date_dos", columns="bucket", values="outside_cnt")
-        .fillna(0)
-        .astype(int)
-        .reset_index()
-    )
-    for c in labels + ["unknown"]:
-        if c not in pivot_cnt.columns:
-            pivot_cnt[c] = 0
-
-    pivot = pivot_cnt.merge(totals_day, on="date_dos", how="left")
-    pivot["total_deliveries"] = pivot["total_deliveries"].fillna(0).astype(int)
-
     pivot["Totaal buiten JIT"] = pivot[labels + ["unknown"]].sum(axis=1)
 
     pivot["Huidige JIT%"] = pivot.apply(
@@ -1448,23 +1986,190 @@ def outside_jit_daily_html(
     """
     return _layout("Buckets outside JIT", body)
 
+# ============================================================
+# JIT% per tolerantie (analysis_views.jit_tolerance_sweep)
+# ============================================================
+SWEEP_ORDER_COLUMNS = ["date_dos", "cnr_tour", "cnr_cust", "RFX Activity", "nm_short_unload", "Win FROM", "Win UNTIL", "Planned", "Actual"]
+
+# Lijnen in de grafiek: (kolom, label, kleur)
+SWEEP_SERIES = [
+    ("JIT%_lev_S1", "Leveringen S1", "#22c55e"),
+    ("JIT%_lev_S2", "Leveringen S2", "#38bdf8"),
+    ("JIT%_ord_S1", "Orders S1", "#f59e0b"),
+    ("JIT%_ord_S2", "Orders S2", "#a78bfa"),
+]
+
+def _parse_tolerances(raw: Optional[str]) -> List[float]:
+    """'0,5,10' -> [0.0, 5.0, 10.0]; max 50 waarden tussen 0 en 1440 minuten."""
+    if not raw or not raw.strip():
+        return [float(t) for t in analysis_views.SWEEP_TOLERANCES]
+    try:
+        values = sorted({float(v) for v in raw.replace(";", ",").split(",") if v.strip()})
+    except ValueError:
+        values = []
+    if not values or len(values) > 50 or values[0] < 0 or values[-1] > 1440:
+        raise HTTPException(status_code=400, detail="Ongeldige toleranties (bv. 0,5,10,15,30,60)")
+    return values
+
+def _svg_curve(summary: pd.DataFrame) -> str:
+    """Lijngrafiek JIT% vs tolerantie (inline SVG, geen externe bibliotheek)."""
+    w, h, left, right, top, bottom = 720, 300, 48, 150, 16, 36
+    x = summary["tolerantie_min"].astype(float).to_numpy()
+    values = summary[[c for c, _, _ in SWEEP_SERIES]].to_numpy(dtype=float)
+    y_min = max(0.0, np.floor(values.min() / 10.0) * 10.0 - 10.0) if len(values) else 0.0
+    x_span = (x.max() - x.min()) or 1.0
+
+    def px(v: float) -> float:
+        return left + (v - x.min()) / x_span * (w - left - right)
+
+    def py(v: float) -> float:
+        return top + (100.0 - v) / ((100.0 - y_min) or 1.0) * (h - top - bottom)
+
+    parts = []
+    for k in range(int(y_min), 101, 10):
+        parts.append(f'<line x1="{left}" x2="{w - right}" y1="{py(k):.1f}" y2="{py(k):.1f}" stroke="#1f2937"/>')
+        parts.append(f'<text x="{left - 6}" y="{py(k) + 4:.1f}" text-anchor="end" font-size="11" fill="#9ca3af">{k}%</text>')
+    for v in x:
+        parts.append(f'<text x="{px(v):.1f}" y="{h - bottom + 16}" text-anchor="middle" font-size="11" fill="#9ca3af">{v:g}</text>')
+    parts.append(f'<text x="{(left + w - right) / 2:.0f}" y="{h - 4}" text-anchor="middle" font-size="11" fill="#9ca3af">tolerantie (min)</text>')
+    for i, (col, label, color) in enumerate(SWEEP_SERIES):
+        pts = " ".join(f"{px(a):.1f},{py(b):.1f}" for a, b in zip(x, values[:, i]))
+        parts.append(f'<polyline points="{pts}" fill="none" stroke="{color}" stroke-width="2"/>')
+        parts.extend(f'<circle cx="{px(a):.1f}" cy="{py(b):.1f}" r="3" fill="{color}"/>' for a, b in zip(x, values[:, i]))
+        ly = top + 14 + i * 18
+        parts.append(f'<line x1="{w - right + 14}" x2="{w - right + 34}" y1="{ly - 4}" y2="{ly - 4}" stroke="{color}" stroke-width="2"/>')
+        parts.append(f'<text x="{w - right + 40}" y="{ly}" font-size="12" fill="#e5e7eb">{label}</text>')
+    return f'<svg viewBox="0 0 {w} {h}" width="100%" style="max-width:{w}px">{"".join(parts)}</svg>'
+
+def _sweep_pivot(table: pd.DataFrame, by: str, label: str, table_id: str) -> str:
+    """Eén rij per `by`, per tolerantie leveringen JIT% S1 / S2."""
+    tolerances = sorted(table["tolerantie_min"].unique())
+    headers = f"<th>{label}</th><th>Leveringen</th>" + "".join(f"<th>±{t:g} min (S1 / S2)</th>" for t in tolerances)
+    rows_html = ""
+    for key, g in table.groupby(by, sort=True):
+        g = g.set_index("tolerantie_min")
+        cells = "".join(
+            f'<td class="mono">{g.at[t, "JIT%_lev_S1"]:.2f}% / {g.at[t, "JIT%_lev_S2"]:.2f}%</td>' for t in tolerances
+        )
+        rows_html += f'<tr><td class="mono">{escape(str(key))}</td><td class="mono">{int(g["leveringen_totaal"].iloc[0])}</td>{cells}</tr>'
+    return f"""
+    <div class="topbar">
+      <h3 style="margin:0">Per {label.lower()}</h3>
+      <button class="copy-btn" onclick="copyTable('{table_id}')">📋 Kopieer tabel</button>
+    </div>
+    <div class="table-wrapper">
+      <table id="{table_id}">
+        <thead><tr>{headers}</tr></thead>
+        <tbody>{rows_html}</tbody>
+      </table>
+    </div>
+    """
+
+@app.get("/jit_tolerance_sweep_html", response_class=HTMLResponse)
+def jit_tolerance_sweep_html(
+    date_from: Optional[str] = Query(None),
+    date_to: Optional[str] = Query(None),
+    rfx_activity: Optional[str] = Query(None),
+    tolerances: Optional[str] = Query(None, description="minuten, bv. 0,5,10,15,30,60"),
+):
+    tol_values = _parse_tolerances(tolerances)
+    tol_text = ",".join(f"{t:g}" for t in tol_values)
+
+    filter_html = f"""
+    <form class="inline" method="get" action="/jit_tolerance_sweep_html">
+      <label class="small">Datum van</label>
+      <input type="date" name="date_from" value="{escape(date_from or '')}">
+      <label class="small">tot</label>
+      <input type="date" name="date_to" value="{escape(date_to or '')}">
+      <label class="small">RFX Activity</label>
+      <input type="text" name="rfx_activity" value="{escape(rfx_activity or '')}" placeholder="bv. 4 of 5">
+      <label class="small">Toleranties (min)</label>
+      <input type="text" name="tolerances" value="{tol_text}" style="width:180px">
+      <button type="submit" class="btn">Toon</button>
+      <a href="/jit_tolerance_sweep_html" class="btn">Reset</a>
+    </form>
+    """
+
+    df = load_orders(date_from, date_to, rfx_activity, columns=SWEEP_ORDER_COLUMNS)
+    sweep = analysis_views.jit_tolerance_sweep(df, tol_values) if not df.empty else None
+    if sweep is None or sweep["summary"].empty:
+        body = f"<h1>JIT% per tolerantie</h1><p class='sub'>Geen data voor RFX Activity 4/5.</p>{filter_html}"
+        return _layout("JIT% per tolerantie", body)
+
+    summary = sweep["summary"]
+    rows_html = "".join(
+        f"""
+        <tr>
+          <td class="mono">±{r['tolerantie_min']:g}</td>
+          <td class="mono">{int(r['leveringen_totaal'])}</td>
+          <td class="mono">{int(r['leveringen_jit_S1'])}</td>
+          <td class="mono">{r['JIT%_lev_S1']:.2f}%</td>
+          <td class="mono">{int(r['leveringen_jit_S2'])}</td>
+          <td class="mono">{r['JIT%_lev_S2']:.2f}%</td>
+          <td class="mono">{int(r['orders_totaal'])}</td>
+          <td class="mono">{r['JIT%_ord_S1']:.2f}%</td>
+          <td class="mono">{r['JIT%_ord_S2']:.2f}%</td>
+        </tr>
+        """
+        for _, r in summary.iterrows()
+    )
+    summary_html = f"""
+    <div class="topbar">
+      <h3 style="margin:0">Totaal</h3>
+      <button class="copy-btn" onclick="copyTable('tblSweep')">📋 Kopieer tabel</button>
+    </div>
+    <div class="table-wrapper">
+      <table id="tblSweep">
+        <thead><tr>
+          <th>Tolerantie (min)</th><th>Leveringen</th>
+          <th>JIT S1 leveringen</th><th>JIT S1 %</th><th>JIT S2 leveringen</th><th>JIT S2 %</th>
+          <th>Orders</th><th>JIT S1 % orders</th><th>JIT S2 % orders</th>
+        </tr></thead>
+        <tbody>{rows_html}</tbody>
+      </table>
+    </div>
+    """
+
+    body = f"""
+    <h1>JIT% per tolerantie</h1>
+    <p class="sub">RFX Activity 4 &amp; 5. S1: Win FROM − tol ≤ Actual ≤ Win UNTIL + tol; S2: Actual ≤ Win UNTIL + tol.
+    Levering = dag, route, klant, winkelpunt en levervenster (zoals het JIT-rapport).</p>
+    {filter_html}
+    <br/>
+    <div class="card">{_svg_curve(summary)}</div>
+    <br/>
+    {summary_html}
+    <br/>
+    {_sweep_pivot(sweep["by_channel"], "kanaal", "Kanaal", "tblSweepChannel")}
+    <br/>
+    {_sweep_pivot(sweep["daily_overview"], "date_dos", "Dag", "tblSweepDaily")}
+    <p style="margin-top:14px"><a class="btn" href="/">⬅️ Dashboard</a></p>
+    """
+    return _layout("JIT% per tolerantie", body)
+
 # ============================================================
 # RCA – Delay drivers (proxy) + detail
 # ============================================================
-def _minutes(td: pd.Timedelta) -> float:
-    if pd.isna(td):
-        return float("nan")
-    return td.total_seconds() / 60.0
-
-def _safe_dt(date_s: str, time_s: object) -> pd.Timestamp:
-    if pd.isna(time_s):
-        return pd.NaT
-    s = str(time_s).strip()
-    if s.lower() in ("", "nan", "none"):
-        return pd.NaT
-    if len(s) == 5 and s[2] == ":":
-        s = s + ":00"
-    return pd.to_datetime(f"{date_s} {s}", errors="coerce")
+def _rca_stops(stops: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """
+    Stop-level voor RCA uit de stops tabel: `keys` als tekst, tijden van de
+    eerste order met een waarde (`*_at` in absolute minuten).
+    - wait_min = DurationA
+    - late_min = max(0, Actual − Win UNTIL)
+    """
+    out = pd.DataFrame(index=stops.index)
+    for k in keys:
+        out[k] = stops[k].astype(str)
+    out["orders"] = stops["orders"]
+    # Als float (zoals de oude datetime-verschillen), ook als geen enkele tijd ontbreekt
+    out["planned_at"] = stops["planned_first_at"].astype(float)
+    out["actual_at"] = stops["actual_first_at"].astype(float)
+    out["a_depart_at"] = stops["a_depart_first_at"].astype(float)
+    for prefix in ("planned", "actual", "a_depart", "win_until"):
+        out[prefix] = _fmt_at(stops[f"{prefix}_first_at"])
+    out["wait_min"] = stops["duration_a"].astype(float)
+    out["late_min"] = (out["actual_at"] - stops["win_until_first_at"].astype(float)).clip(lower=0.0)
+    return out.reset_index(drop=True)
 
 @app.get("/rca_delay_drivers_html", response_class=HTMLResponse)
 def rca_delay_drivers_html(
@@ -1472,7 +2177,7 @@ def rca_delay_drivers_html(
     date_to: Optional[str] = Query(None),
     rfx_activity: Optional[str] = Query(None),
 ):
-    df = load_orders(date_from=date_from, date_to=date_to, rfx_activity=rfx_activity)
+    df = load_stops(date_from=date_from, date_to=date_to, rfx_activity=rfx_activity)
 
     filter_html = f"""
     <form class="inline" method="get" action="/rca_delay_drivers_html">
@@ -1491,62 +2196,25 @@ def rca_delay_drivers_html(
         return _layout("RCA – Delay drivers", f"<h1>RCA – Delay drivers</h1><p class='sub'>Geen data.</p>{filter_html}")
 
     # stop-level per route/leverpunt (1 rij per leverpunt)
-    stop_rows = []
-    has_durationA = "DurationA" in df.columns
-    for (d, tour, shop, act), g in df.groupby(["date_dos", "cnr_tour", "nm_short_unload", "RFX Activity"], dropna=False):
-        d = str(d)
-        planned_dt = _safe_dt(d, g["Planned"].iloc[0] if "Planned" in g.columns else None)
-        actual_dt = _safe_dt(d, g["Actual"].iloc[0] if "Actual" in g.columns else None)
-        a_depart_dt = _safe_dt(d, g["A_Depart"].iloc[0] if "A_Depart" in g.columns else None)
-        win_until_dt = _safe_dt(d, g["Win UNTIL"].iloc[0] if "Win UNTIL" in g.columns else None)
-
-        if has_durationA:
-            w = pd.to_numeric(g["DurationA"].iloc[0], errors="coerce")
-            wait_min = float(w) if pd.notna(w) else float("nan")
-        else:
-            wait_min = _minutes(a_depart_dt - actual_dt)
-
-        late_min = _minutes(actual_dt - win_until_dt)
-        late_min = max(0.0, late_min) if pd.notna(late_min) else float("nan")
-
-        stop_rows.append(
-            dict(
-                date_dos=d,
-                cnr_tour=str(tour),
-                rfx_activity=str(act),
-                nm_short_unload=str(shop),
-                planned_dt=planned_dt,
-                actual_dt=actual_dt,
-                a_depart_dt=a_depart_dt,
-                planned=_fmt_hhmm(g["Planned"].iloc[0]) if "Planned" in g.columns else "",
-                actual=_fmt_hhmm(g["Actual"].iloc[0]) if "Actual" in g.columns else "",
-                a_depart=_fmt_hhmm(g["A_Depart"].iloc[0]) if "A_Depart" in g.columns else "",
-                win_until=_fmt_hhmm(g["Win UNTIL"].iloc[0]) if "Win UNTIL" in g.columns else "",
-                wait_min=wait_min,
-                late_min=late_min,
-                orders=len(g),
-            )
-        )
-
-    stops = pd.DataFrame(stop_rows)
+    stops = _rca_stops(df, ["date_dos", "cnr_tour", "nm_short_unload", "rfx_activity"])
     if stops.empty:
         return _layout("RCA – Delay drivers", f"<h1>RCA – Delay drivers</h1><p class='sub'>Geen stopdata.</p>{filter_html}")
 
-    stops = stops.sort_values(["date_dos", "cnr_tour", "planned_dt", "nm_short_unload"])
+    stops = stops.sort_values(["date_dos", "cnr_tour", "planned_at", "nm_short_unload"])
 
     # proxy decompositie
     tmp = stops.copy()
-    tmp["prev_a_depart"] = tmp.groupby(["date_dos", "cnr_tour"])["a_depart_dt"].shift(1)
-    tmp["prev_planned"] = tmp.groupby(["date_dos", "cnr_tour"])["planned_dt"].shift(1)
+    tmp["prev_a_depart"] = tmp.groupby(["date_dos", "cnr_tour"], observed=True)["a_depart_at"].shift(1)
+    tmp["prev_planned"] = tmp.groupby(["date_dos", "cnr_tour"], observed=True)["planned_at"].shift(1)
 
-    tmp["transit_actual_min"] = (tmp["actual_dt"] - tmp["prev_a_depart"]).apply(_minutes)
-    tmp["transit_planned_min"] = (tmp["planned_dt"] - tmp["prev_planned"]).apply(_minutes)
+    tmp["transit_actual_min"] = tmp["actual_at"] - tmp["prev_a_depart"]
+    tmp["transit_planned_min"] = tmp["planned_at"] - tmp["prev_planned"]
     tmp["transit_delay_min"] = tmp["transit_actual_min"] - tmp["transit_planned_min"]
-    tmp["late_departure_proxy_min"] = (tmp["prev_a_depart"] - tmp["prev_planned"]).apply(_minutes)
+    tmp["late_departure_proxy_min"] = tmp["prev_a_depart"] - tmp["prev_planned"]
 
     route_decomp = (
         tmp.dropna(subset=["prev_a_depart", "prev_planned"])
-        .groupby(["date_dos", "cnr_tour", "rfx_activity"], as_index=False)
+        .groupby(["date_dos", "cnr_tour", "rfx_activity"], as_index=False, observed=True)
         .agg(
             stops=("nm_short_unload", "count"),
             total_wait_min=("wait_min", "sum"),
@@ -1572,13 +2240,13 @@ def rca_delay_drivers_html(
 
     stops["late_bucket"] = stops["late_min"].apply(_bucket)
     buckets = (
-        stops.groupby(["date_dos", "rfx_activity", "late_bucket"], as_index=False)
+        stops.groupby(["date_dos", "rfx_activity", "late_bucket"], as_index=False, observed=True)
         .agg(leverpunten=("nm_short_unload", "nunique"))
         .sort_values(["date_dos", "rfx_activity", "late_bucket"])
     )
 
     cust_day = (
-        stops.groupby(["date_dos", "rfx_activity"], as_index=False)
+        stops.groupby(["date_dos", "rfx_activity"], as_index=False, observed=True)
         .agg(
             leverpunten=("nm_short_unload", "nunique"),
             routes=("cnr_tour", "nunique"),
@@ -1676,44 +2344,11 @@ def rca_delay_drivers_html(
 
 @app.get("/rca_delay_drivers_detail_html", response_class=HTMLResponse)
 def rca_delay_drivers_detail_html(date: str, rfx_activity: str):
-    df = load_orders(date_from=date, date_to=date, rfx_activity=rfx_activity)
+    df = load_stops(date_from=date, date_to=date, rfx_activity=rfx_activity)
     if df.empty:
         return _layout("RCA detail", f"<h1>RCA detail</h1><p class='sub'>Geen data voor {date} / RFX {rfx_activity}</p>")
 
-    rows = []
-    has_durationA = "DurationA" in df.columns
-    for (tour, shop), g in df.groupby(["cnr_tour", "nm_short_unload"], dropna=False):
-        d = str(g["date_dos"].iloc[0])
-        planned_dt = _safe_dt(d, g["Planned"].iloc[0] if "Planned" in g.columns else None)
-        actual_dt = _safe_dt(d, g["Actual"].iloc[0] if "Actual" in g.columns else None)
-        a_depart_dt = _safe_dt(d, g["A_Depart"].iloc[0] if "A_Depart" in g.columns else None)
-        win_until_dt = _safe_dt(d, g["Win UNTIL"].iloc[0] if "Win UNTIL" in g.columns else None)
-
-        if has_durationA:
-            w = pd.to_numeric(g["DurationA"].iloc[0], errors="coerce")
-            wait_min = float(w) if pd.notna(w) else float("nan")
-        else:
-            wait_min = _minutes(a_depart_dt - actual_dt)
-
-        late_min = _minutes(actual_dt - win_until_dt)
-        late_min = max(0.0, late_min) if pd.notna(late_min) else float("nan")
-
-        rows.append(
-            dict(
-                cnr_tour=str(tour),
-                nm_short_unload=str(shop),
-                orders=len(g),
-                planned=_fmt_hhmm(g["Planned"].iloc[0]) if "Planned" in g.columns else "",
-                actual=_fmt_hhmm(g["Actual"].iloc[0]) if "Actual" in g.columns else "",
-                a_depart=_fmt_hhmm(g["A_Depart"].iloc[0]) if "A_Depart" in g.columns else "",
-                win_until=_fmt_hhmm(g["Win UNTIL"].iloc[0]) if "Win UNTIL" in g.columns else "",
-                wait_min=wait_min,
-                late_min=late_min,
-                planned_dt=planned_dt,
-            )
-        )
-
-    stops = pd.DataFrame(rows).sort_values(["wait_min"], ascending=[False])
+    stops = _rca_stops(df, ["cnr_tour", "nm_short_unload"]).sort_values(["wait_min"], ascending=[False])
 
     headers = """
       <th>Route</th>
@@ -1779,103 +2414,35 @@ def rca_delay_drivers_detail_html(date: str, rfx_activity: str):
 # ============================================================
 # TRANSPORT MANAGER ANALYSE
 # ============================================================
-def _minutes_between(a: pd.Timestamp, b: pd.Timestamp) -> float:
-    if pd.isna(a) or pd.isna(b):
-        return float("nan")
-    return (a - b).total_seconds() / 60.0
-
-def _route_departure_delay(df_route: pd.DataFrame) -> float:
-    """
-    Route-level: A_Depart vs P_Depart (minuten).
-    Neemt eerste niet-lege waarde in de route.
-    """
-    if df_route.empty:
-        return float("nan")
-
-    d = str(df_route["date_dos"].iloc[0])
-
-    p = None
-    a = None
-    if "P_Depart" in df_route.columns and df_route["P_Depart"].notna().any():
-        p = df_route.loc[df_route["P_Depart"].notna(), "P_Depart"].iloc[0]
-    if "A_Depart" in df_route.columns and df_route["A_Depart"].notna().any():
-        a = df_route.loc[df_route["A_Depart"].notna(), "A_Depart"].iloc[0]
-
-    if p is None or a is None:
-        return float("nan")
-
-    p_dt = pd.to_datetime(f"{d} {_fmt_hhmm(p)}", format="%Y-%m-%d %H:%M", errors="coerce")
-    a_dt = pd.to_datetime(f"{d} {_fmt_hhmm(a)}", format="%Y-%m-%d %H:%M", errors="coerce")
-    return _minutes_between(a_dt, p_dt)
-
-def _stop_level_for_transport(df: pd.DataFrame) -> pd.DataFrame:
+def _stop_level_for_transport(stops: pd.DataFrame) -> pd.DataFrame:
     """
-    1 rij per leverpunt (date_dos, cnr_tour, nm_short_unload)
-    - planned_dt, actual_dt, a_depart_dt
+    1 rij per leverpunt uit de stops tabel
+    - planned_at, actual_at, a_depart_at (vroegste, minuten sinds 1970-01-01)
     - planned_block_min (DurationP)
     - actual_block_min (DurationA of fallback A_Depart - Actual)
-    - seq planned vs actual
+    - seq planned vs actual (posities binnen de route, bij ingest berekend)
     """
-    if df.empty:
-        return df
-
-    tmp = df.copy()
-    tmp["planned_dt"] = _combine_datetime(tmp, "date_dos", "Planned") if "Planned" in tmp.columns else pd.NaT
-    tmp["actual_dt"] = _combine_datetime(tmp, "date_dos", "Actual") if "Actual" in tmp.columns else pd.NaT
-    tmp["a_depart_dt"] = _combine_datetime(tmp, "date_dos", "A_Depart") if "A_Depart" in tmp.columns else pd.NaT
-
-    grp = ["date_dos", "cnr_tour", "nm_short_unload"]
-    stops = (
-        tmp.groupby(grp, as_index=False)
-        .agg(
-            rfx_activity=("RFX Activity", "first"),
-            planned_dt=("planned_dt", "min"),
-            actual_dt=("actual_dt", "min"),
-            a_depart_dt=("a_depart_dt", "min"),
-            planned=("Planned", "first"),
-            actual=("Actual", "first"),
-            a_depart=("A_Depart", "first") if "A_Depart" in tmp.columns else ("cnr_cust", "count"),
-            durationP=("DurationP", "first") if "DurationP" in tmp.columns else ("cnr_cust", "count"),
-            durationA=("DurationA", "first") if "DurationA" in tmp.columns else ("cnr_cust", "count"),
-            orders=("cnr_cust", "count"),
-        )
-    )
-
-    if "DurationP" in tmp.columns:
-        stops["planned_block_min"] = pd.to_numeric(stops["durationP"], errors="coerce")
-    else:
-        stops["planned_block_min"] = pd.NA
-
-    if "DurationA" in tmp.columns:
-        stops["actual_block_min"] = pd.to_numeric(stops["durationA"], errors="coerce")
-    else:
-        stops["actual_block_min"] = pd.NA
-
-    missing = stops["actual_block_min"].isna()
-    if missing.any():
-        fallback = (stops["a_depart_dt"] - stops["actual_dt"]).dt.total_seconds() / 60.0
-        stops.loc[missing, "actual_block_min"] = fallback.loc[missing]
-
-    stops["arrival_delta_min"] = (stops["actual_dt"] - stops["planned_dt"]).dt.total_seconds() / 60.0
-    stops["delta_block_min"] = stops["actual_block_min"] - stops["planned_block_min"]
-
-    stops["planned"] = stops["planned"].apply(_fmt_hhmm)
-    stops["actual"] = stops["actual"].apply(_fmt_hhmm)
-    stops["a_depart"] = stops["a_depart"].apply(_fmt_hhmm)
-
-    s_pl = stops.sort_values(["planned_dt", "nm_short_unload"]).copy()
-    s_pl["planned_pos"] = range(1, len(s_pl) + 1)
-
-    s_ac = stops.sort_values(["actual_dt", "nm_short_unload"]).copy()
-    s_ac["actual_pos"] = range(1, len(s_ac) + 1)
-
-    out = s_pl.merge(
-        s_ac[["date_dos", "cnr_tour", "nm_short_unload", "actual_pos"]],
-        on=["date_dos", "cnr_tour", "nm_short_unload"],
-        how="left",
-    )
+    if stops.empty:
+        return stops
+
+    out = stops[["date_dos", "cnr_tour", "nm_short_unload", "rfx_activity", "orders"]].copy()
+    out["planned_at"] = stops["planned_min_at"]
+    out["actual_at"] = stops["actual_min_at"]
+    out["a_depart_at"] = stops["a_depart_min_at"]
+    out["planned"] = _fmt_at(stops["planned_first_at"])
+    out["actual"] = _fmt_at(stops["actual_first_at"])
+    out["a_depart"] = _fmt_at(stops["a_depart_first_at"])
+
+    out["planned_block_min"] = stops["duration_p"]
+    out["actual_block_min"] = stops["duration_a"].fillna(out["a_depart_at"] - out["actual_at"])
+    out["arrival_delta_min"] = out["actual_at"] - out["planned_at"]
+    out["delta_block_min"] = out["actual_block_min"] - out["planned_block_min"]
+
+    out["planned_pos"] = stops["planned_pos"]
+    out["actual_pos"] = stops["actual_pos"]
     out["seq_delta"] = out["actual_pos"] - out["planned_pos"]
-    return out
+    out["dep_delay_min"] = stops["route_dep_delay_min"]
+    return out.sort_values(["date_dos", "cnr_tour", "planned_pos"]).reset_index(drop=True)
 
 @app.get("/transport_manager_html", response_class=HTMLResponse)
 def transport_manager_html(
@@ -1884,7 +2451,9 @@ def transport_manager_html(
     rfx_activity: Optional[str] = Query(None),
     cnr_tour: Optional[str] = Query(None),
 ):
-    df = load_orders(date_from=date_from, date_to=date_to, rfx_activity=rfx_activity, cnr_tour=cnr_tour)
+    stops = _stop_level_for_transport(
+        load_stops(date_from=date_from, date_to=date_to, rfx_activity=rfx_activity, cnr_tour=cnr_tour)
+    )
 
     filter_html = f"""
     <form class="inline" method="get" action="/transport_manager_html">
@@ -1901,7 +2470,7 @@ def transport_manager_html(
     </form>
     """
 
-    if df.empty:
+    if stops.empty:
         body = f"""
         <h1>Transport manager analyse</h1>
         <p class="sub">Geen data binnen filters.</p>
@@ -1910,37 +2479,29 @@ def transport_manager_html(
         """
         return _layout("Transport analyse", body)
 
-    rows = []
-    for (d, tour), g in df.groupby(["date_dos", "cnr_tour"]):
-        g = g.copy()
-        stops = _stop_level_for_transport(g)
-
-        dep_delay = _route_departure_delay(g)
-
-        n_stops = int(stops["nm_short_unload"].nunique())
-        mism = int((stops["seq_delta"].fillna(0) != 0).sum())
-        max_abs = float(stops["seq_delta"].abs().max()) if len(stops) else 0.0
-
-        planned_total = float(pd.to_numeric(stops["planned_block_min"], errors="coerce").fillna(0).sum())
-        actual_total = float(pd.to_numeric(stops["actual_block_min"], errors="coerce").fillna(0).sum())
-        delta_total = actual_total - planned_total
-
-        rows.append(
-            {
-                "date_dos": str(d),
-                "cnr_tour": str(tour),
-                "rfx_activity": str(g["RFX Activity"].iloc[0]) if "RFX Activity" in g.columns else "",
-                "leverpunten": n_stops,
-                "seq_mismatch_cnt": mism,
-                "max_abs_seq_delta": int(max_abs) if pd.notna(max_abs) else 0,
-                "dep_delay_min": dep_delay,
-                "planned_block_total_min": planned_total,
-                "actual_block_total_min": actual_total,
-                "delta_block_total_min": delta_total,
-            }
+    out = (
+        stops.assign(
+            seq_mismatch=stops["seq_delta"].fillna(0) != 0,
+            abs_seq_delta=stops["seq_delta"].abs(),
+            planned_block=stops["planned_block_min"].fillna(0),
+            actual_block=stops["actual_block_min"].fillna(0),
         )
-
-    out = pd.DataFrame(rows).sort_values(["date_dos", "delta_block_total_min"], ascending=[True, False])
+        .groupby(["date_dos", "cnr_tour"], as_index=False, observed=True)
+        .agg(
+            rfx_activity=("rfx_activity", "first"),
+            leverpunten=("nm_short_unload", "nunique"),
+            seq_mismatch_cnt=("seq_mismatch", "sum"),
+            max_abs_seq_delta=("abs_seq_delta", "max"),
+            dep_delay_min=("dep_delay_min", "first"),
+            planned_block_total_min=("planned_block", "sum"),
+            actual_block_total_min=("actual_block", "sum"),
+        )
+    )
+    out["max_abs_seq_delta"] = out["max_abs_seq_delta"].fillna(0).astype(int)
+    out["delta_block_total_min"] = out["actual_block_total_min"] - out["planned_block_total_min"]
+    out["cnr_tour"] = out["cnr_tour"].astype(str)
+    out["rfx_activity"] = out["rfx_activity"].astype(str)
+    out = out.sort_values(["date_dos", "delta_block_total_min"], ascending=[True, False])
 
     headers = """
       <th>Datum</th>
@@ -2011,12 +2572,11 @@ def transport_manager_html(
 
 @app.get("/transport_route_detail_html", response_class=HTMLResponse)
 def transport_route_detail_html(date: str, cnr_tour: str):
-    df = load_orders(date_from=date, date_to=date, cnr_tour=cnr_tour)
-    if df.empty:
+    stops = _stop_level_for_transport(load_stops(date_from=date, date_to=date, cnr_tour=cnr_tour))
+    if stops.empty:
         return _layout("Transport route detail", f"<h1>Transport detail</h1><p class='sub'>Geen data voor {date} / route {cnr_tour}</p>")
 
-    stops = _stop_level_for_transport(df)
-    dep_delay = _route_departure_delay(df)
+    dep_delay = stops["dep_delay_min"].iloc[0]
 
     # TABEL 1: Sequence
     seq = stops.copy().sort_values(["planned_pos"])
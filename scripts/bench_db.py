@@ -0,0 +1,100 @@
+# ================================================================
+# scripts/bench_db.py – rijen/s voor inserts en range scans (jit_rca.db)
+#
+# Gebruik:
+#   python scripts/bench_db.py [--rows 200000] [--days 60]
+#
+# Vergelijkt de oude werkwijze (nieuwe verbinding per call, standaard
+# journal, dict per rij) met bulk_load + gechunkte transacties en de
+# DataFrame / kolom-varianten van query_between.
+# ================================================================
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from jit_rca import db  # noqa: E402
+
+
+def _rows(n: int, days: int):
+    start = dt.date(2024, 1, 1)
+    for i in range(n):
+        d = (start + dt.timedelta(days=i % days)).isoformat()
+        yield (
+            f"u{i}", str(776900 + i % 400), f"Z4110{i % 5}", f"ST{100 + i % 40}", "cust", "site",
+            "06:00", "06:12", d, "06:00", "06:12", "{}",
+        )
+
+
+def _report(label: str, rows: int, seconds: float) -> None:
+    print(f"{label:<42} {rows:>10,} rijen {seconds:8.3f}s {rows / seconds:>12,.0f} rijen/s")
+
+
+def bench_insert_naive(path: Path, n: int, days: int, batch: int) -> None:
+    # Zoals voorheen: nieuwe verbinding + commit per insert_many-call, standaard journal
+    conn = sqlite3.connect(str(path))
+    conn.executescript(db.SCHEMA_SQL)
+    conn.close()
+    rows = list(_rows(n, days))
+    t0 = time.perf_counter()
+    for start in range(0, n, batch):
+        conn = sqlite3.connect(str(path))
+        with conn:
+            conn.executemany(db.INSERT_SQL, rows[start:start + batch])
+        conn.close()
+    _report(f"insert: verbinding per call ({batch}/call)", n, time.perf_counter() - t0)
+
+
+def bench_insert_bulk(path: Path, n: int, days: int) -> None:
+    rows = list(_rows(n, days))
+    t0 = time.perf_counter()
+    with db.bulk_load(path) as conn:
+        db.insert_many(rows, conn=conn)
+    _report(f"insert: bulk_load (WAL, {db.CHUNK_ROWS}/tx)", n, time.perf_counter() - t0)
+
+
+def bench_scans(path: Path, days: int) -> None:
+    date_from = "2024-01-01"
+    date_to = (dt.date(2024, 1, 1) + dt.timedelta(days=days // 2)).isoformat()
+    conn = db.connect(path)
+
+    t0 = time.perf_counter()
+    n = len(db.query_between(date_from, date_to, conn=conn))
+    _report("scan: query_between (dict per rij)", n, time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    n = len(db.query_between_df(date_from, date_to, conn=conn))
+    _report("scan: query_between_df", n, time.perf_counter() - t0)
+
+    cols = ["cnr_tour", "nm_short_unload", "planned_time", "actual_time", "date_dos"]
+    t0 = time.perf_counter()
+    res = db.query_between_columns(date_from, date_to, columns=cols, conn=conn)
+    _report("scan: query_between_columns (5 kolommen)", len(res["date_dos"]), time.perf_counter() - t0)
+    conn.close()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark van jit_rca.db inserts en range scans.")
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--days", type=int, default=60)
+    ap.add_argument("--batch", type=int, default=1_000, help="rijen per call voor de oude werkwijze")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_insert_naive(Path(tmp) / "naive.db", args.rows, args.days, args.batch)
+        bulk = Path(tmp) / "bulk.db"
+        bench_insert_bulk(bulk, args.rows, args.days)
+        bench_scans(bulk, args.days)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
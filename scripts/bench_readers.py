@@ -0,0 +1,79 @@
+# ================================================================
+# scripts/bench_readers.py – vergelijk reader engines voor OTIF exports
+#
+# Gebruik:
+#   python scripts/bench_readers.py export.xlsx export.csv [--repeat 3]
+#
+# Per bestand en per geïnstalleerde engine: leestijd, rijen/s en een
+# controle dat normalize_orders() exact hetzelfde resultaat geeft als
+# de referentie (pd.read_excel / pd.read_csv met dtype=str).
+# ================================================================
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from jit_rca.ingest import normalize_orders  # noqa: E402
+from jit_rca.readers import available_engines, iter_file_chunks  # noqa: E402
+
+
+def _reference(path: Path) -> pd.DataFrame:
+    if path.suffix.lower() == ".csv":
+        df = pd.read_csv(path, dtype=str, sep=None, engine="python", encoding="utf-8-sig")
+    else:
+        df = pd.read_excel(path, dtype=str)
+    return df
+
+
+def _read(path: Path, engine: str) -> pd.DataFrame:
+    chunks = list(iter_file_chunks(path, engine=engine))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+
+def _time(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark van de xlsx/csv reader engines.")
+    ap.add_argument("files", nargs="+")
+    ap.add_argument("--repeat", type=int, default=3, help="beste van N runs (standaard: 3)")
+    args = ap.parse_args()
+
+    engines = available_engines()
+    print(f"Geïnstalleerde engines: excel={engines['excel']}, csv={engines['csv']}")
+    print(f"{'bestand':<30} {'engine':<16} {'rijen':>8} {'tijd (s)':>9} {'rijen/s':>10}  identiek")
+
+    ok = True
+    for f in args.files:
+        path = Path(f)
+        kind = "csv" if path.suffix.lower() == ".csv" else "excel"
+
+        t_ref, ref = _time(lambda: _reference(path), args.repeat)
+        ref_norm = normalize_orders(ref.copy())
+        print(f"{path.name:<30} {'pandas (ref)':<16} {len(ref):>8,} {t_ref:>9.3f} {len(ref) / t_ref:>10,.0f}  -")
+
+        for engine in engines[kind]:
+            t, df = _time(lambda: _read(path, engine), args.repeat)
+            same = normalize_orders(df.copy()).equals(ref_norm)
+            ok &= same
+            print(f"{'':<30} {engine:<16} {len(df):>8,} {t:>9.3f} {len(df) / t:>10,.0f}  {'ja' if same else 'NEE'}")
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
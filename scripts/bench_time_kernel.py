@@ -0,0 +1,123 @@
+# ================================================================
+# scripts/bench_time_kernel.py – doorvoer van de tijdkernel (jit_rca.timekernel)
+#
+# Gebruik:
+#   python scripts/bench_time_kernel.py [--rows 1000000] [--repeat 3]
+#
+# Genereert een kolom "H:MM" / "HH:MM" / "HH:MM:SS" tijden (met lege
+# waarden) en vergelijkt de vroegere werkwijzen (pd.to_datetime +
+# strftime, to_timedelta met .apply, str.format per waarde) met
+# parse_minutes / format_hhmm. Toont miljoen waarden/s en controleert
+# dat alle varianten dezelfde minuten en dezelfde tekst geven.
+# ================================================================
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from jit_rca.timekernel import format_hhmm, parse_minutes  # noqa: E402
+
+
+def _values(n: int) -> pd.Series:
+    rng = np.random.default_rng(0)
+    minutes = rng.integers(0, 1440, n)
+    h, m = np.divmod(minutes, 60)
+    kind = rng.integers(0, 10, n)
+    text = np.where(
+        kind < 5,
+        np.char.add(np.char.add(np.char.zfill(h.astype(str), 2), ":"), np.char.zfill(m.astype(str), 2)),
+        np.where(
+            kind < 8,
+            np.char.add(np.char.add(h.astype(str), ":"), np.char.zfill(m.astype(str), 2)),
+            np.char.add(np.char.add(np.char.add(np.char.zfill(h.astype(str), 2), ":"), np.char.zfill(m.astype(str), 2)), ":00"),
+        ),
+    ).astype(object)
+    text[kind == 9] = None
+    return pd.Series(text)
+
+
+def _old_to_datetime(s: pd.Series) -> np.ndarray:
+    # Zoals normalize_orders: pd.to_datetime per kolom; "mixed" want de notaties zijn gemengd
+    t = pd.to_datetime(s, errors="coerce", format="mixed")
+    return (t.dt.hour * 60 + t.dt.minute).to_numpy(dtype=float, na_value=np.nan)
+
+
+def _old_timedelta(s: pd.Series) -> np.ndarray:
+    # Zoals analysis_views._parse_time_to_timedelta: aanvullen tot hh:mm:ss met .apply
+    x = s.astype(str).str.strip().replace({"NaT": "", "nan": "", "None": ""})
+    x = x.apply(lambda v: v if v.count(":") >= 2 else (v + ":00" * (2 - v.count(":"))) if v else "")
+    return np.floor(pd.to_timedelta(x, errors="coerce").dt.total_seconds().to_numpy() / 60.0)
+
+
+def _old_strftime(minutes: np.ndarray) -> np.ndarray:
+    t = pd.Timestamp("1970-01-01") + pd.to_timedelta(minutes, unit="min")
+    return pd.Series(t).dt.strftime("%H:%M").fillna("").to_numpy(dtype=object)
+
+
+def _old_format(minutes: np.ndarray) -> np.ndarray:
+    # Zoals het vroegere _fmt_at: str.format per waarde via .map
+    at = pd.Series(minutes)
+    m = at % 1440
+    txt = (m // 60).map("{:02.0f}".format) + ":" + (m % 60).map("{:02.0f}".format)
+    return txt.where(at.notna(), "").to_numpy(dtype=object)
+
+
+def _time(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def _report(label: str, n: int, seconds: float) -> None:
+    print(f"{label:<44} {seconds:8.3f}s {n / seconds / 1e6:8.2f} M waarden/s")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark van de HH:MM tijdkernel.")
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=3, help="beste van N runs (standaard: 3)")
+    args = ap.parse_args()
+    warnings.simplefilter("ignore")
+
+    s = _values(args.rows)
+    n = len(s)
+    print(f"{n:,} tijden (H:MM / HH:MM / HH:MM:SS, 10% leeg)")
+
+    ok = True
+    t, ref = _time(lambda: _old_to_datetime(s), args.repeat)
+    _report("parse: pd.to_datetime (oud)", n, t)
+    t, old = _time(lambda: _old_timedelta(s), args.repeat)
+    _report("parse: to_timedelta + .apply (oud)", n, t)
+    ok &= np.array_equal(old, ref, equal_nan=True)
+    t, minutes = _time(lambda: parse_minutes(s), args.repeat)
+    _report("parse: timekernel.parse_minutes", n, t)
+    ok &= np.array_equal(minutes, ref, equal_nan=True)
+
+    t, ref_txt = _time(lambda: _old_strftime(minutes), args.repeat)
+    _report("format: strftime (oud)", n, t)
+    t, old_txt = _time(lambda: _old_format(minutes), args.repeat)
+    _report("format: str.format per waarde (oud)", n, t)
+    ok &= bool((old_txt == ref_txt).all())
+    t, txt = _time(lambda: format_hhmm(minutes), args.repeat)
+    _report("format: timekernel.format_hhmm", n, t)
+    ok &= bool((txt == ref_txt).all())
+
+    print("identiek" if ok else "VERSCHIL tussen de varianten")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
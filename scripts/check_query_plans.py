@@ -0,0 +1,82 @@
+# ================================================================
+# scripts/check_query_plans.py – gebruikt elke load_orders() filter een index?
+#
+# Gebruik:
+#   python scripts/check_query_plans.py [export.xlsx]
+#
+# Laadt de export (standaard: de bestaande jit.sqlite) in een tijdelijke
+# database via dezelfde ingest als /upload, en controleert met
+# EXPLAIN QUERY PLAN dat elke filtercombinatie van load_orders() via een
+# index zoekt in plaats van de volledige tabel te scannen.
+# Exitcode 1 als een combinatie een full table scan doet.
+# ================================================================
+from __future__ import annotations
+
+import itertools
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "src"))
+sys.path.insert(0, str(ROOT_DIR))
+
+from api.main import DB_PATH, _orders_where  # noqa: E402
+from jit_rca.ingest import ensure_indexes, ingest_file  # noqa: E402
+
+FILTERS = ("date_from", "date_to", "rfx_activity", "cnr_tour")
+
+
+def _sample_values(conn: sqlite3.Connection) -> list:
+    """Filterwaarden voor een periode en voor één dag (zoals de detailpagina's)."""
+    lo, hi = conn.execute("SELECT MIN(date_dos), MAX(date_dos) FROM orders").fetchone()
+    act, tour = conn.execute('SELECT "RFX Activity", cnr_tour FROM orders LIMIT 1').fetchone()
+    # Zoals de API ze doorgeeft: strings uit de querystring
+    base = {"rfx_activity": str(act), "cnr_tour": str(tour)}
+    return [
+        ("periode", {**base, "date_from": lo, "date_to": hi}),
+        ("één dag", {**base, "date_from": lo, "date_to": lo}),
+    ]
+
+
+def check(db_path: Path) -> bool:
+    conn = sqlite3.connect(str(db_path))
+    try:
+        ensure_indexes(conn)
+        ok = True
+        for label, values in _sample_values(conn):
+            print(f"-- {label}")
+            for n in range(1, len(FILTERS) + 1):
+                for combo in itertools.combinations(FILTERS, n):
+                    kwargs = {k: values[k] for k in combo}
+                    where_sql, params = _orders_where(**kwargs)
+                    sql = f"EXPLAIN QUERY PLAN SELECT * FROM orders{where_sql}"
+                    plan = [r[-1] for r in conn.execute(sql, params)]
+                    uses_index = any("USING INDEX" in p or "USING COVERING INDEX" in p for p in plan)
+                    ok &= uses_index
+                    print(f"{'OK  ' if uses_index else 'SCAN'} {', '.join(combo):<45} {' | '.join(plan)}")
+        return ok
+    finally:
+        conn.close()
+
+
+def main() -> int:
+    tmp = Path(tempfile.mkdtemp(prefix="jit_plans_"))
+    try:
+        db_path = tmp / "plans.sqlite"
+        if len(sys.argv) > 1:
+            ingest_file(sys.argv[1], db_path)
+        elif DB_PATH.exists():
+            shutil.copy(DB_PATH, db_path)
+        else:
+            print("Geen database en geen export opgegeven.")
+            return 2
+        return 0 if check(db_path) else 1
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# ================================================================
+# scripts/check_sql_engine.py – geven de DuckDB aggregaties dezelfde cijfers?
+#
+# Gebruik:
+#   python scripts/check_sql_engine.py export.xlsx
+#
+# Laadt de export in een tijdelijke database + Parquet dataset (zelfde
+# ingest als /upload) en vergelijkt elke jit_rca.sql_engine aggregatie
+# met de pandas berekening van de API en analysis_views.
+# Exitcode 1 bij een verschil.
+# ================================================================
+from __future__ import annotations
+
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "src"))
+sys.path.insert(0, str(ROOT_DIR))
+
+from api.main import _clean_orders, _route_jit_counts  # noqa: E402
+from jit_rca import analysis_views, columnar, sql_engine  # noqa: E402
+from jit_rca.ingest import ingest_file  # noqa: E402
+
+# Top-N tabellen: bij gelijke waarden mag een ander label op die plaats staan
+RANKED = {"bottom_routes", "impact_stores"}
+
+
+def _same(name: str, a: pd.DataFrame, b: pd.DataFrame, labels: bool = True) -> bool:
+    a = a.reset_index(drop=True)
+    b = b.reset_index(drop=True)
+    if list(a.columns) != list(b.columns) or len(a) != len(b):
+        print(f"DIFF {name}: kolommen/rijen {list(a.columns)} x {len(a)} vs {list(b.columns)} x {len(b)}")
+        return False
+    for c in a.columns:
+        x, y = a[c], b[c]
+        if pd.api.types.is_numeric_dtype(x) and pd.api.types.is_numeric_dtype(y):
+            ok = np.allclose(x.astype(float), y.astype(float), rtol=1e-9, atol=0.0, equal_nan=True)
+        elif labels:
+            ok = bool((x.astype(str) == y.astype(str)).all())
+        else:
+            continue
+        if not ok:
+            print(f"DIFF {name}: kolom {c}")
+            return False
+    print(f"OK   {name} ({len(a)} rijen)")
+    return True
+
+
+def _pandas_waits(orders: pd.DataFrame, keys: list) -> pd.DataFrame:
+    df = orders.assign(DurationA_min=pd.to_numeric(orders["DurationA"], errors="coerce"))
+    df = df.dropna(subset=["DurationA_min", "nm_short_unload"])
+    return df.groupby(keys, as_index=False, observed=True, dropna=False).agg(avg_wait_min=("DurationA_min", "mean"))
+
+
+def check(path: Path) -> bool:
+    if not sql_engine.available():
+        print("duckdb is niet geïnstalleerd (pip install duckdb).")
+        return False
+    tmp = Path(tempfile.mkdtemp(prefix="jit_sql_"))
+    try:
+        db_path = tmp / "jit.sqlite"
+        parquet_dir = tmp / "orders_parquet"
+        ingest_file(path, db_path, mode="replace")
+        columnar.export_orders(db_path, parquet_dir)
+        orders = _clean_orders(columnar.read_orders(parquet_dir))
+        activities = sorted(orders["RFX Activity"].dropna().astype(str).unique())
+        ok = True
+
+        # routes_html
+        ok &= _same("route_jit", _route_jit_counts(orders), sql_engine.route_jit(parquet_dir))
+        for act in activities:
+            ref = _route_jit_counts(orders[orders["RFX Activity"].astype(str) == act])
+            ok &= _same(f"route_jit rfx={act}", ref, sql_engine.route_jit(parquet_dir, rfx_activity=act))
+
+        # waits_html / waits_customer_detail_html
+        deliveries = _pandas_waits(orders, ["date_dos", "cnr_tour", "RFX Activity", "nm_short_unload"])
+        per_activity = deliveries.groupby("RFX Activity", as_index=False, observed=True).agg(
+            deliveries=("avg_wait_min", "size"),
+            leverpunten=("nm_short_unload", "nunique"),
+            total_wait_min=("avg_wait_min", "sum"),
+            avg_wait_per_delivery=("avg_wait_min", "mean"),
+        )
+        ok &= _same("waits_by_activity", per_activity, sql_engine.waits_by_activity(parquet_dir))
+        for act in activities:
+            ref = deliveries[deliveries["RFX Activity"].astype(str) == act]
+            ok &= _same(f"wait_deliveries rfx={act}", ref, sql_engine.wait_deliveries(parquet_dir, rfx_activity=act))
+
+        # analysis_views.jit_analysis_tables
+        for tol in (0, 10):
+            ref = analysis_views.jit_analysis_tables(orders, tolerance_minutes=tol)
+            got = sql_engine.jit_analysis_tables(parquet_dir, tolerance_minutes=tol)
+            for name in ref:
+                ok &= _same(f"{name} tol={tol}", ref[name], got[name], labels=name not in RANKED)
+        return ok
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main() -> int:
+    if len(sys.argv) != 2:
+        print("Gebruik: python scripts/check_sql_engine.py export.xlsx")
+        return 2
+    return 0 if check(Path(sys.argv[1])) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
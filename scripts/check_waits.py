@@ -0,0 +1,92 @@
+# ================================================================
+# scripts/check_waits.py – geeft waits_html (uit kpi_wait_day) dezelfde
+# cijfers als de oude berekening rechtstreeks op de orders?
+#
+# Gebruik:
+#   python scripts/check_waits.py export.xlsx
+#
+# Laadt de export in een tijdelijke database (zelfde ingest + post_ingest
+# als /upload) en vergelijkt per RFX Activity leveringen, leverpunten en
+# totale wachttijd met de groupby van de oude waits_html (route als tekst,
+# dus een lege route is ook een levering). Exitcode 1 bij een verschil.
+# ================================================================
+from __future__ import annotations
+
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from jit_rca.ingest import ingest_file  # noqa: E402
+from jit_rca.jobs import post_ingest  # noqa: E402
+from jit_rca.rollups import read_rollup  # noqa: E402
+
+
+def _old_waits(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Per RFX Activity zoals de oude waits_html (load_orders + groupby per levering)."""
+    df = pd.read_sql_query(
+        'SELECT date_dos, cnr_tour, "RFX Activity", nm_short_unload, DurationA FROM orders', conn
+    )
+    df["cnr_tour"] = df["cnr_tour"].astype(str).str.replace(r"\.0$", "", regex=True)
+    df["DurationA_min"] = pd.to_numeric(df["DurationA"], errors="coerce")
+    df = df.dropna(subset=["DurationA_min", "RFX Activity"])
+    deliveries = df.groupby(["date_dos", "cnr_tour", "RFX Activity", "nm_short_unload"], as_index=False).agg(
+        avg_wait_min=("DurationA_min", "mean")
+    )
+    out = deliveries.groupby("RFX Activity", as_index=False).agg(
+        deliveries=("avg_wait_min", "size"),
+        leverpunten=("nm_short_unload", "nunique"),
+        total_wait_min=("avg_wait_min", "sum"),
+    )
+    return out.rename(columns={"RFX Activity": "rfx_activity"}).astype({"rfx_activity": int})
+
+
+def _rollup_waits(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Per RFX Activity zoals waits_html uit kpi_wait_day."""
+    kpi = read_rollup(conn, "kpi_wait_day", by=["rfx_activity", "nm_short_unload"])
+    return kpi.groupby("rfx_activity", as_index=False).agg(
+        deliveries=("deliveries", "sum"),
+        leverpunten=("nm_short_unload", "size"),
+        total_wait_min=("wait_min_sum", "sum"),
+    ).astype({"rfx_activity": int})
+
+
+def check(path: Path) -> bool:
+    tmp = Path(tempfile.mkdtemp(prefix="jit_waits_"))
+    try:
+        db_path = tmp / "jit.sqlite"
+        ingest_file(path, db_path, mode="replace")
+        post_ingest(db_path, None)
+        conn = sqlite3.connect(db_path)
+        try:
+            ref = _old_waits(conn).sort_values("rfx_activity").reset_index(drop=True)
+            got = _rollup_waits(conn).sort_values("rfx_activity").reset_index(drop=True)
+        finally:
+            conn.close()
+        ok = len(ref) == len(got)
+        for c in ref.columns:
+            ok = ok and np.allclose(ref[c].astype(float), got[c].astype(float), rtol=1e-9, atol=0.0)
+        print(f"{'OK  ' if ok else 'DIFF'} waits_html per RFX Activity ({len(ref)} rijen)")
+        if not ok:
+            print(ref.merge(got, on="rfx_activity", how="outer", suffixes=("_oud", "_kpi")).to_string(index=False))
+        return ok
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main() -> int:
+    if len(sys.argv) != 2:
+        print("Gebruik: python scripts/check_waits.py export.xlsx")
+        return 2
+    return 0 if check(Path(sys.argv[1])) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
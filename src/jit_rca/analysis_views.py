@@ -3,11 +3,18 @@
 # ================================================================
 from __future__ import annotations
 
-from typing import Dict, Tuple
+from collections import abc
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
 
+from .jit_engine import SUMMARY_COLUMNS, count_within, evaluate, order_deviation, summarize
+from .scenarios import scenario_names
+
+# Standaard toleranties (minuten) voor jit_tolerance_sweep
+SWEEP_TOLERANCES = (0, 5, 10, 15, 30, 60)
+
 # Mapping van klantnummers (cnr_cust) naar kanaal
 CHANNEL_MAP: Dict[str, str] = {
     "Z41102": "express",
@@ -22,19 +29,6 @@ CHANNEL_MAP: Dict[str, str] = {
 # Helpers
 # ------------------------------------------------------------
 
-def _parse_time_to_timedelta(series: pd.Series) -> pd.Series:
-    """
-    Converteer een kolom met tijden (bv. '06:00', '6:00') naar timedelta sinds middernacht.
-    Verwacht korte tijdnotatie. Ongeldige waarden worden NaT.
-    """
-    s = series.astype(str).str.strip()
-    s = s.replace({"NaT": "", "nan": "", "None": ""})
-    # Zorg dat we altijd een hh:mm of hh:mm:ss hebben
-    s = s.apply(lambda x: x if x.count(":") >= 1 else (x + ":00") if x else "")
-    td = pd.to_timedelta(s, errors="coerce")
-    return td
-
-
 def _pct(n: float, d: float) -> float:
     """Percentage-helper met bescherming tegen delen door 0."""
     if d is None or d == 0 or pd.isna(d):
@@ -42,17 +36,30 @@ def _pct(n: float, d: float) -> float:
     return float(round((n / d) * 100.0, 2))
 
 
+def _pct_col(n, d) -> np.ndarray:
+    """_pct voor hele kolommen (of een vaste noemer) in één vectoriële deling."""
+    n = np.asarray(n, dtype=float)
+    d = np.asarray(d, dtype=float)
+    ok = ~np.isnan(d) & (d != 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.round(n / np.where(ok, d, 1.0) * 100.0, 2)
+    return np.where(ok, pct, 0.0)
+
+
 # ------------------------------------------------------------
 # Basisvoorbereiding: JIT-logica op order- en leveringsniveau
 # ------------------------------------------------------------
 
-def _prepare_window_df(df: pd.DataFrame, tolerance_minutes: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+# Levering in het rapport: per dag, route, klant, winkelpunt en levervenster
+DELIVERY_COLUMNS = ["date_dos", "cnr_tour", "cnr_cust", "nm_short_unload", "Win FROM", "Win UNTIL"]
+
+
+def _prepare_orders(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Voorbereiding van de dataset:
+    Orders voor het rapport:
     - Filter op RFX Activity 4 & 5 (Delhaize & Carrefour)
-    - Parsing van datum + tijdkolommen
-    - JIT-vlaggen per order (Scenario 1 & 2)
-    - Aggregatie naar leveringsniveau (per route / winkelpunt / tijdvenster)
+    - Parsing van datum + stringkolommen
+    - Kanaal op basis van cnr_cust
     """
     required = [
         "date_dos",
@@ -71,67 +78,55 @@ def _prepare_window_df(df: pd.DataFrame, tolerance_minutes: int) -> Tuple[pd.Dat
 
     data = df.copy()
 
-    # Filter op RFX Activity 4 & 5 (Delhaize & Carrefour)
-    data["RFX Activity"] = data["RFX Activity"].astype(str).str.strip()
-    data = data[data["RFX Activity"].isin(["4", "5"])]
+    # Filter op RFX Activity 4 & 5 (Delhaize & Carrefour); getypeerde data is al Int
+    if data["RFX Activity"].dtype == object:
+        data["RFX Activity"] = data["RFX Activity"].astype(str).str.strip()
+    activity = pd.to_numeric(data["RFX Activity"], errors="coerce")
+    data = data[activity.isin([4, 5])]
 
     if data.empty:
-        return data, data
+        return data
 
-    # Datum
-    data["date_dos"] = pd.to_datetime(
-        data["date_dos"], dayfirst=True, errors="coerce"
-    ).dt.date
+    # Datum: na ingest altijd YYYY-MM-DD (met dayfirst zou pandas dat als
+    # jaar-dag-maand lezen); andere notaties dag-eerst
+    dates = pd.to_datetime(data["date_dos"], format="%Y-%m-%d", errors="coerce")
+    other = dates.isna() & data["date_dos"].notna()
+    if other.any():
+        dates[other] = pd.to_datetime(data.loc[other, "date_dos"], dayfirst=True, errors="coerce")
+    data["date_dos"] = dates.dt.date
 
-    # Stringkolommen
+    # Stringkolommen (categorical/Int kolommen uit load_orders blijven zoals ze zijn)
     for col in ["cnr_tour", "cnr_cust", "RFX Year", "RFX Preperation", "nm_short_unload"]:
-        if col in data.columns:
+        if col in data.columns and data[col].dtype == object:
             data[col] = data[col].astype(str).str.strip()
 
-    # Tijdkolommen -> timedelta
-    for col in ["Win FROM", "Win UNTIL", "Planned", "Actual"]:
-        data[f"{col}_td"] = _parse_time_to_timedelta(data[col])
-
-    base_date = pd.to_datetime(data["date_dos"])
-    for col in ["Win FROM", "Win UNTIL", "Planned", "Actual"]:
-        data[f"{col}_dt"] = base_date + data[f"{col}_td"]
-
-    tol = pd.to_timedelta(tolerance_minutes, unit="m")
-
-    # Scenario 1: Actual >= Win FROM AND Actual <= Win UNTIL (± tolerantie)
-    data["order_jit_s1"] = (
-        (data["Actual_dt"] >= (data["Win FROM_dt"] - tol))
-        & (data["Actual_dt"] <= (data["Win UNTIL_dt"] + tol))
-    )
-
-    # Scenario 2: Actual <= Win UNTIL (+ tolerantie) – te vroeg = ook JIT
-    data["order_jit_s2"] = data["Actual_dt"] <= (data["Win UNTIL_dt"] + tol)
-
-    # Ongeldige tijdstempels → niet JIT
-    valid_mask = data[["Win FROM_dt", "Win UNTIL_dt", "Actual_dt"]].notna().all(axis=1)
-    data.loc[~valid_mask, ["order_jit_s1", "order_jit_s2"]] = False
-
     # Kanaal op basis van cnr_cust
-    data["kanaal"] = data["cnr_cust"].map(CHANNEL_MAP).fillna("Overig")
+    data["kanaal"] = data["cnr_cust"].astype(object).map(CHANNEL_MAP).fillna("Overig")
+    return data
 
-    # Definieer levering (stop): per dag, route, klant, winkelpunt en levervenster
-    delivery_cols = ["date_dos", "cnr_tour", "cnr_cust", "nm_short_unload", "Win FROM", "Win UNTIL"]
 
-    deliveries = (
-        data.groupby(delivery_cols, as_index=False)
-        .agg(
-            orders_total=("order_jit_s1", "size"),
-            orders_jit_s1=("order_jit_s1", "sum"),
-            orders_jit_s2=("order_jit_s2", "sum"),
-            any_jit_s1=("order_jit_s1", "max"),
-            any_jit_s2=("order_jit_s2", "max"),
-            rfx_activity=("RFX Activity", "first"),
-            kanaal=("kanaal", "first"),
-        )
-    )
-    deliveries["delivery_jit_s1"] = deliveries["any_jit_s1"].astype(bool)
-    deliveries["delivery_jit_s2"] = deliveries["any_jit_s2"].astype(bool)
+def _prepare_window_df(
+    df: pd.DataFrame,
+    tolerance_minutes: int,
+    scenarios: Optional[Sequence[str]] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Voorbereiding van de dataset (_prepare_orders), JIT-vlaggen per order
+    (Scenario 1 & 2, ± tolerantie; onvolledig venster = niet JIT; plus de
+    `scenarios` van jit_rca.scenarios) en één groupby naar leveringsniveau
+    (DELIVERY_COLUMNS).
 
+    Zie jit_engine.evaluate: `deliveries` bevat ook de rijen met een onvolledige
+    leveringssleutel (is_delivery False), enkel om hun orders mee te tellen.
+    """
+    data = _prepare_orders(df)
+    if data.empty:
+        return data, data
+    data, deliveries = evaluate(
+        data, tolerance_minutes, key=DELIVERY_COLUMNS, carry=["RFX Activity", "kanaal"], require_window=True,
+        scenarios=scenarios,
+    )
+    deliveries = deliveries.rename(columns={"RFX Activity": "rfx_activity"})
     return data, deliveries
 
 
@@ -200,16 +195,16 @@ def _waiting_time_rootcause(orders: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Data
     )
 
     root = (
-        late.groupby("rootcause_bucket", as_index=False)
+        late.groupby("rootcause_bucket", as_index=False, observed=True)
         .agg(aantal=("order_jit_s2", "size"))
         .sort_values("aantal", ascending=False)
     )
     total = root["aantal"].sum()
-    root["aandeel_%"] = root["aantal"].apply(lambda x: _pct(x, total))
+    root["aandeel_%"] = _pct_col(root["aantal"], total)
 
     # Per winkelpunt
     store = (
-        late.groupby("nm_short_unload", as_index=False)
+        late.groupby("nm_short_unload", as_index=False, observed=True)
         .agg(
             late_orders=("order_jit_s2", "size"),
             avg_DurationP_min=("DurationP", "mean"),
@@ -231,7 +226,35 @@ def _waiting_time_rootcause(orders: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Data
 # Hoofdfunctie: alle tabellen voor het rapport
 # ------------------------------------------------------------
 
-def jit_analysis_tables(df: pd.DataFrame, tolerance_minutes: int = 0) -> Dict[str, pd.DataFrame]:
+REPORT_TABLES = (
+    "summary", "daily_overview", "by_rfx_activity", "by_channel",
+    "bottom_routes", "impact_stores", "root_cause_buckets", "late_wait_by_store",
+)
+
+
+class LazyTables(abc.Mapping):
+    """
+    Alleen-lezen mapping naam -> waarde: elke waarde wordt pas bij de eerste
+    toegang berekend (builder zonder argumenten) en daarna bewaard.
+    """
+
+    def __init__(self, builders: Dict[str, Callable[[], Any]]):
+        self._builders = dict(builders)
+        self._values: Dict[str, Any] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._values:
+            self._values[name] = self._builders[name]()
+        return self._values[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._builders)
+
+    def __len__(self) -> int:
+        return len(self._builders)
+
+
+def jit_analysis_tables(df: pd.DataFrame, tolerance_minutes: int = 0) -> Mapping[str, pd.DataFrame]:
     """
     Bouwt alle tabellen voor het JIT-rapport:
 
@@ -243,188 +266,355 @@ def jit_analysis_tables(df: pd.DataFrame, tolerance_minutes: int = 0) -> Dict[st
     - impact_stores: winkelpunten met meeste non-JIT leveringen (Scenario 2)
     - root_cause_buckets: verdeling van late orders over wachttijd-buckets
     - late_wait_by_store: wachttijd vs planning per winkelpunt (late orders)
-    """
-    orders, deliveries = _prepare_window_df(df, tolerance_minutes=tolerance_minutes)
 
-    result: Dict[str, pd.DataFrame] = {}
+    summary, daily_overview, by_rfx_activity, by_channel en bottom_routes krijgen
+    per geregistreerd scenario (jit_rca.scenarios) een kolom JIT% leveringen.
+    Zelfde tabellen via SQL op de Parquet dataset: jit_rca.sql_engine.jit_analysis_tables.
 
-    if orders.empty or deliveries.empty:
+    Retourneert een LazyTables: de orders en leveringen worden één keer voorbereid,
+    elke tabel wordt pas bij de eerste toegang berekend. Enkel result["summary"]
+    kost zo geen groupby's en geen wachttijdanalyse.
+    """
+    scenarios = scenario_names()
+    orders, deliveries = _prepare_window_df(df, tolerance_minutes=tolerance_minutes, scenarios=scenarios)
+
+    if orders.empty or not deliveries["is_delivery"].any():
         # Geen data voor RFX 4/5 in de gekozen periode
-        result["summary"] = pd.DataFrame()
-        result["daily_overview"] = pd.DataFrame()
-        result["by_rfx_activity"] = pd.DataFrame()
-        result["by_channel"] = pd.DataFrame()
-        result["bottom_routes"] = pd.DataFrame()
-        result["impact_stores"] = pd.DataFrame()
-        result["root_cause_buckets"] = pd.DataFrame()
-        result["late_wait_by_store"] = pd.DataFrame()
-        return result
+        return _empty_tables()
+
+    # Dag-, route-, RFX- en kanaaltellingen: sommen over de leveringen (jit_engine)
+    names = {
+        "deliveries": "leveringen_totaal",
+        "deliveries_jit_s1": "leveringen_jit_S1",
+        "deliveries_jit_s2": "leveringen_jit_S2",
+        "orders": "orders_totaal",
+        "orders_jit_s1": "orders_jit_S1",
+        "orders_jit_s2": "orders_jit_S2",
+        **{f"deliveries_jit_{n}": f"leveringen_jit_{n}" for n in scenarios},
+    }
+    delivered = deliveries[deliveries["is_delivery"]]
+
+    def per(frame: pd.DataFrame, by: list, columns: list) -> pd.DataFrame:
+        return summarize(frame, by).rename(columns=names)[[*by, *columns]]
+
+    def impact() -> pd.DataFrame:
+        out = per(delivered, ["nm_short_unload"], ["leveringen_totaal", "leveringen_jit_S2"])
+        out["non_jit_leveringen"] = out["leveringen_totaal"] - out.pop("leveringen_jit_S2")
+        return out
+
+    scenario_cols = [f"leveringen_jit_{n}" for n in scenarios]
+    deliv_cols = ["leveringen_totaal", "leveringen_jit_S1", "leveringen_jit_S2", *scenario_cols]
+    totals = {
+        "total_orders": len(orders),
+        "jit_orders_s1": int(orders["order_jit_s1"].sum()),
+        "jit_orders_s2": int(orders["order_jit_s2"].sum()),
+        "total_deliveries": len(delivered),
+        "jit_deliv_s1": int(delivered["delivery_jit_s1"].sum()),
+        "jit_deliv_s2": int(delivered["delivery_jit_s2"].sum()),
+        **{f"jit_deliv_{n}": int(delivered[f"delivery_jit_{n}"].sum()) for n in scenarios},
+    }
+    counts = LazyTables({
+        "daily": lambda: per(deliveries, ["date_dos"], [*names.values()]),
+        "daily_deliv": lambda: counts["daily"][["date_dos", *deliv_cols]],
+        "daily_orders": lambda: counts["daily"][["date_dos", "orders_totaal", "orders_jit_S1", "orders_jit_S2"]],
+        "by_rfx": lambda: per(delivered, ["rfx_activity"], deliv_cols),
+        "by_channel": lambda: per(delivered, ["kanaal"], deliv_cols),
+        "routes": lambda: per(
+            delivered, ["date_dos", "cnr_tour"], ["leveringen_totaal", "leveringen_jit_S2", *scenario_cols]
+        ),
+        "impact": impact,
+        "waits": lambda: _waiting_time_rootcause(orders),
+    })
+    return _report_tables(totals, counts, scenarios)
+
+
+def _empty_tables() -> Dict[str, pd.DataFrame]:
+    return {name: pd.DataFrame() for name in REPORT_TABLES}
+
+
+def _report_tables(
+    totals: Dict[str, int],
+    counts: Mapping[str, Any],
+    scenarios: Sequence[str] = (),
+) -> LazyTables:
+    """
+    Rapporttabellen (percentages, sortering, top-N) uit de per-sleutel tellingen,
+    gedeeld door de pandas- en de SQL-berekening; elke tabel pas bij de eerste toegang.
+
+    counts: daily_deliv, daily_orders, by_rfx, by_channel, routes, impact (DataFrames)
+    en waits = (root_buckets, wait_by_store); mag zelf een LazyTables zijn, dan
+    worden enkel de tellingen van de opgevraagde tabellen berekend.
+    Per scenario: totals["jit_deliv_<naam>"] en een kolom leveringen_jit_<naam>
+    in de leveringstellingen; die wordt JIT%_lev_<naam>.
+    """
+
+    def as_int(frame: pd.DataFrame, columns: Sequence[str]) -> None:
+        for c in columns:
+            frame[c] = frame[c].astype(int)
+
+    def scenario_pct(frame: pd.DataFrame) -> None:
+        for n in scenarios:
+            jit = frame.pop(f"leveringen_jit_{n}").astype(int)
+            frame[f"JIT%_lev_{n}"] = _pct_col(jit, frame["leveringen_totaal"])
 
     # --------------------------------------------------------
     # 1. Summary (één regel, voor KPI-kaarten)
     # --------------------------------------------------------
-    total_orders = len(orders)
-    jit_orders_s1 = int(orders["order_jit_s1"].sum())
-    jit_orders_s2 = int(orders["order_jit_s2"].sum())
-
-    total_deliveries = len(deliveries)
-    jit_deliv_s1 = int(deliveries["delivery_jit_s1"].sum())
-    jit_deliv_s2 = int(deliveries["delivery_jit_s2"].sum())
-
-    summary = pd.DataFrame(
-        [
-            {
-                "totaal_orders": total_orders,
-                "JIT_orders_S1": jit_orders_s1,
-                "JIT_orders_S2": jit_orders_s2,
-                "JIT%_orders_S1": _pct(jit_orders_s1, total_orders),
-                "JIT%_orders_S2": _pct(jit_orders_s2, total_orders),
-                "totaal_leveringen": total_deliveries,
-                "JIT_leveringen_S1": jit_deliv_s1,
-                "JIT_leveringen_S2": jit_deliv_s2,
-                "JIT%_leveringen_S1": _pct(jit_deliv_s1, total_deliveries),
-                "JIT%_leveringen_S2": _pct(jit_deliv_s2, total_deliveries),
-            }
-        ]
-    )
-    result["summary"] = summary
+    def summary() -> pd.DataFrame:
+        total_orders = totals["total_orders"]
+        jit_orders_s1 = totals["jit_orders_s1"]
+        jit_orders_s2 = totals["jit_orders_s2"]
+
+        total_deliveries = totals["total_deliveries"]
+        jit_deliv_s1 = totals["jit_deliv_s1"]
+        jit_deliv_s2 = totals["jit_deliv_s2"]
+
+        return pd.DataFrame(
+            [
+                {
+                    "totaal_orders": total_orders,
+                    "JIT_orders_S1": jit_orders_s1,
+                    "JIT_orders_S2": jit_orders_s2,
+                    "JIT%_orders_S1": _pct(jit_orders_s1, total_orders),
+                    "JIT%_orders_S2": _pct(jit_orders_s2, total_orders),
+                    "totaal_leveringen": total_deliveries,
+                    "JIT_leveringen_S1": jit_deliv_s1,
+                    "JIT_leveringen_S2": jit_deliv_s2,
+                    "JIT%_leveringen_S1": _pct(jit_deliv_s1, total_deliveries),
+                    "JIT%_leveringen_S2": _pct(jit_deliv_s2, total_deliveries),
+                    **{f"JIT%_leveringen_{n}": _pct(totals[f"jit_deliv_{n}"], total_deliveries) for n in scenarios},
+                }
+            ]
+        )
 
     # --------------------------------------------------------
     # 2. Daily overview (per dag)
     # --------------------------------------------------------
-    daily_deliv = (
-        deliveries.groupby("date_dos", as_index=False)
-        .agg(
-            leveringen_totaal=("delivery_jit_s2", "size"),
-            leveringen_jit_S1=("delivery_jit_s1", "sum"),
-            leveringen_jit_S2=("delivery_jit_s2", "sum"),
-        )
-    )
-    daily_orders = (
-        orders.groupby("date_dos", as_index=False)
-        .agg(
-            orders_totaal=("order_jit_s2", "size"),
-            orders_jit_S1=("order_jit_s1", "sum"),
-            orders_jit_S2=("order_jit_s2", "sum"),
-        )
-    )
-
-    daily = pd.merge(daily_deliv, daily_orders, on="date_dos", how="outer").fillna(0)
-    daily["leveringen_totaal"] = daily["leveringen_totaal"].astype(int)
-    daily["leveringen_jit_S1"] = daily["leveringen_jit_S1"].astype(int)
-    daily["leveringen_jit_S2"] = daily["leveringen_jit_S2"].astype(int)
-    daily["orders_totaal"] = daily["orders_totaal"].astype(int)
-    daily["orders_jit_S1"] = daily["orders_jit_S1"].astype(int)
-    daily["orders_jit_S2"] = daily["orders_jit_S2"].astype(int)
-
-    daily["JIT%_lev_S1"] = daily.apply(
-        lambda r: _pct(r["leveringen_jit_S1"], r["leveringen_totaal"]), axis=1
-    )
-    daily["JIT%_lev_S2"] = daily.apply(
-        lambda r: _pct(r["leveringen_jit_S2"], r["leveringen_totaal"]), axis=1
-    )
-    daily["JIT%_ord_S1"] = daily.apply(
-        lambda r: _pct(r["orders_jit_S1"], r["orders_totaal"]), axis=1
-    )
-    daily["JIT%_ord_S2"] = daily.apply(
-        lambda r: _pct(r["orders_jit_S2"], r["orders_totaal"]), axis=1
-    )
-
-    daily = daily.sort_values("date_dos")
-    result["daily_overview"] = daily
+    def daily_overview() -> pd.DataFrame:
+        daily = pd.merge(counts["daily_deliv"], counts["daily_orders"], on="date_dos", how="outer").fillna(0)
+        as_int(daily, ["leveringen_totaal", "leveringen_jit_S1", "leveringen_jit_S2",
+                       "orders_totaal", "orders_jit_S1", "orders_jit_S2"])
+        daily["JIT%_lev_S1"] = _pct_col(daily["leveringen_jit_S1"], daily["leveringen_totaal"])
+        daily["JIT%_lev_S2"] = _pct_col(daily["leveringen_jit_S2"], daily["leveringen_totaal"])
+        daily["JIT%_ord_S1"] = _pct_col(daily["orders_jit_S1"], daily["orders_totaal"])
+        daily["JIT%_ord_S2"] = _pct_col(daily["orders_jit_S2"], daily["orders_totaal"])
+        scenario_pct(daily)
+        return daily.sort_values("date_dos")
 
     # --------------------------------------------------------
     # 3. Per RFX Activity (4 vs 5)
     # --------------------------------------------------------
-    by_rfx = (
-        deliveries.groupby("rfx_activity", as_index=False)
-        .agg(
-            leveringen_totaal=("delivery_jit_s2", "size"),
-            leveringen_jit_S1=("delivery_jit_s1", "sum"),
-            leveringen_jit_S2=("delivery_jit_s2", "sum"),
-        )
-    )
-    by_rfx["leveringen_totaal"] = by_rfx["leveringen_totaal"].astype(int)
-    by_rfx["leveringen_jit_S1"] = by_rfx["leveringen_jit_S1"].astype(int)
-    by_rfx["leveringen_jit_S2"] = by_rfx["leveringen_jit_S2"].astype(int)
-    by_rfx["JIT%_lev_S1"] = by_rfx.apply(
-        lambda r: _pct(r["leveringen_jit_S1"], r["leveringen_totaal"]), axis=1
-    )
-    by_rfx["JIT%_lev_S2"] = by_rfx.apply(
-        lambda r: _pct(r["leveringen_jit_S2"], r["leveringen_totaal"]), axis=1
-    )
-    result["by_rfx_activity"] = by_rfx.rename(columns={"rfx_activity": "RFX Activity"})
+    def by_rfx_activity() -> pd.DataFrame:
+        by_rfx = counts["by_rfx"].copy()
+        as_int(by_rfx, ["leveringen_totaal", "leveringen_jit_S1", "leveringen_jit_S2"])
+        by_rfx["JIT%_lev_S1"] = _pct_col(by_rfx["leveringen_jit_S1"], by_rfx["leveringen_totaal"])
+        by_rfx["JIT%_lev_S2"] = _pct_col(by_rfx["leveringen_jit_S2"], by_rfx["leveringen_totaal"])
+        scenario_pct(by_rfx)
+        return by_rfx.rename(columns={"rfx_activity": "RFX Activity"})
 
     # --------------------------------------------------------
     # 4. Per kanaal (express / hyper / partner / Super-MKTI / B2B / Overig)
     # --------------------------------------------------------
-    by_channel = (
-        deliveries.groupby("kanaal", as_index=False)
-        .agg(
-            leveringen_totaal=("delivery_jit_s2", "size"),
-            leveringen_jit_S1=("delivery_jit_s1", "sum"),
-            leveringen_jit_S2=("delivery_jit_s2", "sum"),
-        )
-    )
-    by_channel["leveringen_totaal"] = by_channel["leveringen_totaal"].astype(int)
-    by_channel["leveringen_jit_S1"] = by_channel["leveringen_jit_S1"].astype(int)
-    by_channel["leveringen_jit_S2"] = by_channel["leveringen_jit_S2"].astype(int)
-    by_channel["JIT%_lev_S1"] = by_channel.apply(
-        lambda r: _pct(r["leveringen_jit_S1"], r["leveringen_totaal"]), axis=1
-    )
-    by_channel["JIT%_lev_S2"] = by_channel.apply(
-        lambda r: _pct(r["leveringen_jit_S2"], r["leveringen_totaal"]), axis=1
-    )
-    by_channel = by_channel.sort_values("leveringen_totaal", ascending=False)
-    result["by_channel"] = by_channel
+    def by_channel() -> pd.DataFrame:
+        channel = counts["by_channel"].copy()
+        as_int(channel, ["leveringen_totaal", "leveringen_jit_S1", "leveringen_jit_S2"])
+        channel["JIT%_lev_S1"] = _pct_col(channel["leveringen_jit_S1"], channel["leveringen_totaal"])
+        channel["JIT%_lev_S2"] = _pct_col(channel["leveringen_jit_S2"], channel["leveringen_totaal"])
+        scenario_pct(channel)
+        return channel.sort_values("leveringen_totaal", ascending=False)
 
     # --------------------------------------------------------
     # 5. Bottom 10 routes – Scenario 2 (leveringen)
     # --------------------------------------------------------
-    routes = (
-        deliveries.groupby(["date_dos", "cnr_tour"], as_index=False)
-        .agg(
-            leveringen_totaal=("delivery_jit_s2", "size"),
-            leveringen_jit_S2=("delivery_jit_s2", "sum"),
-        )
-    )
-    routes["leveringen_totaal"] = routes["leveringen_totaal"].astype(int)
-    routes["leveringen_jit_S2"] = routes["leveringen_jit_S2"].astype(int)
-    routes["JIT%_lev_S2"] = routes.apply(
-        lambda r: _pct(r["leveringen_jit_S2"], r["leveringen_totaal"]), axis=1
-    )
-    bottom_routes = routes.sort_values("JIT%_lev_S2", ascending=True).head(10)
-    result["bottom_routes"] = bottom_routes
+    def bottom_routes() -> pd.DataFrame:
+        routes = counts["routes"].copy()
+        as_int(routes, ["leveringen_totaal", "leveringen_jit_S2"])
+        routes["JIT%_lev_S2"] = _pct_col(routes["leveringen_jit_S2"], routes["leveringen_totaal"])
+        scenario_pct(routes)
+        return routes.sort_values("JIT%_lev_S2", ascending=True).head(10)
 
     # --------------------------------------------------------
     # 6. Winkelpunten met meeste non-JIT leveringen (Scenario 2)
     # --------------------------------------------------------
-    deliveries["non_jit_S2"] = (~deliveries["delivery_jit_s2"]).astype(int)
-    impact = (
-        deliveries.groupby("nm_short_unload", as_index=False)
-        .agg(
-            leveringen_totaal=("delivery_jit_s2", "size"),
-            non_jit_leveringen=("non_jit_S2", "sum"),
-        )
-    )
-    impact["leveringen_totaal"] = impact["leveringen_totaal"].astype(int)
-    impact["non_jit_leveringen"] = impact["non_jit_leveringen"].astype(int)
-    impact["non_jit_%"] = impact.apply(
-        lambda r: _pct(r["non_jit_leveringen"], r["leveringen_totaal"]), axis=1
-    )
-    impact = impact.sort_values(
-        ["non_jit_leveringen", "non_jit_%"], ascending=[False, False]
-    ).head(15)
-    result["impact_stores"] = impact.rename(columns={"nm_short_unload": "winkelpunt"})
+    def impact_stores() -> pd.DataFrame:
+        impact = counts["impact"].copy()
+        as_int(impact, ["leveringen_totaal", "non_jit_leveringen"])
+        impact["non_jit_%"] = _pct_col(impact["non_jit_leveringen"], impact["leveringen_totaal"])
+        impact = impact.sort_values(
+            ["non_jit_leveringen", "non_jit_%"], ascending=[False, False]
+        ).head(15)
+        return impact.rename(columns={"nm_short_unload": "winkelpunt"})
 
     # --------------------------------------------------------
     # 7. Wachttijd / root cause buckets & per winkelpunt
     # --------------------------------------------------------
-    root_buckets, wait_by_store = _waiting_time_rootcause(orders)
-    result["root_cause_buckets"] = root_buckets
-    result["late_wait_by_store"] = wait_by_store
+    return LazyTables({
+        "summary": summary,
+        "daily_overview": daily_overview,
+        "by_rfx_activity": by_rfx_activity,
+        "by_channel": by_channel,
+        "bottom_routes": bottom_routes,
+        "impact_stores": impact_stores,
+        "root_cause_buckets": lambda: counts["waits"][0],
+        "late_wait_by_store": lambda: counts["waits"][1],
+    })
+
+# ------------------------------------------------------------
+# Tolerantie-sweep: JIT% voor een reeks toleranties in één pass
+# ------------------------------------------------------------
+
+SWEEP_COLUMNS = [
+    "tolerantie_min",
+    "orders_totaal", "orders_jit_S1", "orders_jit_S2", "JIT%_ord_S1", "JIT%_ord_S2",
+    "leveringen_totaal", "leveringen_jit_S1", "leveringen_jit_S2", "JIT%_lev_S1", "JIT%_lev_S2",
+]
+
+
+def jit_tolerance_sweep(df: pd.DataFrame, tolerances=SWEEP_TOLERANCES) -> Dict[str, pd.DataFrame]:
+    """
+    JIT% in Scenario 1 & 2 (orders en leveringen) voor elke tolerantie:
+
+    - summary: één rij per tolerantie
+    - by_channel: per kanaal × tolerantie
+    - daily_overview: per dag × tolerantie
+
+    De voorbereiding gebeurt één keer. Per order en levering wordt de kleinste
+    tolerantie bepaald waarbij ze JIT is (jit_engine.order_deviation; levering =
+    minimum over haar orders); daarna is elke tolerantie een telling met
+    searchsorted op die gesorteerde waarden. Zelfde cijfers als
+    jit_analysis_tables(df, t) voor elke t.
+    """
+    tolerances = sorted({float(t) for t in tolerances})
+    tol_dtype = int if all(t.is_integer() for t in tolerances) else float
+    empty = {name: pd.DataFrame(columns=SWEEP_COLUMNS) for name in ("summary", "by_channel", "daily_overview")}
+    data = _prepare_orders(df)
+    if data.empty or not tolerances:
+        return empty
+
+    order_s1, order_s2 = order_deviation(data, require_window=True)
+
+    # Leveringen: één groupby-code per order, levering JIT zodra één order JIT is
+    codes = data.groupby(DELIVERY_COLUMNS, observed=True, dropna=False, sort=False).ngroup().to_numpy()
+    first = np.unique(codes, return_index=True)[1]
+    deliveries = data.iloc[first][["date_dos", "kanaal", *DELIVERY_COLUMNS[1:]]].reset_index(drop=True)
+    deliveries["s1"] = pd.Series(order_s1).groupby(codes).min().to_numpy()
+    deliveries["s2"] = pd.Series(order_s2).groupby(codes).min().to_numpy()
+    deliveries = deliveries[deliveries[DELIVERY_COLUMNS].notna().all(axis=1)]
+    if deliveries.empty:
+        return empty
+
+    def per(by: Optional[str]) -> pd.DataFrame:
+        if by is None:
+            labels = pd.Index([None])
+            o_groups = np.zeros(len(data), dtype=np.int64)
+            d_groups = np.zeros(len(deliveries), dtype=np.int64)
+        else:
+            o_groups, labels = pd.factorize(data[by], sort=True)
+            d_groups = labels.get_indexer(deliveries[by])
+        n = len(labels)
+        counts = {
+            "orders_totaal": np.bincount(o_groups[o_groups >= 0], minlength=n),
+            "orders_jit_S1": count_within(order_s1, o_groups, n, tolerances),
+            "orders_jit_S2": count_within(order_s2, o_groups, n, tolerances),
+            "leveringen_totaal": np.bincount(d_groups[d_groups >= 0], minlength=n),
+            "leveringen_jit_S1": count_within(deliveries["s1"].to_numpy(), d_groups, n, tolerances),
+            "leveringen_jit_S2": count_within(deliveries["s2"].to_numpy(), d_groups, n, tolerances),
+        }
+        k = len(tolerances)
+        out = pd.DataFrame({
+            "tolerantie_min": np.tile(np.asarray(tolerances, dtype=tol_dtype), n),
+            **{c: (v.ravel() if v.ndim == 2 else np.repeat(v, k)).astype(int) for c, v in counts.items()},
+        })
+        for pct, num, den in (
+            ("JIT%_ord_S1", "orders_jit_S1", "orders_totaal"),
+            ("JIT%_ord_S2", "orders_jit_S2", "orders_totaal"),
+            ("JIT%_lev_S1", "leveringen_jit_S1", "leveringen_totaal"),
+            ("JIT%_lev_S2", "leveringen_jit_S2", "leveringen_totaal"),
+        ):
+            out[pct] = _pct_col(out[num], out[den])
+        out = out[SWEEP_COLUMNS]
+        if by is not None:
+            out.insert(0, by, np.repeat(np.asarray(labels, dtype=object), k))
+        return out
+
+    by_channel = per("kanaal")
+    return {
+        "summary": per(None),
+        "by_channel": by_channel[by_channel["leveringen_totaal"] > 0].reset_index(drop=True),
+        "daily_overview": per("date_dos"),
+    }
 
+
+# ------------------------------------------------------------
+# Zelfde overzichten uit de KPI rollups (jit_rca.rollups)
+# ------------------------------------------------------------
+
+# Sleutel van jit_day_counts (= tabel kpi_jit_day)
+JIT_DAY_KEY = ["date_dos", "rfx_activity", "kanaal"]
+
+
+def jit_day_counts(df: pd.DataFrame, tolerance_minutes: int = 0) -> pd.DataFrame:
+    """
+    SUMMARY_COLUMNS per dag × RFX Activity × kanaal met de leveringsdefinitie van
+    jit_analysis_tables; optelbaar over dagen, dus per dag bij te houden (kpi_jit_day).
+    Orders zonder datum vallen weg (zoals in daily_overview). date_dos als YYYY-MM-DD.
+    Enkel S1/S2: de scenario's worden niet bij ingest bijgehouden.
+    """
+    orders, deliveries = _prepare_window_df(df, tolerance_minutes=tolerance_minutes, scenarios=())
+    if orders.empty:
+        return pd.DataFrame(columns=[*JIT_DAY_KEY, *SUMMARY_COLUMNS])
+    out = summarize(deliveries, JIT_DAY_KEY)
+    out["date_dos"] = out["date_dos"].astype(str)
+    return out
+
+
+def rollup_analysis_tables(kpi: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    daily_overview / by_rfx_activity / by_channel uit voorgetelde rollup rijen
+    (minstens per date_dos, rfx_activity en kanaal), zonder de orders te laden.
+
+    - kpi_jit_day rijen: dezelfde tabellen als jit_analysis_tables (tolerantie 0, zonder scenario's)
+    - kpi_day rijen: een levering is een stop (dag, route, winkelpunt)
+    """
+    kpi = kpi[pd.to_numeric(kpi["rfx_activity"], errors="coerce").isin([4, 5])]
+    result: Dict[str, pd.DataFrame] = {}
+    if kpi.empty:
+        result["daily_overview"] = pd.DataFrame()
+        result["by_rfx_activity"] = pd.DataFrame()
+        result["by_channel"] = pd.DataFrame()
+        return result
+
+    names = {
+        "deliveries": "leveringen_totaal",
+        "deliveries_jit_s1": "leveringen_jit_S1",
+        "deliveries_jit_s2": "leveringen_jit_S2",
+        "orders": "orders_totaal",
+        "orders_jit_s1": "orders_jit_S1",
+        "orders_jit_s2": "orders_jit_S2",
+    }
+
+    def totals(by: str, columns: list) -> pd.DataFrame:
+        out = kpi.groupby(by, as_index=False)[list(names)].sum().rename(columns=names)
+        out = out[[by, *columns]]
+        for c in columns:
+            out[c] = out[c].astype(int)
+        out["JIT%_lev_S1"] = _pct_col(out["leveringen_jit_S1"], out["leveringen_totaal"])
+        out["JIT%_lev_S2"] = _pct_col(out["leveringen_jit_S2"], out["leveringen_totaal"])
+        return out
+
+    daily = totals("date_dos", list(names.values()))
+    daily["JIT%_ord_S1"] = _pct_col(daily["orders_jit_S1"], daily["orders_totaal"])
+    daily["JIT%_ord_S2"] = _pct_col(daily["orders_jit_S2"], daily["orders_totaal"])
+    result["daily_overview"] = daily.sort_values("date_dos")
+
+    # Enkel groepen met leveringen (kpi_jit_day telt ook orders zonder volledige leveringssleutel)
+    deliveries_only = ["leveringen_totaal", "leveringen_jit_S1", "leveringen_jit_S2"]
+    kpi = kpi[kpi["deliveries"] > 0]
+    result["by_rfx_activity"] = totals("rfx_activity", deliveries_only).rename(columns={"rfx_activity": "RFX Activity"})
+    result["by_channel"] = totals("kanaal", deliveries_only).sort_values("leveringen_totaal", ascending=False)
     return result
+
+
 # ------------------------------------------------------------
 # Route detail – per order & per levering voor één route
 # ------------------------------------------------------------
@@ -447,8 +637,9 @@ def jit_route_detail(
     # Hergebruik exact dezelfde voorbereiding
     orders_all, deliveries_all = _prepare_window_df(df, tolerance_minutes=tolerance_minutes)
 
-    if orders_all.empty or deliveries_all.empty:
+    if orders_all.empty:
         return orders_all.copy(), deliveries_all.copy()
+    deliveries_all = deliveries_all[deliveries_all["is_delivery"]].rename(columns={"orders": "orders_total"})
 
     target_date = pd.to_datetime(date_dos).date()
     route = str(cnr_tour)
@@ -456,12 +647,12 @@ def jit_route_detail(
     # Filter op datum + route
     orders = orders_all[
         (orders_all["date_dos"] == target_date)
-        & (orders_all["cnr_tour"] == route)
+        & (orders_all["cnr_tour"].astype(str) == route)
     ].copy()
 
     deliveries = deliveries_all[
         (deliveries_all["date_dos"] == target_date)
-        & (deliveries_all["cnr_tour"] == route)
+        & (deliveries_all["cnr_tour"].astype(str) == route)
     ].copy()
 
     # Mooie subset van kolommen (orders)
@@ -478,6 +669,7 @@ def jit_route_detail(
         "Actual",
         "order_jit_s1",
         "order_jit_s2",
+        *(f"order_jit_{n}" for n in scenario_names()),
     ]
     for c in order_cols:
         if c not in orders.columns:
@@ -501,6 +693,7 @@ def jit_route_detail(
         "orders_jit_s2",
         "delivery_jit_s1",
         "delivery_jit_s2",
+        *(f"delivery_jit_{n}" for n in scenario_names()),
     ]
     for c in deliv_cols:
         if c not in deliveries.columns:
@@ -0,0 +1,253 @@
+# ================================================================
+# jit_rca/bulk_import.py – parallelle import van historische exports (py3.9)
+#
+# Gebruik:
+#   PYTHONPATH=src python -m jit_rca.bulk_import exports/ --db jit.sqlite --workers 4
+#   PYTHONPATH=src python -m jit_rca.bulk_import "exports/2024-*.xlsx" --db jit.sqlite
+# ================================================================
+from __future__ import annotations
+
+import argparse
+import glob
+import multiprocessing
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Union
+
+import pandas as pd
+
+from .ingest import BUSY_TIMEOUT_S, CHUNK_ROWS, ensure_indexes, normalize_orders, upsert_frame
+from .jobs import post_ingest
+from .readers import iter_file_chunks
+
+# Bestandstypes die uit een map opgepikt worden
+FILE_SUFFIXES = (".xlsx", ".xlsm", ".xls", ".csv")
+
+# Welke bestanden al volledig geïmporteerd zijn (voor hervatten na onderbreking)
+MANIFEST_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS import_manifest (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    status TEXT,
+    rows_parsed INTEGER,
+    rows_written INTEGER,
+    error TEXT,
+    imported_at REAL
+)
+"""
+
+
+# ------------------------------------------------------------
+# Bestanden & manifest
+# ------------------------------------------------------------
+
+def collect_files(inputs: Sequence[str]) -> List[Path]:
+    """Mappen, glob-patronen en losse bestanden -> gesorteerde lijst unieke bestanden."""
+    found: Set[Path] = set()
+    for item in inputs:
+        p = Path(item)
+        if p.is_dir():
+            found.update(f for f in p.iterdir() if f.suffix.lower() in FILE_SUFFIXES)
+        elif p.exists():
+            found.add(p)
+        else:
+            found.update(Path(f) for f in glob.glob(item, recursive=True))
+    # Tijdelijke Excel lock-bestanden (~$naam.xlsx) overslaan
+    return sorted(f.resolve() for f in found if f.is_file() and not f.name.startswith("~$"))
+
+
+def _connect(db_path: Union[str, Path]) -> sqlite3.Connection:
+    return sqlite3.connect(str(db_path), timeout=BUSY_TIMEOUT_S)
+
+
+def _signature(path: Path) -> tuple:
+    st = path.stat()
+    return st.st_size, st.st_mtime_ns
+
+
+def pending_files(db_path: Union[str, Path], files: Sequence[Path], force: bool = False) -> List[Path]:
+    """Bestanden die nog niet (of in een andere versie) geïmporteerd werden."""
+    if force:
+        return list(files)
+    conn = _connect(db_path)
+    try:
+        conn.execute(MANIFEST_SCHEMA_SQL)
+        done = {
+            r[0]: (r[1], r[2])
+            for r in conn.execute("SELECT path, size, mtime_ns FROM import_manifest WHERE status = 'done'")
+        }
+    finally:
+        conn.close()
+    return [f for f in files if done.get(str(f)) != _signature(f)]
+
+
+def _mark(conn: sqlite3.Connection, path: Path, status: str, **fields: object) -> None:
+    size, mtime_ns = _signature(path)
+    with conn:
+        conn.execute(MANIFEST_SCHEMA_SQL)
+        conn.execute(
+            "INSERT OR REPLACE INTO import_manifest "
+            "(path, size, mtime_ns, status, rows_parsed, rows_written, error, imported_at) "
+            "VALUES (?,?,?,?,?,?,?,?)",
+            (
+                str(path), size, mtime_ns, status,
+                fields.get("rows_parsed"), fields.get("rows_written"), fields.get("error"), time.time(),
+            ),
+        )
+
+
+# ------------------------------------------------------------
+# Parsen (pool workers)
+# ------------------------------------------------------------
+
+def parse_file(path: Union[str, Path], spool_dir: Union[str, Path]) -> Dict[str, object]:
+    """
+    Lees en normaliseer één bestand (zelfde normalisatie als /upload) en
+    spool het resultaat naar schijf, zodat de schrijver het later in
+    datumvolgorde kan inladen zonder alles in het geheugen te houden.
+    """
+    path = Path(path)
+    t0 = time.perf_counter()
+    frames = [normalize_orders(chunk) for chunk in iter_file_chunks(path)]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    dates = df["date_dos"].dropna() if "date_dos" in df.columns else pd.Series(dtype=object)
+    if not dates.empty:
+        df = df.sort_values("date_dos", kind="mergesort").reset_index(drop=True)
+
+    spool = Path(spool_dir) / f"{path.stem}-{uuid.uuid4().hex[:8]}.pkl"
+    df.to_pickle(spool)
+    return {
+        "path": str(path),
+        "spool": str(spool),
+        "rows": len(df),
+        "first_date": dates.min() if not dates.empty else None,
+        "parse_s": time.perf_counter() - t0,
+    }
+
+
+# ------------------------------------------------------------
+# Import
+# ------------------------------------------------------------
+
+def _rate(rows: int, seconds: float) -> str:
+    return f"{rows / seconds:,.0f} rijen/s" if seconds > 0 else "-"
+
+
+def bulk_import(
+    inputs: Sequence[str],
+    db_path: Union[str, Path],
+    workers: int = 4,
+    force: bool = False,
+    parquet_dir: Optional[Union[str, Path]] = None,
+    chunk_rows: int = CHUNK_ROWS,
+    hot_months: int = 0,
+    retention_months: int = 0,
+    mmap_dir: Optional[Union[str, Path]] = None,
+    log=print,
+) -> Dict[str, object]:
+    """
+    Importeer een reeks exports in `orders` (upsert op de natuurlijke sleutel).
+
+    1. bestanden worden parallel geparsed en genormaliseerd (process pool)
+    2. de resultaten worden in datumvolgorde (eerste date_dos per bestand)
+       één voor één in de database geschreven
+    3. elk bestand wordt na het schrijven als 'done' in `import_manifest`
+       gezet; een onderbroken import kan dus gewoon opnieuw gestart worden
+    4. met hot_months > 0 gaan oude maanden daarna naar hun shard (jit_rca.shards)
+    """
+    files = collect_files(inputs)
+    todo = pending_files(db_path, files, force=force)
+    log(f"{len(files)} bestanden gevonden, {len(files) - len(todo)} al geïmporteerd, {len(todo)} te doen")
+    if not todo:
+        return {"files": 0, "rows_written": 0, "failed": []}
+
+    spool_dir = tempfile.mkdtemp(prefix="jit_bulk_")
+    parsed: List[Dict[str, object]] = []
+    failed: List[str] = []
+    t_start = time.perf_counter()
+    conn = _connect(db_path)
+    try:
+        # 1) parallel parsen
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=ctx) as pool:
+            futures = {pool.submit(parse_file, f, spool_dir): f for f in todo}
+            for fut in as_completed(futures):
+                f = futures[fut]
+                try:
+                    res = fut.result()
+                except Exception as exc:  # noqa: BLE001 - één slecht bestand stopt de import niet
+                    failed.append(str(f))
+                    _mark(conn, f, "failed", error=f"{type(exc).__name__}: {exc}")
+                    log(f"  FOUT   {f.name}: {type(exc).__name__}: {exc}")
+                    continue
+                parsed.append(res)
+                log(f"  parse  {f.name}: {res['rows']:>8,} rijen in {res['parse_s']:6.2f}s "
+                    f"({_rate(res['rows'], res['parse_s'])})")
+
+        # 2) schrijven in datumvolgorde
+        parsed.sort(key=lambda r: (r["first_date"] is None, r["first_date"] or "", r["path"]))
+        total_written = 0
+        changed: Set[str] = set()
+        for res in parsed:
+            path = Path(res["path"])
+            t0 = time.perf_counter()
+            df = pd.read_pickle(res["spool"])
+            written, replaced, dates = upsert_frame(conn, df, chunk_rows=chunk_rows)
+            write_s = time.perf_counter() - t0
+            Path(res["spool"]).unlink(missing_ok=True)
+
+            _mark(conn, path, "done", rows_parsed=res["rows"], rows_written=written)
+            total_written += written
+            changed |= dates
+            log(f"  write  {path.name}: {written:>8,} geschreven ({replaced:,} vervangen) in {write_s:6.2f}s "
+                f"({_rate(res['rows'], write_s)})")
+        if parsed:
+            ensure_indexes(conn)
+    finally:
+        conn.close()
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    if changed:
+        post_ingest(
+            db_path, sorted(d for d in changed if d is not None), parquet_dir=parquet_dir,
+            hot_months=hot_months, retention_months=retention_months, mmap_dir=mmap_dir,
+        )
+
+    elapsed = time.perf_counter() - t_start
+    rows_parsed = sum(int(r["rows"]) for r in parsed)
+    log(f"Klaar: {len(parsed)} bestanden, {rows_parsed:,} rijen in {elapsed:.1f}s "
+        f"({_rate(rows_parsed, elapsed)}), {len(failed)} mislukt")
+    return {"files": len(parsed), "rows_written": total_written, "failed": failed}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Parallelle import van OTIF exports (xlsx/xls/csv) in orders.")
+    ap.add_argument("inputs", nargs="+", help="mappen, bestanden of glob-patronen")
+    ap.add_argument("--db", default="jit.sqlite", help="SQLite database (standaard: jit.sqlite)")
+    ap.add_argument("--workers", type=int, default=4, help="aantal parse-processen (standaard: 4)")
+    ap.add_argument("--force", action="store_true", help="ook reeds geïmporteerde bestanden opnieuw inlezen")
+    ap.add_argument("--parquet-dir", default=None, help="Parquet dataset bijwerken (zoals JIT_ORDERS_BACKEND=parquet)")
+    ap.add_argument("--mmap-dir", default=None, help="kolomopslag herbouwen (zoals JIT_ORDERS_BACKEND=mmap)")
+    ap.add_argument("--hot-months", type=int, default=0,
+                    help="oudere maanden naar maandshards verplaatsen (zoals JIT_HOT_MONTHS; standaard: 0 = uit)")
+    ap.add_argument("--retention-months", type=int, default=0,
+                    help="shards ouder dan N maanden archiveren (zoals JIT_RETENTION_MONTHS; standaard: 0 = nooit)")
+    args = ap.parse_args(argv)
+
+    result = bulk_import(
+        args.inputs, args.db, workers=args.workers, force=args.force, parquet_dir=args.parquet_dir,
+        hot_months=args.hot_months, retention_months=args.retention_months, mmap_dir=args.mmap_dir,
+    )
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
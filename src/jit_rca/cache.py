@@ -0,0 +1,125 @@
+# ================================================================
+# jit_rca/cache.py – LRU cache voor geladen en afgeleide DataFrames (py3.9)
+#
+# Sleutel = (datasetversie, soort, filters). Een upload verhoogt de versie
+# in `dataset_meta`; bij de eerste opvraging met een nieuwe versie wordt de
+# cache leeggemaakt. Het geheugenbudget geldt voor alle entries samen.
+# ================================================================
+from __future__ import annotations
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+
+def _nbytes(value: object) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    return sys.getsizeof(value)
+
+
+def _copy(value: object) -> object:
+    # Endpoints passen frames soms ter plaatse aan: nooit de gecachte versie teruggeven
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    return value
+
+
+class ResultCache:
+    """Thread-safe LRU cache met geheugenbudget (bytes) en hit/miss tellers."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[Hashable, Tuple[object, int]]" = OrderedDict()
+        self._bytes = 0
+        self._version: Optional[object] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: object) -> None:
+        if version != self._version:
+            if self._items:
+                self.invalidations += 1
+            self._items.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, version: object, key: Hashable) -> Optional[object]:
+        with self._lock:
+            self._check_version(version)
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return _copy(item[0])
+
+    def find(self, version: object, match: Callable[[Hashable], bool]) -> Optional[object]:
+        """
+        Recentste entry waarvan de sleutel aan `match` voldoet. Geeft de gecachte
+        waarde zelf terug (geen kopie): de aanroeper neemt er een kopie/selectie van.
+        """
+        with self._lock:
+            self._check_version(version)
+            for key in reversed(self._items):
+                if match(key):
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return self._items[key][0]
+            self.misses += 1
+        return None
+
+    def put(self, version: object, key: Hashable, value: object) -> None:
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if version != self._version:
+                # berekend op een versie die intussen vervangen is
+                return
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._items:
+                _, (_, freed) = self._items.popitem(last=False)
+                self._bytes -= freed
+                self.evictions += 1
+
+    def get_or_compute(self, version: object, key: Hashable, compute: Callable[[], object]) -> object:
+        value = self.get(version, key)
+        if value is not None:
+            return value
+        value = compute()
+        self.put(version, key, value)
+        return _copy(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self._version,
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,236 @@
+# ================================================================
+# jit_rca/colstore.py – gedeelde memory-mapped kolomopslag voor orders (py3.9)
+#
+# Na elke ingest wordt `orders` (jit.sqlite + live maandshards) volledig
+# weggeschreven als één .npy bestand per kolom:
+#
+#   data/orders_mmap/CURRENT              naam van de actieve build
+#   data/orders_mmap/b-<id>/_meta.json    kolommen, soort, dagindex
+#   data/orders_mmap/b-<id>/<i>.npy       numerieke waarden of dictionary-codes
+#   data/orders_mmap/b-<id>/<i>.json      dictionary van een tekstkolom
+#
+# Elke API-worker mapt de bestanden read-only (np.load mmap_mode="r"); alle
+# workers delen zo dezelfde pagina's in de page cache i.p.v. elk een eigen
+# kopie van de orders in geheugen te houden. De rijen staan gesorteerd op
+# date_dos, zodat een datumfilter een aaneengesloten slice is; RFX Activity
+# en route worden met een boolean mask gefilterd.
+# ================================================================
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .ingest import CATEGORY_COLUMNS, DICT_COLUMNS, ORDERS_TABLE, decode_dims
+from .shards import read_shards
+
+__all__ = ["has_store", "build_store", "read_orders"]
+
+CURRENT_FILE = "CURRENT"
+META_FILE = "_meta.json"
+
+# Tekstkolommen die als categorical terugkomen; andere tekstkolommen worden object-strings
+_CATEGORICAL = {*DICT_COLUMNS, *CATEGORY_COLUMNS}
+
+
+def has_store(root: Union[str, Path]) -> bool:
+    return (Path(root) / CURRENT_FILE).exists()
+
+
+# ------------------------------------------------------------
+# Opbouw (in het ingest-proces)
+# ------------------------------------------------------------
+
+def _read_all(db_path: Union[str, Path]) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """
+    Alle orders (shards + jit.sqlite) met winkel/klant gedecodeerd, gesorteerd
+    op date_dos, en de SQLite kolomtypes van `orders`.
+    """
+    conn = sqlite3.connect(str(db_path))
+    try:
+        types = {r[1]: (r[2] or "").upper() for r in conn.execute(f'PRAGMA table_info("{ORDERS_TABLE}")')}
+        def read(source: sqlite3.Connection) -> pd.DataFrame:
+            return pd.read_sql_query(f'SELECT * FROM "{ORDERS_TABLE}" ORDER BY rowid', source)
+
+        frames = [*read_shards(conn, read), read(conn)]
+        frames = [f for f in frames if not f.empty] or frames[-1:]
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        df = decode_dims(conn, df)
+    finally:
+        conn.close()
+    # Stabiel sorteren: binnen een dag blijft de volgorde van de orderregels behouden
+    return df.sort_values("date_dos", kind="stable", na_position="last").reset_index(drop=True), types
+
+
+def _encode(s: pd.Series, sqlite_type: str) -> Tuple[str, np.ndarray, Optional[list]]:
+    """
+    (soort, waarden, dictionary): getallen as-is ("int" = INTEGER kolom, met NULL
+    als float/NaN opgeslagen), tekst als int32 codes (-1 = NULL) + dictionary.
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return "dict", s.cat.codes.to_numpy(dtype=np.int32), [str(v) for v in s.cat.categories]
+    if pd.api.types.is_numeric_dtype(s):
+        return "int" if "INT" in sqlite_type else "num", s.to_numpy(), None
+    codes, uniques = pd.factorize(s, sort=True)
+    return "dict", codes.astype(np.int32), [str(v) for v in uniques]
+
+
+def build_store(db_path: Union[str, Path], root: Union[str, Path]) -> int:
+    """
+    Bouw de kolomopslag volledig opnieuw op en maak ze actief (CURRENT).
+    De vorige build blijft staan voor workers die ze nog aan het openen zijn;
+    oudere builds worden verwijderd (al gemapte bestanden blijven geldig).
+    Retourneert het aantal rijen.
+    """
+    root = Path(root)
+    df, types = _read_all(db_path)
+    build = f"b-{uuid.uuid4().hex[:12]}"
+    target = root / build
+    target.mkdir(parents=True)
+
+    kinds: Dict[str, str] = {}
+    for i, col in enumerate(df.columns):
+        kind, values, dictionary = _encode(df[col], types.get(col, ""))
+        kinds[col] = kind
+        np.save(target / f"{i}.npy", values, allow_pickle=False)
+        if dictionary is not None:
+            (target / f"{i}.json").write_text(json.dumps(dictionary))
+
+    # Dagindex: rijen van days[k] = [offsets[k], offsets[k + 1]); NULL-datums achteraan
+    dates = df["date_dos"]
+    days = sorted(dates.dropna().unique().tolist())
+    counts = dates.value_counts()
+    offsets = [0]
+    for d in days:
+        offsets.append(offsets[-1] + int(counts[d]))
+    meta = {"rows": len(df), "columns": list(df.columns), "kinds": kinds, "days": days, "offsets": offsets}
+    (target / META_FILE).write_text(json.dumps(meta))
+
+    previous = (root / CURRENT_FILE).read_text().strip() if has_store(root) else None
+    tmp = root / f"{CURRENT_FILE}.tmp-{uuid.uuid4().hex[:8]}"
+    tmp.write_text(build)
+    os.replace(tmp, root / CURRENT_FILE)
+    for p in root.glob("b-*"):
+        if p.name not in (build, previous):
+            shutil.rmtree(p, ignore_errors=True)
+    return len(df)
+
+
+# ------------------------------------------------------------
+# Lezen (in de API-workers)
+# ------------------------------------------------------------
+
+class _Store:
+    """Eén gemapte build; kolommen en dictionaries worden pas bij gebruik geopend."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.meta = json.loads((path / META_FILE).read_text())
+        self._index = {c: i for i, c in enumerate(self.meta["columns"])}
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._dicts: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def array(self, col: str) -> np.ndarray:
+        with self._lock:
+            if col not in self._arrays:
+                self._arrays[col] = np.load(self.path / f"{self._index[col]}.npy", mmap_mode="r")
+            return self._arrays[col]
+
+    def dictionary(self, col: str) -> np.ndarray:
+        with self._lock:
+            if col not in self._dicts:
+                values = json.loads((self.path / f"{self._index[col]}.json").read_text())
+                self._dicts[col] = np.array(values, dtype=object)
+            return self._dicts[col]
+
+
+_STORES: Dict[str, Tuple[str, _Store]] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def _open(root: Path) -> _Store:
+    """Actieve build van `root`; na een nieuwe ingest wordt de nieuwe build gemapt."""
+    build = (root / CURRENT_FILE).read_text().strip()
+    key = str(root.resolve())
+    with _STORES_LOCK:
+        cached = _STORES.get(key)
+        if cached is None or cached[0] != build:
+            cached = _STORES[key] = (build, _Store(root / build))
+        return cached[1]
+
+
+def _equals(store: _Store, col: str, values: np.ndarray, value: str) -> np.ndarray:
+    """Zelfde vergelijking als `col = ?` met een tekstparameter in SQLite."""
+    if store.meta["kinds"][col] == "dict":
+        matches = np.flatnonzero(store.dictionary(col) == str(value))
+        return np.isin(values, matches)
+    try:
+        number = float(value)
+    except ValueError:
+        return np.zeros(len(values), dtype=bool)
+    return values == number
+
+
+def _column(store: _Store, col: str, rows: Union[slice, np.ndarray]) -> Union[np.ndarray, pd.Categorical]:
+    values = store.array(col)[rows]
+    kind = store.meta["kinds"][col]
+    if kind == "int" and values.dtype.kind == "f" and not np.isnan(values).any():
+        # Zoals bij SQLite: int64 zolang er in de selectie geen NULL zit
+        return values.astype(np.int64)
+    if kind != "dict":
+        return np.array(values)
+    dictionary = store.dictionary(col)
+    if col in _CATEGORICAL:
+        return pd.Categorical.from_codes(values, categories=dictionary)
+    out = np.full(len(values), None, dtype=object)
+    valid = values >= 0
+    out[valid] = dictionary[values[valid]]
+    return out
+
+
+def read_orders(
+    root: Union[str, Path],
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    rfx_activity: Optional[str] = None,
+    cnr_tour: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    Orders volgens dezelfde filters als load_orders: de datumfilter is een
+    slice op de gesorteerde rijen, RFX Activity en route een boolean mask.
+    Enkel de gevraagde kolommen en rijen worden uit de mapping gekopieerd.
+    """
+    store = _open(Path(root))
+    meta = store.meta
+    rows: Union[slice, np.ndarray] = slice(0, meta["rows"])
+    if date_from or date_to:
+        days: List[str] = meta["days"]
+        lo = bisect.bisect_left(days, date_from) if date_from else 0
+        hi = bisect.bisect_right(days, date_to) if date_to else len(days)
+        rows = slice(meta["offsets"][lo], meta["offsets"][max(lo, hi)])
+
+    mask: Optional[np.ndarray] = None
+    for col, value in (("RFX Activity", rfx_activity), ("cnr_tour", cnr_tour)):
+        if not value:
+            continue
+        if col not in meta["kinds"]:
+            mask = np.zeros(rows.stop - rows.start, dtype=bool)
+            continue
+        m = _equals(store, col, store.array(col)[rows], value)
+        mask = m if mask is None else (mask & m)
+    if mask is not None:
+        rows = np.arange(rows.start, rows.stop)[mask]
+
+    wanted = [c for c in meta["columns"] if columns is None or c in columns]
+    return pd.DataFrame({c: _column(store, c, rows) for c in wanted}, columns=wanted)
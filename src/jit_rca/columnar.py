@@ -0,0 +1,201 @@
+# ================================================================
+# jit_rca/columnar.py – optionele Parquet/Arrow opslag voor orders
+# ================================================================
+from __future__ import annotations
+
+import json
+import shutil
+import sqlite3
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import pandas as pd
+
+from .ingest import DICT_COLUMNS
+from .shards import read_shards
+
+try:  # optionele dependency
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # pragma: no cover - afhankelijk van installatie
+    pa = None
+    ds = None
+
+__all__ = ["available", "has_dataset", "export_orders", "read_orders"]
+
+# Partitionering: één map per dag en per RFX Activity (hive-stijl)
+PARTITION_COLUMNS = ["date_dos", "RFX Activity"]
+
+# Oorspronkelijke kolomvolgorde (partitiekolommen zitten niet in de bestanden)
+COLUMNS_FILE = "_columns.json"
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def _require() -> None:
+    if pa is None:
+        raise RuntimeError("Parquet backend vereist 'pyarrow' (pip install pyarrow).")
+
+
+def _partitioning():
+    return ds.partitioning(
+        pa.schema([(c, pa.string()) for c in PARTITION_COLUMNS]), flavor="hive"
+    )
+
+
+def _date_dir(root: Path, date_dos: str) -> Path:
+    return root / f"date_dos={date_dos}"
+
+
+def has_dataset(root: Union[str, Path]) -> bool:
+    return available() and (Path(root) / COLUMNS_FILE).exists()
+
+
+def _arrow_type(sqlite_type: str):
+    t = (sqlite_type or "").upper()
+    if "INT" in t:
+        return pa.int64()
+    if "REAL" in t or "FLOA" in t or "DOUB" in t:
+        return pa.float64()
+    return pa.string()
+
+
+def _column_type(column: str, sqlite_type: str):
+    if column in PARTITION_COLUMNS:
+        return pa.string()
+    if column in DICT_COLUMNS:
+        # dictionary-encoded -> komt als categorical terug in pandas
+        return pa.dictionary(pa.int32(), pa.string())
+    return _arrow_type(sqlite_type)
+
+
+def _write_frame(df: pd.DataFrame, root: Path, types: Dict[str, str]) -> None:
+    """Schrijf één DataFrame naar de dataset, met kolomtypes volgens het SQLite schema."""
+    df = df.copy()
+    for c in PARTITION_COLUMNS:
+        if c in df.columns:
+            v = df[c].astype("Int64") if pd.api.types.is_numeric_dtype(df[c]) else df[c]
+            df[c] = v.astype(str).where(v.notna(), None)
+    schema = pa.schema([(c, _column_type(c, types.get(c, ""))) for c in df.columns])
+    table = pa.Table.from_pandas(df.astype(object).where(df.notna(), None), schema=schema, preserve_index=False)
+    ds.write_dataset(
+        table,
+        root,
+        format="parquet",
+        partitioning=_partitioning(),
+        basename_template=f"part-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+
+def _read_day(conn: sqlite3.Connection, day: str, columns: List[str]) -> pd.DataFrame:
+    """Orders van één dag, uit jit.sqlite of (oude maanden) uit de shard."""
+
+    def read(source: sqlite3.Connection) -> pd.DataFrame:
+        return pd.read_sql_query("SELECT * FROM orders WHERE date_dos = ? ORDER BY rowid", source, params=[day])
+
+    frames = [*read_shards(conn, read, day, day), read(conn)]
+    frames = [f for f in frames if not f.empty] or frames[-1:]
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    return df.reindex(columns=columns)
+
+
+def export_orders(
+    db_path: Union[str, Path],
+    root: Union[str, Path],
+    dates: Optional[Iterable[str]] = None,
+) -> int:
+    """
+    Exporteer de SQLite tabel `orders` naar de Parquet dataset.
+
+    - dates=None: volledige herbouw (in een tijdelijke map, daarna omwisselen)
+    - dates=[...]: enkel de partities van die dagen worden herschreven
+    Retourneert het aantal geëxporteerde rijen.
+    """
+    _require()
+    root = Path(root)
+    conn = sqlite3.connect(str(db_path))
+    try:
+        info = conn.execute('PRAGMA table_info("orders")').fetchall()
+        columns = [r[1] for r in info]
+        types = {r[1]: r[2] for r in info}
+        if not columns:
+            return 0
+
+        if dates is None:
+            target = root.parent / f".{root.name}.tmp-{uuid.uuid4().hex[:8]}"
+            days = {r[0] for r in conn.execute("SELECT DISTINCT date_dos FROM orders")}
+            # Oude maanden staan in shards; die horen ook in de dataset
+            for shard_days in read_shards(conn, lambda c: pd.read_sql_query("SELECT DISTINCT date_dos FROM orders", c)):
+                days.update(shard_days["date_dos"])
+            day_list = sorted(days, key=lambda d: (d is not None, d or ""))
+        else:
+            target = root
+            day_list = sorted(set(dates))
+        target.mkdir(parents=True, exist_ok=True)
+
+        n = 0
+        for day in day_list:
+            if dates is not None:
+                shutil.rmtree(_date_dir(target, day), ignore_errors=True)
+            if day is None:
+                df = pd.read_sql_query("SELECT * FROM orders WHERE date_dos IS NULL ORDER BY rowid", conn)
+            else:
+                df = _read_day(conn, day, columns)
+            if not df.empty:
+                _write_frame(df, target, types)
+                n += len(df)
+
+        (target / COLUMNS_FILE).write_text(json.dumps(columns))
+    finally:
+        conn.close()
+
+    if dates is None:
+        old = root.parent / f".{root.name}.old-{uuid.uuid4().hex[:8]}"
+        if root.exists():
+            root.rename(old)
+        target.rename(root)
+        shutil.rmtree(old, ignore_errors=True)
+    return n
+
+
+def read_orders(
+    root: Union[str, Path],
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    rfx_activity: Optional[str] = None,
+    cnr_tour: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    Lees orders uit de Parquet dataset met filter- en kolom-pushdown:
+    datum- en RFX-filters selecteren enkel de betrokken partities,
+    de route-filter gebruikt de row-group statistieken.
+    """
+    _require()
+    root = Path(root)
+    all_columns: List[str] = json.loads((root / COLUMNS_FILE).read_text())
+    dataset = ds.dataset(root, format="parquet", partitioning=_partitioning())
+
+    expr = None
+    conds = []
+    if date_from:
+        conds.append(ds.field("date_dos") >= date_from)
+    if date_to:
+        conds.append(ds.field("date_dos") <= date_to)
+    if rfx_activity:
+        conds.append(ds.field("RFX Activity") == rfx_activity)
+    if cnr_tour:
+        value = str(cnr_tour)
+        if "cnr_tour" in dataset.schema.names and pa.types.is_integer(dataset.schema.field("cnr_tour").type):
+            value = int(value) if value.lstrip("-").isdigit() else None
+        conds.append(ds.field("cnr_tour") == value if value is not None else ds.scalar(False))
+    for c in conds:
+        expr = c if expr is None else (expr & c)
+
+    wanted = [c for c in (columns or all_columns) if c in dataset.schema.names]
+    table = dataset.to_table(columns=wanted, filter=expr)
+    return table.to_pandas()
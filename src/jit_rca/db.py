@@ -1,6 +1,13 @@
 from __future__ import annotations
 import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
 from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
 
 DB_PATH = Path(__file__).resolve().parents[2] / 'data' / 'jit.db'
 
@@ -24,26 +31,266 @@ CREATE TABLE IF NOT EXISTS deliveries (
 CREATE INDEX IF NOT EXISTS idx_deliveries_date ON deliveries(date_dos);
 CREATE INDEX IF NOT EXISTS idx_deliveries_tour ON deliveries(cnr_tour);
 '''
-def get_conn():
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(DB_PATH))
+
+INSERT_SQL = '''INSERT OR IGNORE INTO deliveries
+    (uid, cnr_tour, cnr_cust, nm_short_unload, customer, site, planned_time, actual_time, date_dos, raw_planned, raw_actual, payload_json)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?)'''
+
+# Rijen per transactie bij bulk inserts
+CHUNK_ROWS = 10_000
+
+# WAL: lezers blokkeren schrijvers niet; NORMAL is veilig in WAL mode
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',      # 64 MB page cache
+    'PRAGMA mmap_size=268435456',    # 256 MB memory-mapped I/O
+    'PRAGMA busy_timeout=60000',
+)
+
+# Enkel tijdens bulk_load: geen fsync per commit (bij crash eventueel laatste batch kwijt)
+BULK_PRAGMAS = ('PRAGMA synchronous=OFF',)
+
+# Lezers: enkel pragmas die geen schrijfrechten vragen
+READER_PRAGMAS = (
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA busy_timeout=60000',
+    'PRAGMA query_only=ON',
+)
+
+
+def _path(db_path: Optional[Union[str, Path]]) -> Path:
+    return Path(db_path) if db_path is not None else DB_PATH
+
+
+def get_conn(db_path: Optional[Union[str, Path]] = None, check_same_thread: bool = True):
+    path = _path(db_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), check_same_thread=check_same_thread)
+    return conn
+
+
+def connect(db_path: Optional[Union[str, Path]] = None, check_same_thread: bool = True) -> sqlite3.Connection:
+    # Verbinding met WAL en afgestemde pragmas; transacties worden expliciet beheerd
+    conn = get_conn(db_path, check_same_thread=check_same_thread)
+    conn.isolation_level = None
+    for p in PRAGMAS:
+        conn.execute(p)
+    return conn
+
+
+def connect_readonly(db_path: Optional[Union[str, Path]] = None) -> sqlite3.Connection:
+    # Read-only (mode=ro); mag vanuit een andere thread gesloten worden
+    uri = _path(db_path).resolve().as_uri() + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.isolation_level = None
+    for p in READER_PRAGMAS:
+        conn.execute(p)
+    return conn
+
+
+# Pool per databasebestand (per proces): read-only verbinding per thread, één schrijver
+class _Pool:
+    def __init__(self, path: Path):
+        self.path = path
+        self.local = threading.local()
+        self.lock = threading.Lock()          # beschermt readers + stats
+        self.write_lock = threading.Lock()    # één schrijver tegelijk
+        self.readers: List[sqlite3.Connection] = []
+        self.writer: Optional[sqlite3.Connection] = None
+        self.ready = False
+        self.stats = {
+            'readers_opened': 0,
+            'reads': 0,
+            'writes': 0,
+            'write_lock_wait_s': 0.0,
+            'write_lock_wait_max_s': 0.0,
+            'busy_wait_s': 0.0,
+            'busy_wait_max_s': 0.0,
+        }
+
+
+_pools: Dict[str, _Pool] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(db_path: Optional[Union[str, Path]]) -> _Pool:
+    path = _path(db_path).resolve()
+    with _pools_lock:
+        if str(path) not in _pools:
+            _pools[str(path)] = _Pool(path)
+        return _pools[str(path)]
+
+
+def setup(db_path: Optional[Union[str, Path]], schema: Callable[[sqlite3.Connection], None]) -> None:
+    # Schema één keer per proces aanmaken (en WAL activeren) via de schrijver
+    pool = _pool(db_path)
+    if pool.ready:
+        return
+    with writer(db_path) as conn:
+        if not pool.ready:
+            schema(conn)
+            pool.ready = True
+
+
+def reader(db_path: Optional[Union[str, Path]] = None) -> sqlite3.Connection:
+    # Herbruikbare read-only verbinding van de huidige thread
+    pool = _pool(db_path)
+    conn = getattr(pool.local, 'conn', None)
+    with pool.lock:
+        pool.stats['reads'] += 1
+        if conn is None:
+            conn = pool.local.conn = connect_readonly(pool.path)
+            pool.readers.append(conn)
+            pool.stats['readers_opened'] += 1
     return conn
 
-def init_db():
-    with get_conn() as conn:
+
+@contextmanager
+def writer(db_path: Optional[Union[str, Path]] = None) -> Iterator[sqlite3.Connection]:
+    # De schrijver van dit proces, in één transactie (BEGIN IMMEDIATE .. COMMIT)
+    pool = _pool(db_path)
+    t0 = time.perf_counter()
+    with pool.write_lock:
+        t1 = time.perf_counter()
+        if pool.writer is None:
+            pool.writer = connect(pool.path, check_same_thread=False)
+        conn = pool.writer
+        conn.execute('BEGIN IMMEDIATE')   # wacht (busy_timeout) op schrijvers in andere processen
+        t2 = time.perf_counter()
+        with pool.lock:
+            st = pool.stats
+            st['writes'] += 1
+            st['write_lock_wait_s'] += t1 - t0
+            st['write_lock_wait_max_s'] = max(st['write_lock_wait_max_s'], t1 - t0)
+            st['busy_wait_s'] += t2 - t1
+            st['busy_wait_max_s'] = max(st['busy_wait_max_s'], t2 - t1)
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        if conn.in_transaction:
+            conn.execute('COMMIT')
+
+
+def pool_stats(db_path: Optional[Union[str, Path]] = None) -> dict:
+    pool = _pool(db_path)
+    with pool.lock:
+        out = dict(pool.stats)
+        out['readers_open'] = len(pool.readers)
+    out['writer_open'] = pool.writer is not None
+    out['writer_busy'] = pool.write_lock.locked()
+    for k in ('write_lock_wait_s', 'write_lock_wait_max_s', 'busy_wait_s', 'busy_wait_max_s'):
+        out[k] = round(out[k], 4)
+    return out
+
+
+def close_pool(db_path: Optional[Union[str, Path]] = None) -> None:
+    pool = _pool(db_path)
+    with pool.write_lock:
+        if pool.writer is not None:
+            pool.writer.close()
+            pool.writer = None
+    with pool.lock:
+        for conn in pool.readers:
+            conn.close()
+        pool.readers = []
+        pool.local = threading.local()
+
+
+def init_db(db_path: Optional[Union[str, Path]] = None):
+    with closing(get_conn(db_path)) as conn:
         conn.executescript(SCHEMA_SQL)
 
-def insert_many(rows: list[tuple]):
-    sql = '''INSERT OR IGNORE INTO deliveries
-    (uid, cnr_tour, cnr_cust, nm_short_unload, customer, site, planned_time, actual_time, date_dos, raw_planned, raw_actual, payload_json)
-    VALUES (?,?,?,?,?,?,?,?,?,?,?,?)'''
-    with get_conn() as conn:
-        conn.executemany(sql, rows)
-        conn.commit()
-
-def query_between(date_from: str, date_to: str) -> list[dict]:
-    sql = 'SELECT * FROM deliveries WHERE date_dos >= ? AND date_dos < ?'
-    with get_conn() as conn:
-        cur = conn.execute(sql, (date_from, date_to))
-        cols = [c[0] for c in cur.description]
-        return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+@contextmanager
+def bulk_load(db_path: Optional[Union[str, Path]] = None) -> Iterator[sqlite3.Connection]:
+    # Bulk-load mode: één verbinding voor alle inserts, synchronous=OFF tot het einde
+    conn = connect(db_path)
+    try:
+        conn.executescript(SCHEMA_SQL)
+        for p in BULK_PRAGMAS:
+            conn.execute(p)
+        yield conn
+        conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+    finally:
+        conn.close()
+
+
+def insert_many(
+    rows: Iterable[tuple],
+    conn: Optional[sqlite3.Connection] = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> int:
+    # Gechunkte executemany, elke chunk in een expliciete transactie
+    if conn is None:
+        with writer() as w:
+            return insert_many(rows, conn=w, chunk_rows=chunk_rows)
+    n = 0
+    buf: list = []
+    for row in rows:
+        buf.append(row)
+        if len(buf) >= chunk_rows:
+            n += _insert_chunk(conn, buf)
+            buf = []
+    if buf:
+        n += _insert_chunk(conn, buf)
+    return n
+
+
+def _insert_chunk(conn: sqlite3.Connection, rows: list) -> int:
+    if conn.in_transaction:
+        # binnen writer(): die beheert de transactie
+        conn.executemany(INSERT_SQL, rows)
+        return len(rows)
+    conn.execute('BEGIN')
+    try:
+        conn.executemany(INSERT_SQL, rows)
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+    return len(rows)
+
+
+def _between(columns: Optional[Sequence[str]]) -> str:
+    cols = ', '.join(columns) if columns else '*'
+    return f'SELECT {cols} FROM deliveries WHERE date_dos >= ? AND date_dos < ?'
+
+
+def query_between(date_from: str, date_to: str, conn: Optional[sqlite3.Connection] = None) -> list[dict]:
+    conn = conn if conn is not None else reader()
+    cur = conn.execute(_between(None), (date_from, date_to))
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+
+def query_between_df(
+    date_from: str,
+    date_to: str,
+    columns: Optional[Sequence[str]] = None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> pd.DataFrame:
+    conn = conn if conn is not None else reader()
+    return pd.read_sql_query(_between(columns), conn, params=(date_from, date_to))
+
+
+def query_between_columns(
+    date_from: str,
+    date_to: str,
+    columns: Optional[Sequence[str]] = None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> Dict[str, np.ndarray]:
+    # Kolomgewijs resultaat: {kolom: array}, zonder dict per rij
+    conn = conn if conn is not None else reader()
+    cur = conn.execute(_between(columns), (date_from, date_to))
+    cols = [c[0] for c in cur.description]
+    rows = cur.fetchall()
+    if not rows:
+        return {c: np.empty(0, dtype=object) for c in cols}
+    return {c: np.array(v, dtype=object) for c, v in zip(cols, zip(*rows))}
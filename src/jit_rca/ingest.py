@@ -0,0 +1,591 @@
+# ================================================================
+# jit_rca/ingest.py – streaming ingest van OTIF exports (py3.9)
+# ================================================================
+from __future__ import annotations
+
+import sqlite3
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .readers import CHUNK_ROWS, iter_excel_chunks, iter_file_chunks  # noqa: F401 - re-export
+from .timekernel import format_hhmm, parse_minutes
+
+ID_COLUMNS = ["cnr_tour", "cnr_cust", "RFX Activity", "RFX Year", "RFX Preperation"]
+TIME_COLUMNS = ["Win FROM", "Win UNTIL", "Planned", "Actual", "P_Depart", "A_Depart"]
+
+# Tijdkolommen worden bij ingest ook als gehele minuten sinds middernacht bewaard,
+# samen met het dagnummer (dagen sinds 1970-01-01) van date_dos.
+MINUTE_COLUMNS = {
+    "Win FROM": "win_from_min",
+    "Win UNTIL": "win_until_min",
+    "Planned": "planned_min",
+    "Actual": "actual_min",
+    "P_Depart": "p_depart_min",
+    "A_Depart": "a_depart_min",
+}
+DAY_COLUMN = "day_num"
+
+# Getypeerde kolommen: gehele route-id's en activiteitscodes, REAL duurtijden
+INT_COLUMNS = ["cnr_tour", "RFX Activity", "RFX Year"]
+REAL_COLUMNS = ["DurationP", "DurationA"]
+
+# Dictionary-encoding: tekstkolom -> (dimensietabel, codekolom in orders).
+# De tekstkolom blijft in orders staan (natuurlijke sleutel, leesbare SQL);
+# load_orders leest enkel de codes en bouwt er een categorical van.
+DICT_COLUMNS = {
+    "nm_short_unload": ("dim_store", "store_id"),
+    "cnr_cust": ("dim_customer", "cust_id"),
+}
+
+# Kolommen die bij het laden categorical worden (naast DICT_COLUMNS)
+CATEGORY_COLUMNS = ["RFX Preperation"]
+
+# Dtypes in geladen DataFrames
+INT_DTYPES = {"cnr_tour": "Int64", "RFX Activity": "Int16", "RFX Year": "Int16"}
+
+# SQLite kolomtypes die afwijken van TEXT
+COLUMN_TYPES = {c: "INTEGER" for c in [*MINUTE_COLUMNS.values(), DAY_COLUMN, *INT_COLUMNS]}
+COLUMN_TYPES.update({c: "REAL" for c in REAL_COLUMNS})
+COLUMN_TYPES.update({code: "INTEGER" for _, code in DICT_COLUMNS.values()})
+
+ORDERS_TABLE = "orders"
+STAGING_TABLE = "orders__staging"
+
+# Natuurlijke sleutel van een orderregel (voor upsert)
+NATURAL_KEY = ["date_dos", "cnr_tour", "nm_short_unload", "cnr_cust", "Planned"]
+
+# Indexen op orders voor de filters van load_orders (na elke ingest aangemaakt)
+ORDERS_INDEXES = {
+    "idx_orders_date_tour": ["date_dos", "cnr_tour"],
+    "idx_orders_date_activity": ["date_dos", "RFX Activity"],
+    "idx_orders_store_date": ["nm_short_unload", "date_dos"],
+}
+
+# replace = tabel volledig vervangen, upsert = enkel nieuwe/gewijzigde rijen schrijven
+INGEST_MODES = ("replace", "upsert")
+
+# Andere ingest-processen houden de schrijflock telkens maar één chunk vast
+BUSY_TIMEOUT_S = 60.0
+
+
+# ------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------
+
+def _q(name: str) -> str:
+    """Quote een kolom- of tabelnaam voor SQLite."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+# ------------------------------------------------------------
+# Normalisatie (identiek voor elke chunk)
+# ------------------------------------------------------------
+
+def normalize_orders(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliseer ruwe OTIF-rijen:
+    - date_dos -> YYYY-MM-DD
+    - ID-kolommen als gestripte string
+    - tijdkolommen als short time HH:MM
+    - + minutenkolommen en day_num (zie add_time_minutes)
+    """
+    df.columns = [str(c).strip() for c in df.columns]
+
+    if "date_dos" in df.columns:
+        df["date_dos"] = pd.to_datetime(df["date_dos"], errors="coerce").dt.strftime("%Y-%m-%d")
+
+    for col in ID_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.strip()
+
+    # Short time HH:MM
+    for col in TIME_COLUMNS:
+        if col in df.columns:
+            df[col] = format_hhmm(parse_minutes(df[col]), missing=np.nan)
+
+    # Getypeerde kolommen (niet-numeriek = NULL)
+    for col in INT_COLUMNS:
+        if col in df.columns:
+            df[col] = _to_int(df[col])
+    for col in REAL_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
+
+    return add_time_minutes(df)
+
+
+def _to_int(s: pd.Series) -> pd.Series:
+    """Numerieke waarden (ook '776903.0') -> Int64, de rest NA."""
+    v = pd.to_numeric(s, errors="coerce")
+    return v.where(v.isna() | (v % 1 == 0)).astype("Int64")
+
+
+def add_time_minutes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Voeg de minutenkolommen (MINUTE_COLUMNS) en `day_num` toe op basis van
+    date_dos (YYYY-MM-DD) en de HH:MM tijdkolommen. Ontbrekend/ongeldig = NA.
+    """
+    if "date_dos" in df.columns:
+        d = pd.to_datetime(df["date_dos"], format="%Y-%m-%d", errors="coerce")
+        days = (d - pd.Timestamp("1970-01-01")).dt.days
+        df[DAY_COLUMN] = days.astype("Int64")
+
+    for col, mcol in MINUTE_COLUMNS.items():
+        if col in df.columns:
+            df[mcol] = pd.array(parse_minutes(df[col], fallback=False), dtype="Int64")
+
+    return df
+
+
+# ------------------------------------------------------------
+# Dictionary-encoding (winkel / klant)
+# ------------------------------------------------------------
+
+def init_dims(conn: sqlite3.Connection) -> None:
+    for col, (table, code) in DICT_COLUMNS.items():
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {_q(table)} "
+            f"({_q(code)} INTEGER PRIMARY KEY, {_q(col)} TEXT UNIQUE NOT NULL)"
+        )
+
+
+def encode_dims(conn: sqlite3.Connection, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Voeg de codekolommen (store_id, cust_id) toe. Nieuwe waarden krijgen een
+    volgende code in de dimensietabel; bestaande codes wijzigen nooit.
+    """
+    with conn:
+        init_dims(conn)
+        for col, (table, code) in DICT_COLUMNS.items():
+            if col not in df.columns:
+                continue
+            values = df[col].dropna().unique().tolist()
+            conn.executemany(
+                f"INSERT OR IGNORE INTO {_q(table)} ({_q(col)}) VALUES (?)", [(v,) for v in values]
+            )
+            mapping = dict(conn.execute(f"SELECT {_q(col)}, {_q(code)} FROM {_q(table)}").fetchall())
+            df[code] = df[col].map(mapping).astype("Int64")
+    return df
+
+
+def _backfill_dims(conn: sqlite3.Connection) -> None:
+    """Codes invullen voor bestaande rijen van vóór de dictionary-encoding."""
+    init_dims(conn)
+    existing = _table_columns(conn, ORDERS_TABLE)
+    for col, (table, code) in DICT_COLUMNS.items():
+        if col not in existing or code not in existing:
+            continue
+        conn.execute(
+            f"INSERT OR IGNORE INTO {_q(table)} ({_q(col)}) "
+            f"SELECT DISTINCT {_q(col)} FROM {_q(ORDERS_TABLE)} "
+            f"WHERE {_q(code)} IS NULL AND {_q(col)} IS NOT NULL"
+        )
+        conn.execute(
+            f"UPDATE {_q(ORDERS_TABLE)} SET {_q(code)} = "
+            f"(SELECT d.{_q(code)} FROM {_q(table)} d WHERE d.{_q(col)} = {_q(ORDERS_TABLE)}.{_q(col)}) "
+            f"WHERE {_q(code)} IS NULL AND {_q(col)} IS NOT NULL"
+        )
+
+
+def _sorted_category(s: pd.Series) -> pd.Series:
+    """Categorical met alfabetisch gesorteerde categorieën (groupby/sort zoals bij strings)."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.cat.reorder_categories(sorted(s.cat.categories))
+    return s.astype(pd.CategoricalDtype(sorted(s.dropna().unique())))
+
+
+def decode_dims(conn: sqlite3.Connection, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Codekolommen -> categorical tekstkolom (zonder per-rij Python strings),
+    en verwijder de codekolommen uit het resultaat.
+    """
+    for col, (table, code) in DICT_COLUMNS.items():
+        if code not in df.columns:
+            continue
+        if col not in df.columns:
+            dim = pd.read_sql_query(f"SELECT {_q(code)}, {_q(col)} FROM {_q(table)}", conn)
+            dim = dim.sort_values(col)
+            # code -> positie in de gesorteerde categorieën
+            pos = pd.Series(np.arange(len(dim)), index=dim[code].to_numpy())
+            codes = pos.reindex(df[code].to_numpy()).fillna(-1).astype(int).to_numpy()
+            df[col] = pd.Categorical.from_codes(codes, categories=dim[col].to_numpy())
+        df = df.drop(columns=[code])
+    return df
+
+
+def apply_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Zelfde dtypes ongeacht backend of leeftijd van de database:
+    Int-kolommen voor route/activiteit/jaar, float duurtijden en
+    categoricals voor winkel, klant en preparatie.
+    """
+    for col, dtype in INT_DTYPES.items():
+        if col in df.columns and str(df[col].dtype) != dtype:
+            df[col] = _to_int(df[col]).astype(dtype)
+    for col in REAL_COLUMNS:
+        if col in df.columns and df[col].dtype != float:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
+    for col in [*DICT_COLUMNS, *CATEGORY_COLUMNS]:
+        if col in df.columns:
+            df[col] = _sorted_category(df[col])
+    return df
+
+
+# ------------------------------------------------------------
+# Schrijven: gebatchte transacties
+# ------------------------------------------------------------
+
+def _records(df: pd.DataFrame) -> List[tuple]:
+    """DataFrame -> lijst tuples voor executemany (NaN/NaT -> NULL)."""
+    clean = df.astype(object).where(df.notna(), None)
+    return list(clean.itertuples(index=False, name=None))
+
+
+def _column_defs(columns: Sequence[str]) -> str:
+    return ", ".join(f"{_q(c)} {COLUMN_TYPES.get(c, 'TEXT')}" for c in columns)
+
+
+def _create_table(conn: sqlite3.Connection, table: str, columns: Sequence[str]) -> None:
+    cols_sql = _column_defs(columns)
+    conn.execute(f"DROP TABLE IF EXISTS {_q(table)}")
+    conn.execute(f"CREATE TABLE {_q(table)} ({cols_sql})")
+
+
+def _insert_chunk_rows(conn: sqlite3.Connection, table: str, df: pd.DataFrame) -> int:
+    cols = ", ".join(_q(c) for c in df.columns)
+    marks = ", ".join("?" for _ in df.columns)
+    sql = f"INSERT INTO {_q(table)} ({cols}) VALUES ({marks})"
+    rows = _records(df)
+    conn.executemany(sql, rows)
+    return len(rows)
+
+
+def _insert_chunk(conn: sqlite3.Connection, table: str, df: pd.DataFrame) -> int:
+    with conn:
+        return _insert_chunk_rows(conn, table, df)
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({_q(table)})")]
+
+
+def _prepare_upsert(conn: sqlite3.Connection, columns: Sequence[str]) -> None:
+    """
+    Zorg dat `orders` bestaat en alle kolommen van de upload bevat,
+    zonder bestaand schema of indexen te verwijderen.
+    """
+    existing = _table_columns(conn, ORDERS_TABLE)
+    with conn:
+        if not existing:
+            conn.execute(f"CREATE TABLE {_q(ORDERS_TABLE)} ({_column_defs(columns)})")
+        else:
+            added = [c for c in columns if c not in existing]
+            for c in added:
+                conn.execute(f"ALTER TABLE {_q(ORDERS_TABLE)} ADD COLUMN {_column_defs([c])}")
+            # Enkel een nieuwe codekolom vraagt een backfill (scan van alle orders); daarna
+            # krijgt elke geschreven rij zijn code via encode_dims
+            if any(code in added for _, code in DICT_COLUMNS.values()):
+                _backfill_dims(conn)
+        key = [c for c in NATURAL_KEY if c in columns]
+        if key:
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_orders_natural_key "
+                f"ON {_q(ORDERS_TABLE)} ({', '.join(_q(c) for c in key)})"
+            )
+
+
+def _same(columns: Sequence[str], a: str, b: str) -> str:
+    """Gelijkheid op `columns` tussen aliassen a en b; NULL telt als gelijk (IS)."""
+    return " AND ".join(f"{a}.{_q(c)} IS {b}.{_q(c)}" for c in columns)
+
+
+def _begin_upsert(conn: sqlite3.Connection, columns: Sequence[str]) -> None:
+    """
+    Temp tabellen voor één upsert (over alle chunks heen):
+    - _upsert_run: alle rijen van de upload tot nu toe
+    - _upsert_done: sleutels die in deze upsert al vervangen werden
+    """
+    cols_sql = ", ".join(_q(c) for c in columns)
+    key_sql = ", ".join(_q(c) for c in NATURAL_KEY if c in columns)
+    with conn:
+        _end_upsert_tables(conn)
+        conn.execute(f"CREATE TEMP TABLE _upsert_run AS SELECT {cols_sql} FROM {_q(ORDERS_TABLE)} WHERE 0")
+        if key_sql:
+            conn.execute(f"CREATE INDEX temp._upsert_run_key ON _upsert_run ({key_sql})")
+            conn.execute(f"CREATE TEMP TABLE _upsert_done AS SELECT {key_sql} FROM {_q(ORDERS_TABLE)} WHERE 0")
+            conn.execute(f"CREATE INDEX temp._upsert_done_key ON _upsert_done ({key_sql})")
+
+
+def _end_upsert_tables(conn: sqlite3.Connection) -> None:
+    for table in ("_upsert_run", "_upsert_done", "_upsert_stage", "_upsert_keys", "_upsert_changed"):
+        conn.execute(f"DROP TABLE IF EXISTS temp.{table}")
+
+
+def _end_upsert(conn: sqlite3.Connection) -> None:
+    with conn:
+        _end_upsert_tables(conn)
+
+
+def _numbered(table: str, alias: str, cols: Sequence[str], key: Sequence[str]) -> str:
+    """
+    Rijen van `table` voor de sleutels in _upsert_keys, met een volgnummer onder
+    identieke rijen: EXCEPT vergelijkt zo ook het aantal orderlijnen.
+    """
+    row = ", ".join(f"{alias}.{_q(c)}" for c in cols)
+    return (
+        f"SELECT {row}, ROW_NUMBER() OVER (PARTITION BY {row}) AS _occ "
+        f"FROM _upsert_keys k JOIN {table} {alias} ON {_same(key, alias, 'k')}"
+    )
+
+
+def _replace_groups(
+    conn: sqlite3.Connection, cols: Sequence[str], key: Sequence[str], changed_sql: str
+) -> Tuple[int, int, Set[str]]:
+    """
+    Vervang de sleutelgroepen van `changed_sql` (SELECT van sleutels) als geheel:
+    alle bestaande rijen van die sleutels weg, alle rijen van de upload
+    (_upsert_run) voor die sleutels erin. Sleutels die deze upsert al schreef
+    (_upsert_done) tellen niet als vervangen.
+    """
+    cols_sql = ", ".join(_q(c) for c in cols)
+    key_sql = ", ".join(_q(c) for c in key)
+    conn.execute("DROP TABLE IF EXISTS temp._upsert_changed")
+    conn.execute(f"CREATE TEMP TABLE _upsert_changed AS {changed_sql}")
+
+    dates: Set[str] = set()
+    if "date_dos" in key:
+        dates = {r[0] for r in conn.execute("SELECT DISTINCT date_dos FROM _upsert_changed")}
+
+    done = f"EXISTS (SELECT 1 FROM _upsert_done d WHERE {_same(key, 'd', 'c')})"
+    existing = f"SELECT o.rowid FROM _upsert_changed c JOIN {_q(ORDERS_TABLE)} o ON {_same(key, 'o', 'c')}"
+    replaced = conn.execute(
+        f"DELETE FROM {_q(ORDERS_TABLE)} WHERE rowid IN ({existing} WHERE NOT {done})"
+    ).rowcount
+    rewritten = conn.execute(
+        f"DELETE FROM {_q(ORDERS_TABLE)} WHERE rowid IN ({existing} WHERE {done})"
+    ).rowcount
+    inserted = conn.execute(
+        f"INSERT INTO {_q(ORDERS_TABLE)} ({cols_sql}) "
+        f"SELECT {', '.join(f'r.{_q(c)}' for c in cols)} FROM _upsert_changed c "
+        f"JOIN _upsert_run r ON {_same(key, 'r', 'c')} ORDER BY r.rowid"
+    ).rowcount
+    conn.execute(f"INSERT INTO _upsert_done ({key_sql}) SELECT {key_sql} FROM _upsert_changed c WHERE NOT {done}")
+    conn.execute("DROP TABLE temp._upsert_changed")
+    return inserted - rewritten, replaced, dates
+
+
+def _upsert_chunk(conn: sqlite3.Connection, df: pd.DataFrame) -> Tuple[int, int, Set[str]]:
+    """
+    Schrijf de nieuwe of gewijzigde sleutelgroepen van de chunk naar `orders`.
+
+    Een sleutelgroep zijn alle rijen met dezelfde NATURAL_KEY (een export heeft
+    vaak meerdere orderlijnen per sleutel). Zodra de upload (alle chunks tot nu
+    toe, _upsert_run) voor een sleutel een rij heeft die niet (of niet zo vaak)
+    in `orders` staat, wordt de groep als geheel vervangen; identieke groepen
+    worden overgeslagen. Groepen waarvan `orders` meer rijen heeft dan de upload
+    kunnen pas na de laatste chunk beoordeeld worden (_finish_upsert).
+    NULL-waarden tellen als gelijk. Vereist _begin_upsert op dezelfde verbinding.
+
+    Retourneert (netto geschreven rijen, vervangen bestaande rijen, geraakte dagen).
+    """
+    cols = list(df.columns)
+    cols_sql = ", ".join(_q(c) for c in cols)
+    key = [c for c in NATURAL_KEY if c in cols]
+    key_sql = ", ".join(_q(c) for c in key)
+
+    with conn:
+        # Staging-tabel met dezelfde kolomaffiniteit als orders
+        conn.execute("DROP TABLE IF EXISTS temp._upsert_stage")
+        conn.execute(
+            f"CREATE TEMP TABLE _upsert_stage AS SELECT {cols_sql} FROM {_q(ORDERS_TABLE)} WHERE 0"
+        )
+        _insert_chunk_rows(conn, "_upsert_stage", df)
+        conn.execute(f"INSERT INTO _upsert_run ({cols_sql}) SELECT {cols_sql} FROM _upsert_stage")
+
+        if not key:
+            # Zonder sleutel: enkel rijen die nog niet identiek in orders staan
+            written = conn.execute(
+                f"INSERT INTO {_q(ORDERS_TABLE)} ({cols_sql}) SELECT {cols_sql} FROM _upsert_stage s "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {_q(ORDERS_TABLE)} o WHERE {_same(cols, 'o', 's')})"
+            ).rowcount
+            conn.execute("DROP TABLE temp._upsert_stage")
+            return written, 0, set()
+
+        conn.execute("DROP TABLE IF EXISTS temp._upsert_keys")
+        conn.execute(f"CREATE TEMP TABLE _upsert_keys AS SELECT DISTINCT {key_sql} FROM _upsert_stage")
+        run, old = _numbered("_upsert_run", "r", cols, key), _numbered(_q(ORDERS_TABLE), "o", cols, key)
+        result = _replace_groups(conn, cols, key, f"SELECT DISTINCT {key_sql} FROM ({run} EXCEPT {old})")
+        conn.execute("DROP TABLE temp._upsert_stage")
+        conn.execute("DROP TABLE temp._upsert_keys")
+    return result
+
+
+def _finish_upsert(conn: sqlite3.Connection) -> Tuple[int, int, Set[str]]:
+    """
+    Na de laatste chunk: sleutelgroepen die nog niet vervangen werden maar in
+    `orders` rijen hebben die de upload niet (meer) heeft, worden vervangen door
+    de rijen van de upload. Retourneert zoals _upsert_chunk.
+    """
+    cols = _table_columns(conn, "_upsert_run")
+    key = [c for c in NATURAL_KEY if c in cols]
+    if not key:
+        return 0, 0, set()
+    key_sql = ", ".join(_q(c) for c in key)
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS temp._upsert_keys")
+        conn.execute(
+            f"CREATE TEMP TABLE _upsert_keys AS SELECT DISTINCT {key_sql} FROM _upsert_run r "
+            f"WHERE NOT EXISTS (SELECT 1 FROM _upsert_done d WHERE {_same(key, 'd', 'r')})"
+        )
+        run, old = _numbered("_upsert_run", "r", cols, key), _numbered(_q(ORDERS_TABLE), "o", cols, key)
+        result = _replace_groups(conn, cols, key, f"SELECT DISTINCT {key_sql} FROM ({old} EXCEPT {run})")
+        conn.execute("DROP TABLE temp._upsert_keys")
+    return result
+
+
+def ensure_indexes(conn: sqlite3.Connection, analyze: bool = True) -> None:
+    """
+    Maak de ORDERS_INDEXES aan (voor zover de kolommen bestaan) en
+    ververs de planner-statistieken. Na een replace zijn de indexen
+    met de oude tabel verdwenen, dus dit loopt na elke ingest.
+    """
+    existing = set(_table_columns(conn, ORDERS_TABLE))
+    if not existing:
+        return
+    with conn:
+        for name, cols in ORDERS_INDEXES.items():
+            if all(c in existing for c in cols):
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {_q(name)} "
+                    f"ON {_q(ORDERS_TABLE)} ({', '.join(_q(c) for c in cols)})"
+                )
+        if analyze:
+            # Steekproef volstaat voor de planner en houdt ANALYZE snel op grote tabellen
+            conn.execute("PRAGMA analysis_limit=1000")
+            conn.execute(f"ANALYZE {_q(ORDERS_TABLE)}")
+
+
+def upsert_frame(
+    conn: sqlite3.Connection,
+    df: pd.DataFrame,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Tuple[int, int, Set[str]]:
+    """
+    Upsert van een reeds genormaliseerd DataFrame in `orders`,
+    in transacties van `chunk_rows` rijen.
+    Retourneert (geschreven rijen, waarvan vervangen, geraakte dagen).
+    """
+    written = replaced = 0
+    dates: Set[str] = set()
+    if df.empty:
+        return written, replaced, dates
+    df = encode_dims(conn, df)
+    _prepare_upsert(conn, list(df.columns))
+    _begin_upsert(conn, list(df.columns))
+    try:
+        for start in range(0, len(df), chunk_rows):
+            w, r, d = _upsert_chunk(conn, df.iloc[start:start + chunk_rows])
+            written += w
+            replaced += r
+            dates |= d
+        w, r, d = _finish_upsert(conn)
+        written += w
+        replaced += r
+        dates |= d
+    finally:
+        _end_upsert(conn)
+    return written, replaced, dates
+
+
+def ingest_file(
+    path: Union[str, Path],
+    db_path: Union[str, Path],
+    mode: str = "replace",
+    chunk_rows: int = CHUNK_ROWS,
+    progress: Optional[Callable[[Dict[str, int]], None]] = None,
+) -> Dict[str, object]:
+    """
+    Laad een OTIF export (xlsx/xls/csv) in de tabel `orders`.
+
+    mode="replace": de rijen worden in chunks genormaliseerd en per chunk in
+    één transactie in een staging-tabel geschreven. Pas als alles ingelezen
+    is, wordt de staging-tabel in één transactie omgewisseld met `orders`;
+    lezers zien dus nooit een half geladen tabel.
+
+    mode="upsert": bestaande tabel, schema en indexen blijven behouden; per
+    chunk worden enkel nieuwe of gewijzigde sleutelgroepen (alle rijen met
+    dezelfde NATURAL_KEY) als geheel vervangen.
+    """
+    if mode not in INGEST_MODES:
+        raise ValueError(f"Onbekende ingest mode '{mode}' (verwacht: {', '.join(INGEST_MODES)})")
+
+    # Unieke staging-naam: meerdere imports kunnen parallel lopen
+    staging = f"{STAGING_TABLE}_{uuid.uuid4().hex[:8]}"
+    conn = sqlite3.connect(str(db_path), timeout=BUSY_TIMEOUT_S)
+    rows_parsed = 0
+    rows_written = 0
+    rows_replaced = 0
+    dates: Set[str] = set()
+    columns: Optional[List[str]] = None
+    try:
+        for chunk in iter_file_chunks(path, chunk_rows=chunk_rows):
+            chunk = encode_dims(conn, normalize_orders(chunk))
+            if columns is None:
+                columns = list(chunk.columns)
+                if mode == "replace":
+                    with conn:
+                        _create_table(conn, staging, columns)
+                else:
+                    _prepare_upsert(conn, columns)
+                    _begin_upsert(conn, columns)
+            rows_parsed += len(chunk)
+            if mode == "replace":
+                rows_written += _insert_chunk(conn, staging, chunk)
+            else:
+                written, replaced, chunk_dates = _upsert_chunk(conn, chunk)
+                rows_written += written
+                rows_replaced += replaced
+                dates |= chunk_dates
+            if progress is not None:
+                progress({
+                    "rows_parsed": rows_parsed,
+                    "rows_written": rows_written,
+                    "rows_replaced": rows_replaced,
+                })
+
+        if mode == "upsert" and columns is not None:
+            written, replaced, chunk_dates = _finish_upsert(conn)
+            rows_written += written
+            rows_replaced += replaced
+            dates |= chunk_dates
+            if progress is not None:
+                progress({
+                    "rows_parsed": rows_parsed,
+                    "rows_written": rows_written,
+                    "rows_replaced": rows_replaced,
+                })
+        if mode == "replace" and columns is not None:
+            with conn:
+                conn.execute(f"DROP TABLE IF EXISTS {_q(ORDERS_TABLE)}")
+                conn.execute(f"ALTER TABLE {_q(staging)} RENAME TO {_q(ORDERS_TABLE)}")
+        if columns is not None:
+            ensure_indexes(conn)
+    finally:
+        if mode == "replace":
+            # Na een fout geen halve staging-tabel laten staan
+            with conn:
+                conn.execute(f"DROP TABLE IF EXISTS {_q(staging)}")
+        else:
+            _end_upsert(conn)
+        conn.close()
+
+    return {
+        "rows_parsed": rows_parsed,
+        "rows_written": rows_written,
+        "rows_replaced": rows_replaced,
+        "dates": None if mode == "replace" else sorted(d for d in dates if d is not None),
+    }
@@ -0,0 +1,214 @@
+# ================================================================
+# jit_rca/jit_engine.py – JIT S1/S2 voor orders en leveringen (py3.9)
+#
+# Eén vectoriële berekening voor de hele dataset, gedeeld door de API
+# pagina's, analysis_views en de stops tabel:
+#
+#   order_flags()  S1/S2 per orderregel (numpy, geen lus per route)
+#   order_deviation() / count_within()  JIT voor een reeks toleranties in één pass
+#   scenario_flags()  eigen scenario's (jit_rca.scenarios) als één matrix
+#   evaluate()     orders + één groupby naar leveringen, S1/S2 + scenario's
+#   summarize()    route / dag / klant / kanaal tellingen als som over de leveringen
+#
+# Scenario 1 (S1): Win FROM − tol ≤ Actual ≤ Win UNTIL + tol
+# Scenario 2 (S2): Actual ≤ Win UNTIL + tol (te vroeg = ook JIT)
+# Eén JIT order in een levering => levering JIT. Ontbrekende datum of tijd => niet JIT.
+# Alle tijden vallen op date_dos, dus minuten sinds middernacht volstaan.
+# ================================================================
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .ingest import DAY_COLUMN, MINUTE_COLUMNS
+from .scenarios import scenario_masks, scenario_names, scenario_time_columns
+from .timekernel import parse_minutes
+
+__all__ = [
+    "STOP_KEY", "SUMMARY_COLUMNS", "order_deviation", "order_flags", "count_within",
+    "scenario_flags", "scenario_summary_columns", "evaluate", "summarize",
+]
+
+# Levering = stop: dag, route, leverpunt (zoals de stops tabel)
+STOP_KEY = ["date_dos", "cnr_tour", "nm_short_unload"]
+
+# Kolommen van summarize(), zelfde namen als de KPI rollups
+SUMMARY_COLUMNS = [
+    "deliveries", "deliveries_jit_s1", "deliveries_jit_s2",
+    "orders", "orders_jit_s1", "orders_jit_s2",
+]
+
+
+def _time_minutes(df: pd.DataFrame, col: str) -> np.ndarray:
+    """
+    Minuten sinds middernacht voor tijdkolom `col`: de bij ingest opgeslagen
+    minutenkolom indien aanwezig, anders geparsed uit de tekstkolom.
+    """
+    mcol = MINUTE_COLUMNS.get(col)
+    if mcol and mcol in df.columns:
+        return pd.to_numeric(df[mcol], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return parse_minutes(df[col], fallback=False)
+
+
+def _valid(df: pd.DataFrame) -> np.ndarray:
+    """Rijen met een datum (zonder datum is een order nooit JIT)."""
+    valid = df["date_dos"].notna().to_numpy()
+    if DAY_COLUMN in df.columns:
+        valid &= df[DAY_COLUMN].notna().to_numpy()
+    return valid
+
+
+def order_deviation(df: pd.DataFrame, require_window: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (S1, S2) als kleinste tolerantie (minuten) waarbij de order JIT is:
+    order_flags(df, t) == (deviation <= t) voor elke t. +inf = nooit JIT.
+
+    - S2: Actual − Win UNTIL
+    - S1: max(Win FROM − Actual, Actual − Win UNTIL)
+    """
+    actual = _time_minutes(df, "Actual")
+    win_from = _time_minutes(df, "Win FROM")
+    win_until = _time_minutes(df, "Win UNTIL")
+
+    valid = _valid(df)
+    if require_window:
+        valid &= ~np.isnan(win_from)
+
+    late = actual - win_until
+    s2 = np.where(valid & ~np.isnan(late), late, np.inf)
+    early = win_from - actual
+    s1 = np.where(~np.isnan(early), np.maximum(s2, early), np.inf)
+    return s1, s2
+
+
+def order_flags(
+    df: pd.DataFrame,
+    tolerance_minutes: float = 0,
+    require_window: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (S1, S2) als boolean arrays, één waarde per rij van `df`.
+    require_window: S2 enkel als ook Win FROM ingevuld is (zoals het JIT-rapport
+    en sql_engine.jit_analysis_tables); anders volstaat Win UNTIL.
+    """
+    s1, s2 = order_deviation(df, require_window)
+    tol = float(tolerance_minutes)
+    return s1 <= tol, s2 <= tol
+
+
+def count_within(
+    values: np.ndarray,
+    groups: np.ndarray,
+    n_groups: int,
+    tolerances: Sequence[float],
+) -> np.ndarray:
+    """
+    Aantal `values` <= t per groep en tolerantie, als (n_groups × len(tolerances)).
+    Eén sortering en één searchsorted voor alle groepen en toleranties:
+    elke groep krijgt een eigen, niet-overlappend bereik op de sorteersleutel.
+    groups = -1 telt niet mee.
+    """
+    tol = np.asarray(tolerances, dtype=float)
+    keep = groups >= 0
+    # Waarden onder de kleinste / boven de grootste tolerantie afknippen: telt altijd / nooit
+    lo, hi = tol.min() - 1.0, tol.max() + 1.0
+    width = hi - lo + 1.0
+    keys = np.sort(groups[keep] * width + (np.clip(values[keep], lo, hi) - lo))
+    base = np.arange(n_groups, dtype=float) * width
+    start = np.searchsorted(keys, base, side="left")
+    upto = np.searchsorted(keys, base[:, None] + (tol - lo)[None, :], side="right")
+    return upto - start[:, None]
+
+
+def scenario_flags(
+    df: pd.DataFrame,
+    tolerance_minutes: float = 0,
+    names: Optional[Sequence[str]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Vlag per order voor elk scenario van jit_rca.scenarios (None = alle
+    geregistreerde), samen berekend als één matrix: {naam: boolean array}.
+    """
+    names = scenario_names(names)
+    minutes = {c: _time_minutes(df, c) for c in scenario_time_columns(names)}
+    stores = df["nm_short_unload"] if "nm_short_unload" in df.columns else np.full(len(df), None)
+    masks = scenario_masks(minutes, stores, _valid(df), names, tolerance_minutes)
+    return {name: masks[:, j] for j, name in enumerate(names)}
+
+
+def scenario_summary_columns(names: Sequence[str]) -> List[str]:
+    """Extra kolommen van summarize() voor de scenario's `names`."""
+    return [c for n in names for c in (f"deliveries_jit_{n}", f"orders_jit_{n}")]
+
+
+def evaluate(
+    df: pd.DataFrame,
+    tolerance_minutes: float = 0,
+    key: Sequence[str] = STOP_KEY,
+    carry: Sequence[str] = (),
+    require_window: bool = False,
+    scenarios: Optional[Sequence[str]] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (orders, deliveries):
+
+    - orders: kopie van `df` met order_jit_s1 / order_jit_s2 en order_jit_<scenario>
+    - deliveries: één rij per waarde van `key` (één groupby over alle orders) met
+      de eerste niet-lege waarde van de `carry` kolommen, orders / orders_jit_s1 /
+      orders_jit_s2, is_delivery en delivery_jit_s1 / delivery_jit_s2, plus
+      orders_jit_<scenario> / delivery_jit_<scenario>
+
+    scenarios: namen uit jit_rca.scenarios (None = alle geregistreerde, () = geen).
+    Orders met een onvolledige sleutel (bv. geen leverpunt) krijgen ook een rij,
+    zodat ze als order blijven meetellen; is_delivery is dan False.
+    """
+    orders = df.copy()
+    orders["order_jit_s1"], orders["order_jit_s2"] = order_flags(
+        orders, tolerance_minutes, require_window
+    )
+    flags = scenario_flags(orders, tolerance_minutes, scenarios)
+    for name, flag in flags.items():
+        orders[f"order_jit_{name}"] = flag
+
+    key = list(key)
+    deliveries = orders.groupby(key, as_index=False, observed=True, dropna=False).agg(
+        **{c: (c, "first") for c in carry},
+        orders=("order_jit_s1", "size"),
+        orders_jit_s1=("order_jit_s1", "sum"),
+        orders_jit_s2=("order_jit_s2", "sum"),
+        **{f"orders_jit_{name}": (f"order_jit_{name}", "sum") for name in flags},
+    )
+    complete = deliveries[key].notna().all(axis=1)
+    deliveries["is_delivery"] = complete
+    for name in ["s1", "s2", *flags]:
+        deliveries[f"delivery_jit_{name}"] = complete & (deliveries[f"orders_jit_{name}"] > 0)
+    return orders, deliveries
+
+
+def summarize(deliveries: pd.DataFrame, by: Sequence[str]) -> pd.DataFrame:
+    """
+    SUMMARY_COLUMNS (+ scenario_summary_columns voor de scenario's van evaluate())
+    per `by` (kolommen van de leveringssleutel of `carry`), als som over de rijen
+    van evaluate(): de orders worden niet opnieuw gegroepeerd.
+    """
+    by = list(by)
+    names = [c[len("delivery_jit_"):] for c in deliveries.columns
+             if c.startswith("delivery_jit_") and c not in ("delivery_jit_s1", "delivery_jit_s2")]
+    out = deliveries.groupby(by, as_index=False, observed=True).agg(
+        deliveries=("is_delivery", "sum"),
+        deliveries_jit_s1=("delivery_jit_s1", "sum"),
+        deliveries_jit_s2=("delivery_jit_s2", "sum"),
+        orders=("orders", "sum"),
+        orders_jit_s1=("orders_jit_s1", "sum"),
+        orders_jit_s2=("orders_jit_s2", "sum"),
+        **{f"deliveries_jit_{n}": (f"delivery_jit_{n}", "sum") for n in names},
+        **{f"orders_jit_{n}": (f"orders_jit_{n}", "sum") for n in names},
+    )
+    columns = [*SUMMARY_COLUMNS, *scenario_summary_columns(names)]
+    for c in columns:
+        out[c] = out[c].astype(int)
+    return out[[*by, *columns]]
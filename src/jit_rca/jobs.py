@@ -0,0 +1,227 @@
+# ================================================================
+# jit_rca/jobs.py – achtergrondjobs voor ingest (py3.9)
+# ================================================================
+from __future__ import annotations
+
+import sqlite3
+import time
+import traceback
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from . import colstore, columnar, shards
+from .ingest import ingest_file
+from .rollups import refresh_rollups
+from .stop_facts import refresh_stops
+
+# De jobstatus staat in dezelfde SQLite database als de orders, zodat
+# zowel de pool-workers als alle API-workers dezelfde status zien.
+JOBS_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+    job_id TEXT PRIMARY KEY,
+    filename TEXT,
+    mode TEXT,
+    status TEXT,
+    rows_parsed INTEGER DEFAULT 0,
+    rows_written INTEGER DEFAULT 0,
+    rows_replaced INTEGER DEFAULT 0,
+    error TEXT,
+    created_at REAL,
+    started_at REAL,
+    finished_at REAL
+)
+"""
+
+# Datasetversie: verhoogd na elke ingest; caches in de API-workers vergelijken
+# hun versie met deze waarde en vervallen zodra ze verschilt.
+DATASET_META_SQL = """
+CREATE TABLE IF NOT EXISTS dataset_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER
+)
+"""
+
+# Statussen: queued -> running -> done | failed
+JOB_COLUMNS = [
+    "job_id", "filename", "mode", "status", "rows_parsed", "rows_written",
+    "rows_replaced", "error", "created_at", "started_at", "finished_at",
+]
+
+# Tellers die in de jobstatus bewaard worden
+JOB_COUNTERS = ["rows_parsed", "rows_written", "rows_replaced"]
+
+# Schrijvers in andere processen houden de database kort vast (één chunk)
+BUSY_TIMEOUT_S = 60.0
+
+
+def _connect(db_path: Union[str, Path]) -> sqlite3.Connection:
+    return sqlite3.connect(str(db_path), timeout=BUSY_TIMEOUT_S)
+
+
+def init_jobs(db_path: Union[str, Path]) -> None:
+    conn = _connect(db_path)
+    try:
+        conn.execute(JOBS_SCHEMA_SQL)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def create_job(db_path: Union[str, Path], filename: str, mode: str) -> str:
+    """Registreer een nieuwe job (status 'queued') en geef het job id terug."""
+    job_id = uuid.uuid4().hex
+    conn = _connect(db_path)
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO ingest_jobs (job_id, filename, mode, status, created_at) VALUES (?,?,?,?,?)",
+                (job_id, filename, mode, "queued", time.time()),
+            )
+    finally:
+        conn.close()
+    return job_id
+
+
+def update_job(db_path: Union[str, Path], job_id: str, **fields: object) -> None:
+    if not fields:
+        return
+    sets = ", ".join(f"{k} = ?" for k in fields)
+    conn = _connect(db_path)
+    try:
+        with conn:
+            conn.execute(f"UPDATE ingest_jobs SET {sets} WHERE job_id = ?", (*fields.values(), job_id))
+    finally:
+        conn.close()
+
+
+def _job_dict(row: tuple) -> Dict[str, object]:
+    job = dict(zip(JOB_COLUMNS, row))
+    started = job["started_at"]
+    end = job["finished_at"] or time.time()
+    job["elapsed_s"] = round(end - started, 2) if started else 0.0
+    return job
+
+
+def get_job(db_path: Union[str, Path], job_id: str) -> Optional[Dict[str, object]]:
+    conn = _connect(db_path)
+    try:
+        row = conn.execute(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM ingest_jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    return _job_dict(row) if row else None
+
+
+def list_jobs(db_path: Union[str, Path], limit: int = 20) -> List[Dict[str, object]]:
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM ingest_jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [_job_dict(r) for r in rows]
+
+
+def dataset_version(conn: sqlite3.Connection) -> int:
+    try:
+        row = conn.execute("SELECT value FROM dataset_meta WHERE key = 'version'").fetchone()
+    except sqlite3.OperationalError:  # database van vóór dataset_meta
+        return 0
+    return int(row[0]) if row else 0
+
+
+def bump_dataset_version(db_path: Union[str, Path]) -> None:
+    conn = _connect(db_path)
+    try:
+        with conn:
+            conn.execute(DATASET_META_SQL)
+            conn.execute(
+                "INSERT INTO dataset_meta (key, value) VALUES ('version', 1) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+            )
+    finally:
+        conn.close()
+
+
+def post_ingest(
+    db_path: Union[str, Path],
+    dates: Optional[Iterable[str]],
+    parquet_dir: Optional[Union[str, Path]] = None,
+    hot_months: int = 0,
+    retention_months: int = 0,
+    mmap_dir: Optional[Union[str, Path]] = None,
+) -> None:
+    """
+    Afgeleide opslag bijwerken na een ingest.
+    `dates` = gewijzigde dagen (None = alles opnieuw opbouwen).
+    `hot_months`/`retention_months`: zie shards.rotate (0 = geen shards).
+    `mmap_dir`: kolomopslag (jit_rca.colstore), altijd volledig herbouwd.
+    """
+    # Eerst roteren: de stops lezen oude maanden dan al uit hun shard
+    rotated = shards.rotate(db_path, hot_months, retention_months)
+    if dates is not None:
+        # Gearchiveerde dagen verdwijnen ook uit stops, rollups en Parquet
+        dates = sorted({*dates, *rotated["archived"]})
+    conn = _connect(db_path)
+    try:
+        refresh_stops(conn, dates)
+        refresh_rollups(conn, dates)
+    finally:
+        conn.close()
+    if parquet_dir is not None:
+        columnar.export_orders(db_path, parquet_dir, dates=dates)
+    if mmap_dir is not None:
+        colstore.build_store(db_path, mmap_dir)
+    # Als laatste: pas nu is alle opslag (ook Parquet) bijgewerkt
+    bump_dataset_version(db_path)
+
+
+def run_ingest_job(
+    job_id: str,
+    path: Union[str, Path],
+    db_path: Union[str, Path],
+    mode: str,
+    parquet_dir: Optional[Union[str, Path]] = None,
+    hot_months: int = 0,
+    retention_months: int = 0,
+    mmap_dir: Optional[Union[str, Path]] = None,
+) -> Dict[str, object]:
+    """
+    Voer een ingest-job uit (bedoeld voor een process-pool worker).
+    De voortgang wordt na elke chunk in `ingest_jobs` bijgewerkt;
+    het gespoolde bestand wordt na afloop verwijderd.
+    """
+    update_job(db_path, job_id, status="running", started_at=time.time())
+
+    def progress(stats: Dict[str, int]) -> None:
+        update_job(db_path, job_id, **stats)
+
+    try:
+        stats = ingest_file(path, db_path, mode=mode, progress=progress)
+        if mode == "replace":
+            # De upload is nu de volledige dataset: live shards naar het archief (niets wordt gewist)
+            shards.archive_all(db_path)
+        post_ingest(
+            db_path, stats["dates"], parquet_dir=parquet_dir,
+            hot_months=hot_months, retention_months=retention_months, mmap_dir=mmap_dir,
+        )
+    except Exception as exc:  # noqa: BLE001 - fout moet in de jobstatus terechtkomen
+        update_job(
+            db_path,
+            job_id,
+            status="failed",
+            error=f"{type(exc).__name__}: {exc}\n{traceback.format_exc(limit=5)}",
+            finished_at=time.time(),
+        )
+        # Een deel van de chunks kan al geschreven zijn
+        bump_dataset_version(db_path)
+        raise
+    finally:
+        Path(path).unlink(missing_ok=True)
+
+    counters = {k: stats[k] for k in JOB_COUNTERS}
+    update_job(db_path, job_id, status="done", finished_at=time.time(), **counters)
+    return stats
@@ -0,0 +1,272 @@
+# ================================================================
+# jit_rca/readers.py – lezen van OTIF exports in chunks (py3.9)
+#
+# Engines (automatisch gekozen, met fallback):
+#   xlsx: calamine (python-calamine, Rust)  -> openpyxl read-only
+#   csv : pyarrow.csv (C++, multithreaded)  -> pandas C-parser
+# Alle engines geven dezelfde stringwaarden terug als pd.read_excel(dtype=str),
+# zodat normalize_orders() identieke resultaten geeft.
+# ================================================================
+from __future__ import annotations
+
+import csv
+import datetime as _dt
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+try:  # optionele dependency
+    from python_calamine import CalamineWorkbook
+except ImportError:  # pragma: no cover - afhankelijk van installatie
+    CalamineWorkbook = None
+
+try:  # optionele dependency
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pragma: no cover - afhankelijk van installatie
+    pa = None
+    pa_csv = None
+
+# Aantal rijen per chunk / per schrijftransactie
+CHUNK_ROWS = 5000
+
+EXCEL_ENGINES = ("calamine", "openpyxl")
+CSV_ENGINES = ("pyarrow", "pandas")
+
+# Voorkeur via env: "auto" (standaard) of een engine uit de lijsten hierboven
+EXCEL_ENGINE = os.getenv("JIT_EXCEL_ENGINE", "auto")
+CSV_ENGINE = os.getenv("JIT_CSV_ENGINE", "auto")
+
+# Toegelaten scheidingstekens in CSV exports
+CSV_DELIMITERS = ",;\t"
+
+# Waarden die pd.read_csv standaard als NaN leest (ook voor de Arrow reader)
+CSV_NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+
+# ------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------
+
+def _cell_to_str(v: object) -> object:
+    """
+    Zet een Excel-cel om naar dezelfde stringvorm als pd.read_excel(dtype=str):
+    gehele floats zonder '.0', datums als 'YYYY-MM-DD HH:MM:SS', lege cel = NaN.
+    """
+    if v is None:
+        return np.nan
+    if isinstance(v, float):
+        if v != v:
+            return np.nan
+        if v.is_integer():
+            return str(int(v))
+    return str(v)
+
+
+def _calamine_cell_to_str(v: object) -> object:
+    """Zoals _cell_to_str; calamine geeft '' voor lege cellen en date i.p.v. datetime."""
+    if isinstance(v, str) and v == "":
+        return np.nan
+    if type(v) is _dt.date:
+        v = _dt.datetime(v.year, v.month, v.day)
+    return _cell_to_str(v)
+
+
+def _header(cells: Sequence[object]) -> List[str]:
+    """Kolomnamen zoals pandas ze zou geven (gestript, 'Unnamed: i', duplicaten .1/.2)."""
+    names: List[str] = []
+    seen: Dict[str, int] = {}
+    for i, c in enumerate(cells):
+        name = f"Unnamed: {i}" if c is None or c == "" else str(c).strip()
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _rows_to_chunks(
+    rows: Iterator[Sequence[object]],
+    convert,
+    chunk_rows: int,
+) -> Iterator[pd.DataFrame]:
+    """Eerste rij = header; daarna DataFrames van maximaal `chunk_rows` rijen."""
+    first = next(rows, None)
+    if first is None:
+        return
+    columns = _header(list(first))
+    width = len(columns)
+
+    buf: List[List[object]] = []
+    for row in rows:
+        if row is None:
+            continue
+        vals = [convert(v) for v in list(row)[:width]]
+        if all(v is np.nan for v in vals):
+            continue
+        if len(vals) < width:
+            vals.extend([np.nan] * (width - len(vals)))
+        buf.append(vals)
+        if len(buf) >= chunk_rows:
+            yield pd.DataFrame(buf, columns=columns, dtype=object)
+            buf = []
+    if buf:
+        yield pd.DataFrame(buf, columns=columns, dtype=object)
+
+
+def available_engines() -> Dict[str, List[str]]:
+    """Geïnstalleerde engines per bestandstype, in volgorde van voorkeur."""
+    return {
+        "excel": [e for e in EXCEL_ENGINES if e != "calamine" or CalamineWorkbook is not None],
+        "csv": [e for e in CSV_ENGINES if e != "pyarrow" or pa_csv is not None],
+    }
+
+
+def _pick(kind: str, engine: Optional[str]) -> str:
+    installed = available_engines()[kind]
+    wanted = engine or (EXCEL_ENGINE if kind == "excel" else CSV_ENGINE)
+    if wanted in ("", "auto"):
+        return installed[0]
+    if wanted not in installed:
+        raise ValueError(f"{kind} engine '{wanted}' niet beschikbaar (geïnstalleerd: {', '.join(installed)})")
+    return wanted
+
+
+# ------------------------------------------------------------
+# Excel
+# ------------------------------------------------------------
+
+def _iter_openpyxl(path: Path, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        yield from _rows_to_chunks(ws.iter_rows(values_only=True), _cell_to_str, chunk_rows)
+    finally:
+        wb.close()
+
+
+def _iter_calamine(path: Path, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    wb = CalamineWorkbook.from_path(str(path))
+    sheet = wb.get_sheet_by_index(0)
+    rows = sheet.iter_rows() if hasattr(sheet, "iter_rows") else iter(sheet.to_python())
+    yield from _rows_to_chunks(rows, _calamine_cell_to_str, chunk_rows)
+
+
+def iter_excel_chunks(
+    path: Union[str, Path],
+    chunk_rows: int = CHUNK_ROWS,
+    engine: Optional[str] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Lees het eerste werkblad rij per rij en geef DataFrames van maximaal
+    `chunk_rows` rijen terug (alle waarden als string). Geheugengebruik
+    blijft zo constant, ongeacht de bestandsgrootte.
+
+    engine: "calamine" (indien geïnstalleerd, ook voor .xls), "openpyxl" of None/"auto".
+    Als calamine het bestand niet kan openen, wordt openpyxl gebruikt.
+    """
+    path = Path(path)
+    chosen = _pick("excel", engine)
+
+    if chosen == "calamine":
+        try:
+            chunks = _iter_calamine(path, chunk_rows)
+            first = next(chunks, None)
+        except Exception:  # noqa: BLE001 - fallback naar de standaard reader
+            if engine == "calamine":
+                raise
+        else:
+            if first is not None:
+                yield first
+                yield from chunks
+            return
+
+    if path.suffix.lower() not in (".xlsx", ".xlsm"):
+        # Oudere formaten (bv. .xls) kunnen niet gestreamd worden
+        df = pd.read_excel(path, dtype=str)
+        df.columns = [str(c).strip() for c in df.columns]
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows].reset_index(drop=True)
+        return
+
+    yield from _iter_openpyxl(path, chunk_rows)
+
+
+# ------------------------------------------------------------
+# CSV
+# ------------------------------------------------------------
+
+def _sniff_delimiter(path: Path) -> str:
+    with open(path, "r", encoding="utf-8-sig", newline="") as fh:
+        sample = fh.read(64 * 1024)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        return ","
+
+
+def _iter_csv_pandas(path: Path, chunk_rows: int, sep: str) -> Iterator[pd.DataFrame]:
+    for chunk in pd.read_csv(path, dtype=str, sep=sep, chunksize=chunk_rows, encoding="utf-8-sig"):
+        chunk.columns = [str(c).strip() for c in chunk.columns]
+        yield chunk.reset_index(drop=True)
+
+
+def _iter_csv_arrow(path: Path, chunk_rows: int, sep: str) -> Iterator[pd.DataFrame]:
+    with open(path, "r", encoding="utf-8-sig", newline="") as fh:
+        header = next(csv.reader(fh, delimiter=sep), [])
+    columns = _header(header)
+    reader = pa_csv.open_csv(
+        str(path),
+        read_options=pa_csv.ReadOptions(column_names=columns, skip_rows=1, block_size=16 << 20),
+        parse_options=pa_csv.ParseOptions(delimiter=sep),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={c: pa.string() for c in columns},
+            null_values=CSV_NA_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        df = batch.to_pandas().astype(object)
+        df = df.where(df.notna(), np.nan)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows].reset_index(drop=True)
+
+
+def iter_csv_chunks(
+    path: Union[str, Path],
+    chunk_rows: int = CHUNK_ROWS,
+    engine: Optional[str] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    CSV export in chunks (alle waarden als string, lege waarde = NaN).
+    Scheidingsteken (, ; of tab) wordt uit de eerste regels afgeleid.
+    engine: "pyarrow" (indien geïnstalleerd), "pandas" of None/"auto".
+    """
+    path = Path(path)
+    sep = _sniff_delimiter(path)
+    if _pick("csv", engine) == "pyarrow":
+        yield from _iter_csv_arrow(path, chunk_rows, sep)
+    else:
+        yield from _iter_csv_pandas(path, chunk_rows, sep)
+
+
+def iter_file_chunks(
+    path: Union[str, Path],
+    chunk_rows: int = CHUNK_ROWS,
+    engine: Optional[str] = None,
+) -> Iterator[pd.DataFrame]:
+    """Chunks uit een OTIF export: CSV of Excel (eerste werkblad)."""
+    if Path(path).suffix.lower() == ".csv":
+        yield from iter_csv_chunks(path, chunk_rows=chunk_rows, engine=engine)
+    else:
+        yield from iter_excel_chunks(path, chunk_rows=chunk_rows, engine=engine)
@@ -0,0 +1,317 @@
+# ================================================================
+# jit_rca/rollups.py – voorgeaggregeerde KPI tabellen (py3.9)
+#
+# kpi_day   : dag × RFX Activity × kanaal × route × winkelpunt
+# kpi_week  : ISO week (YYYY-Www) × dezelfde dimensies
+# kpi_month : maand (YYYY-MM) × dezelfde dimensies
+#
+# Enkel optelbare tellers (leveringen, orders, JIT S1/S2, buiten JIT per
+# bucket, minuten), opgebouwd uit de stops tabel na elke ingest. Een KPI
+# voor een willekeurige periode = SUM over de rijen van die periode.
+#
+# Daarnaast twee dagtabellen rechtstreeks uit de orders (andere
+# leveringsdefinitie dan stops):
+#
+# kpi_jit_day  : dag × RFX Activity × kanaal, JIT-rapport (jit_analysis_tables)
+# kpi_wait_day : dag × RFX Activity × winkelpunt, wachttijden (waits_html)
+#
+# Na een ingest worden enkel de gewijzigde dagen (en hun weken/maanden)
+# herberekend; de kost hangt dus niet af van de lengte van de historiek.
+# ================================================================
+from __future__ import annotations
+
+import datetime as _dt
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .analysis_views import JIT_DAY_KEY, jit_day_counts
+from .ingest import DAY_COLUMN, MINUTE_COLUMNS, ORDERS_TABLE, _q, _records, _table_columns
+from .jit_engine import SUMMARY_COLUMNS
+from .stop_facts import REFRESH_DAYS, STOPS_TABLE, _order_days, _read_orders
+
+KPI_DIMS = ["rfx_activity", "kanaal", "cnr_tour", "nm_short_unload"]
+
+# Buckets minuten te laat (buiten JIT S2), bovengrens inclusief; daarboven late_60_plus
+LATE_BUCKETS = [(15, "late_0_15"), (30, "late_15_30"), (45, "late_30_45"), (60, "late_45_60")]
+
+KPI_MEASURES = [
+    "deliveries",
+    "deliveries_jit_s1",
+    "deliveries_jit_s2",
+    "orders",
+    "orders_jit_s1",
+    "orders_jit_s2",
+    "outside_s2",
+    *[name for _, name in LATE_BUCKETS],
+    "late_60_plus",
+    "late_unknown",           # buiten JIT met ontbrekende Actual / Win UNTIL
+    "late_min_sum",
+    "wait_min_sum",           # som DurationA
+    "wait_n",                 # leveringen met DurationA
+    "planned_wait_min_sum",   # som DurationP
+]
+
+# Rollup tabel -> periodekolom
+ROLLUP_TABLES = {"kpi_day": "date_dos", "kpi_week": "iso_week", "kpi_month": "month"}
+
+# kpi_day bewaart ook week en maand, zodat die rollups uit kpi_day opgebouwd worden
+_DAY_COLUMNS = ["date_dos", "iso_week", "month", *KPI_DIMS, *KPI_MEASURES]
+
+# Levering in waits_html: dag × route × RFX Activity × winkelpunt, met DurationA
+WAIT_KEY = ["date_dos", "cnr_tour", "RFX Activity", "nm_short_unload"]
+WAIT_MEASURES = ["deliveries", "wait_min_sum"]   # leveringen, som gemiddelde DurationA per levering
+
+# Dagtabellen uit de orders -> (dimensies, tellers); periodekolom date_dos
+ORDER_DAY_TABLES = {
+    "kpi_jit_day": (JIT_DAY_KEY[1:], SUMMARY_COLUMNS),
+    "kpi_wait_day": (["rfx_activity", "nm_short_unload"], WAIT_MEASURES),
+}
+
+# Kolommen uit orders voor de dagtabellen
+_ORDER_COLUMNS = [
+    "date_dos", "cnr_tour", "cnr_cust", "RFX Activity", "nm_short_unload",
+    "Win FROM", "Win UNTIL", "Planned", "Actual", "DurationA", DAY_COLUMN, *MINUTE_COLUMNS.values(),
+]
+
+
+def _types(columns: Iterable[str]) -> Dict[str, str]:
+    real = {"late_min_sum", "wait_min_sum", "planned_wait_min_sum"}
+    text = {"date_dos", "iso_week", "month", "kanaal", "nm_short_unload"}
+    return {c: "REAL" if c in real else "TEXT" if c in text else "INTEGER" for c in columns}
+
+
+def _layout(table: str) -> Tuple[str, List[str], List[str]]:
+    """(periodekolom, dimensies, tellers) van een rollup- of dagtabel."""
+    if table in ORDER_DAY_TABLES:
+        dims, measures = ORDER_DAY_TABLES[table]
+        return "date_dos", list(dims), list(measures)
+    return ROLLUP_TABLES[table], KPI_DIMS, KPI_MEASURES
+
+
+def _columns(table: str) -> List[str]:
+    if table == "kpi_day":
+        return _DAY_COLUMNS
+    period, dims, measures = _layout(table)
+    return [period, *dims, *measures]
+
+
+def _table_sql(table: str) -> str:
+    period, dims, _ = _layout(table)
+    defs = ", ".join(f"{_q(c)} {t}" for c, t in _types(_columns(table)).items())
+    return f"CREATE TABLE IF NOT EXISTS {table} ({defs}, PRIMARY KEY ({period}, {', '.join(dims)}))"
+
+
+def iso_week(date: str) -> str:
+    y, w, _ = _dt.date.fromisoformat(date).isocalendar()
+    return f"{y}-W{w:02d}"
+
+
+def init_rollups(conn: sqlite3.Connection) -> None:
+    for table in [*ROLLUP_TABLES, *ORDER_DAY_TABLES]:
+        conn.execute(_table_sql(table))
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_kpi_day_activity ON kpi_day (rfx_activity, date_dos)")
+
+
+def rollups_outdated(conn: sqlite3.Connection) -> bool:
+    """True als een rollup tabel ontbreekt of een ander schema heeft."""
+    return any(_table_columns(conn, t) != _columns(t) for t in [*ROLLUP_TABLES, *ORDER_DAY_TABLES])
+
+
+def build_day_rollup(stops: pd.DataFrame) -> pd.DataFrame:
+    """kpi_day rijen uit stops rijen (zie jit_rca.stop_facts)."""
+    if stops.empty:
+        return pd.DataFrame(columns=_DAY_COLUMNS)
+
+    # Stops met een onvolledige sleutel tellen enkel mee voor de orders
+    delivery = stops["is_delivery"].astype(bool)
+    outside = stops["outside_s2"].astype(bool) & delivery
+    late = stops["late_min"].astype(float).where(delivery)
+    m = pd.DataFrame({c: stops[c] for c in ["date_dos", *KPI_DIMS]})
+    m["deliveries"] = delivery.astype(int)
+    m["deliveries_jit_s1"] = (stops["jit_s1"].astype(bool) & delivery).astype(int)
+    m["deliveries_jit_s2"] = (stops["jit_s2"].astype(bool) & delivery).astype(int)
+    m["orders"] = stops["orders"]
+    m["orders_jit_s1"] = stops["orders_jit_s1"]
+    m["orders_jit_s2"] = stops["orders_jit_s2"]
+    m["outside_s2"] = outside.astype(int)
+    lower = -np.inf
+    for upper, name in LATE_BUCKETS:
+        m[name] = (outside & (late > lower) & (late <= upper)).astype(int)
+        lower = upper
+    m["late_60_plus"] = (outside & (late > lower)).astype(int)
+    m["late_unknown"] = (outside & late.isna()).astype(int)
+    m["late_min_sum"] = late.fillna(0.0)
+    wait = stops["duration_a"].astype(float).where(delivery)
+    m["wait_min_sum"] = wait.fillna(0.0)
+    m["wait_n"] = wait.notna().astype(int)
+    m["planned_wait_min_sum"] = stops["duration_p"].astype(float).where(delivery).fillna(0.0)
+
+    day = m.groupby(["date_dos", *KPI_DIMS], as_index=False, sort=True, dropna=False)[KPI_MEASURES].sum()
+    weeks = {d: iso_week(d) for d in day["date_dos"].unique()}
+    day["iso_week"] = day["date_dos"].map(weeks)
+    day["month"] = day["date_dos"].str[:7]
+    return day[_DAY_COLUMNS]
+
+
+def build_jit_day(orders: pd.DataFrame) -> pd.DataFrame:
+    """kpi_jit_day rijen uit orderregels (zie analysis_views.jit_day_counts)."""
+    day = jit_day_counts(orders)
+    day["rfx_activity"] = day["rfx_activity"].astype(int)
+    return day[_columns("kpi_jit_day")]
+
+
+def build_wait_day(orders: pd.DataFrame) -> pd.DataFrame:
+    """
+    kpi_wait_day rijen uit orderregels: per dag × RFX Activity × winkelpunt het
+    aantal leveringen (WAIT_KEY) met DurationA en de som van hun gemiddelde DurationA.
+    Zoals de oude waits_html: orders zonder route tellen mee (lege route = één
+    levering per dag × RFX Activity × winkelpunt), orders zonder winkelpunt of
+    RFX Activity niet.
+    """
+    wait = pd.to_numeric(orders["DurationA"], errors="coerce")
+    keep = wait.notna() & orders[["RFX Activity", "nm_short_unload"]].notna().all(axis=1)
+    if not keep.any():
+        return pd.DataFrame(columns=_columns("kpi_wait_day"))
+
+    per_delivery = (
+        orders.loc[keep, WAIT_KEY].assign(wait=wait[keep])
+        .groupby(WAIT_KEY, as_index=False, observed=True, dropna=False)["wait"].mean()
+    )
+    day = per_delivery.groupby(["date_dos", "RFX Activity", "nm_short_unload"], as_index=False, observed=True).agg(
+        deliveries=("wait", "size"),
+        wait_min_sum=("wait", "sum"),
+    )
+    day = day.rename(columns={"RFX Activity": "rfx_activity"})
+    day["rfx_activity"] = day["rfx_activity"].astype(int)
+    return day[_columns("kpi_wait_day")]
+
+
+def _period_days(table: str, value: str) -> Tuple[str, str]:
+    """Eerste en laatste dag van een ISO week (YYYY-Www) of maand (YYYY-MM)."""
+    if table == "kpi_week":
+        year, week = value.split("-W")
+        monday = _dt.date.fromisocalendar(int(year), int(week), 1)
+        return monday.isoformat(), (monday + _dt.timedelta(days=6)).isoformat()
+    return f"{value}-01", f"{value}-31"
+
+
+def _rebuild_period(conn: sqlite3.Connection, table: str, periods: Optional[List[str]]) -> None:
+    period = ROLLUP_TABLES[table]
+    cols = ", ".join([period, *KPI_DIMS, *KPI_MEASURES])
+    sums = ", ".join(f"SUM({c})" for c in KPI_MEASURES)
+    group = ", ".join([period, *KPI_DIMS])
+    insert = f"INSERT INTO {table} ({cols}) SELECT {group}, {sums} FROM kpi_day"
+    if periods is None:
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"{insert} GROUP BY {group}")
+        return
+    # Per periode een bereik op date_dos (primaire sleutel van kpi_day), geen scan van de historiek
+    for value in periods:
+        conn.execute(f"DELETE FROM {table} WHERE {period} = ?", [value])
+        conn.execute(f"{insert} WHERE date_dos >= ? AND date_dos <= ? GROUP BY {group}", _period_days(table, value))
+
+
+def refresh_rollups(conn: sqlite3.Connection, dates: Optional[Iterable[str]] = None) -> int:
+    """
+    Herbereken voor `dates` (None = alles) kpi_day uit de stops tabel en
+    kpi_jit_day / kpi_wait_day uit de orders van die dagen, daarna de geraakte
+    weken en maanden, in één transactie. Retourneert het aantal kpi_day rijen.
+    """
+    if rollups_outdated(conn):
+        with conn:
+            for table in [*ROLLUP_TABLES, *ORDER_DAY_TABLES]:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+        dates = None
+    init_rollups(conn)
+    if not _table_columns(conn, STOPS_TABLE) or not _table_columns(conn, ORDERS_TABLE):
+        return 0
+
+    if dates is None:
+        days = _order_days(conn)
+    else:
+        days = sorted({d for d in dates if d is not None})
+
+    def insert(table: str, frame: pd.DataFrame) -> None:
+        columns = _columns(table)
+        cols = ", ".join(_q(c) for c in columns)
+        marks = ", ".join("?" for _ in columns)
+        conn.executemany(f"INSERT INTO {table} ({cols}) VALUES ({marks})", _records(frame[columns]))
+
+    day_tables = ["kpi_day", *ORDER_DAY_TABLES]
+    n = 0
+    with conn:
+        if dates is None:
+            for table in day_tables:
+                conn.execute(f"DELETE FROM {table}")
+        for start in range(0, len(days), REFRESH_DAYS):
+            batch = days[start:start + REFRESH_DAYS]
+            in_batch = ", ".join("?" for _ in batch)
+            if dates is not None:
+                for table in day_tables:
+                    conn.execute(f"DELETE FROM {table} WHERE date_dos IN ({in_batch})", batch)
+            stops = pd.read_sql_query(
+                f"SELECT * FROM {STOPS_TABLE} WHERE date_dos IN ({in_batch})", conn, params=batch
+            )
+            day = build_day_rollup(stops)
+            insert("kpi_day", day)
+            n += len(day)
+
+            orders = _read_orders(conn, batch, _ORDER_COLUMNS)
+            insert("kpi_jit_day", build_jit_day(orders))
+            insert("kpi_wait_day", build_wait_day(orders))
+
+        weeks: Optional[List[str]] = None
+        months: Optional[List[str]] = None
+        if dates is not None:
+            weeks = sorted({iso_week(d) for d in days})
+            months = sorted({d[:7] for d in days})
+        _rebuild_period(conn, "kpi_week", weeks)
+        _rebuild_period(conn, "kpi_month", months)
+    return n
+
+
+def read_rollup(
+    conn: sqlite3.Connection,
+    table: str = "kpi_day",
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    rfx_activity: Optional[str] = None,
+    by: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Som van de tellers per `by` (periodekolom en/of dimensies van de tabel) over de
+    gefilterde rijen. Voor kpi_week/kpi_month filtert date_from/date_to op volledige periodes.
+    """
+    if table not in ROLLUP_TABLES and table not in ORDER_DAY_TABLES:
+        known = ", ".join([*ROLLUP_TABLES, *ORDER_DAY_TABLES])
+        raise ValueError(f"Onbekende rollup tabel '{table}' (verwacht: {known})")
+    period, dims, measures = _layout(table)
+    by = list(by) if by is not None else [period]
+    unknown = [c for c in by if c not in (period, *dims)]
+    if unknown:
+        raise ValueError(f"Onbekende rollup dimensie(s): {', '.join(unknown)}")
+
+    where: List[str] = []
+    params: list = []
+    bounds = {"kpi_week": iso_week, "kpi_month": lambda d: d[:7]}.get(table, lambda d: d)
+    if date_from:
+        where.append(f"{period} >= ?")
+        params.append(bounds(date_from))
+    if date_to:
+        where.append(f"{period} <= ?")
+        params.append(bounds(date_to))
+    if rfx_activity:
+        where.append("rfx_activity = ?")
+        params.append(rfx_activity)
+
+    select = ", ".join([*by, *(f"SUM({c}) AS {c}" for c in measures)])
+    sql = f"SELECT {select} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if by:
+        sql += f" GROUP BY {', '.join(by)} ORDER BY {', '.join(by)}"
+    return pd.read_sql_query(sql, conn, params=params)
+
@@ -0,0 +1,200 @@
+# ================================================================
+# jit_rca/scenarios.py – eigen JIT scenario's naast S1/S2 (py3.9)
+#
+# Een scenario is declaratief: een tijdkolom (standaard Actual) moet
+# tussen een onder- en/of bovengrens liggen, elk als (tijdkolom, offset
+# in minuten), optioneel verbreed met slack per winkelpunt:
+#
+#   lower: value ≥ <kolom> + offset − tol − slack
+#   upper: value ≤ <kolom> + offset + tol + slack
+#
+# Zo is S1 = lower ("Win FROM", 0) + upper ("Win UNTIL", 0) en S2 enkel
+# upper ("Win UNTIL", 0). Ontbrekende tijd => niet JIT.
+#
+# Het register start leeg: een deployment kiest zelf zijn scenario's
+# (register_scenario, of load_scenarios met een JSON bestand).
+#
+# Alle geregistreerde scenario's worden samen als één (orders × scenario's)
+# matrix berekend (scenario_masks, via jit_engine.evaluate) of als SQL
+# expressie voor DuckDB (scenario_sql). Elke routes- en rapporttabel
+# krijgt zo een kolom per scenario, zonder eigen code per scenario.
+# ================================================================
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .ingest import MINUTE_COLUMNS
+
+__all__ = [
+    "SCENARIOS", "register_scenario", "load_scenarios", "scenario_names",
+    "scenario_time_columns", "scenario_masks", "scenario_sql",
+]
+
+Bound = Tuple[str, float]
+
+# naam -> {"label", "value", "lower", "upper", "slack"}; volgorde = kolomvolgorde in de tabellen
+SCENARIOS: Dict[str, Dict[str, object]] = {}
+
+# Namen komen in kolomnamen en SQL aliassen terecht
+_NAME = re.compile(r"^[a-z][a-z0-9_]*$")
+_RESERVED = {"s1", "s2"}
+
+
+def _bound(name: str, bound: Optional[Sequence[object]]) -> Optional[Bound]:
+    if bound is None:
+        return None
+    col, offset = bound
+    if col not in MINUTE_COLUMNS:
+        raise ValueError(f"Scenario '{name}': onbekende tijdkolom '{col}' (verwacht: {', '.join(MINUTE_COLUMNS)})")
+    return str(col), float(offset)
+
+
+def register_scenario(
+    name: str,
+    label: str,
+    lower: Optional[Bound] = None,
+    upper: Optional[Bound] = None,
+    value: str = "Actual",
+    slack: Optional[Mapping[str, float]] = None,
+) -> None:
+    """
+    Registreer (of vervang) een scenario.
+    lower / upper: (tijdkolom, offset in minuten) of None = geen grens.
+    slack: extra minuten per winkelpunt (nm_short_unload), aan beide kanten van het venster.
+    """
+    if not _NAME.match(name) or name in _RESERVED:
+        raise ValueError(f"Ongeldige scenarionaam '{name}' (kleine letters, cijfers en _; niet s1/s2)")
+    if lower is None and upper is None:
+        raise ValueError(f"Scenario '{name}' heeft geen grens (lower en/of upper)")
+    if value not in MINUTE_COLUMNS:
+        raise ValueError(f"Scenario '{name}': onbekende tijdkolom '{value}' (verwacht: {', '.join(MINUTE_COLUMNS)})")
+    SCENARIOS[name] = {
+        "label": label,
+        "value": value,
+        "lower": _bound(name, lower),
+        "upper": _bound(name, upper),
+        "slack": {str(k): float(v) for k, v in (slack or {}).items()},
+    }
+
+
+def load_scenarios(path: Union[str, Path]) -> List[str]:
+    """
+    Scenario's uit een JSON bestand registreren: een lijst van objecten met
+    dezelfde velden als register_scenario, bv.
+    {"name": "early30", "label": "...", "lower": ["Win FROM", -30], "upper": ["Win UNTIL", 0]}.
+    Retourneert de geregistreerde namen.
+    """
+    specs = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(specs, list):
+        raise ValueError(f"{path}: verwacht een JSON lijst van scenario's")
+    names = []
+    for spec in specs:
+        register_scenario(**spec)
+        names.append(spec["name"])
+    return names
+
+
+def scenario_names(names: Optional[Sequence[str]] = None) -> List[str]:
+    """`names` gecontroleerd, of alle geregistreerde scenario's (None)."""
+    if names is None:
+        return list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Onbekend(e) scenario('s): {', '.join(unknown)}")
+    return list(names)
+
+
+def scenario_time_columns(names: Sequence[str]) -> List[str]:
+    """Tijdkolommen die de scenario's gebruiken."""
+    cols: List[str] = []
+    for name in names:
+        spec = SCENARIOS[name]
+        cols += [spec["value"], *(b[0] for b in (spec["lower"], spec["upper"]) if b is not None)]
+    return list(dict.fromkeys(cols))
+
+
+def scenario_masks(
+    minutes: Mapping[str, np.ndarray],
+    stores: Sequence[object],
+    valid: np.ndarray,
+    names: Sequence[str],
+    tolerance_minutes: float = 0,
+) -> np.ndarray:
+    """
+    JIT-vlaggen als (len(valid) × len(names)) boolean matrix, in één pass:
+    waarden, onder- en bovengrenzen van alle scenario's worden als matrices
+    uit de gestapelde tijdkolommen gehaald en in één keer vergeleken.
+
+    minutes: tijdkolom -> minuten (NaN = ontbrekend); stores: nm_short_unload
+    per rij (voor slack); valid: rijen die JIT kunnen zijn (bv. datum aanwezig).
+    """
+    n = len(valid)
+    if not names:
+        return np.zeros((n, 0), dtype=bool)
+    specs = [SCENARIOS[name] for name in names]
+    cols = scenario_time_columns(names)
+    index = {c: i for i, c in enumerate(cols)}
+    # Twee extra kolommen voor "geen grens": −inf / +inf
+    no_lower, no_upper = len(cols), len(cols) + 1
+    times = np.column_stack([
+        *(np.asarray(minutes[c], dtype=float) for c in cols), np.full(n, -np.inf), np.full(n, np.inf),
+    ])
+
+    def bounds(side: str, missing: int) -> Tuple[List[int], np.ndarray]:
+        idx = [index[s[side][0]] if s[side] is not None else missing for s in specs]
+        offset = np.array([s[side][1] if s[side] is not None else 0.0 for s in specs])
+        return idx, offset
+
+    lo_idx, lo_off = bounds("lower", no_lower)
+    hi_idx, hi_off = bounds("upper", no_upper)
+    slack = np.zeros((n, len(specs)))
+    if any(s["slack"] for s in specs):
+        store = pd.Series(stores, dtype=object)
+        for j, s in enumerate(specs):
+            if s["slack"]:
+                slack[:, j] = store.map(s["slack"]).fillna(0.0).to_numpy(dtype=float)
+
+    tol = float(tolerance_minutes)
+    value = times[:, [index[s["value"]] for s in specs]]
+    lower = times[:, lo_idx] + lo_off - tol - slack
+    upper = times[:, hi_idx] + hi_off + tol + slack
+    # NaN (ontbrekende tijd) vergelijkt altijd False
+    return np.asarray(valid, dtype=bool)[:, None] & (value >= lower) & (value <= upper)
+
+
+def _sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def scenario_sql(
+    name: str,
+    tolerance_minutes: float,
+    column_sql: Callable[[str], str],
+    store_sql: str,
+) -> str:
+    """
+    Zelfde predicaat als SQL expressie (DuckDB), NULL => false.
+    column_sql: tijdkolom -> SQL expressie in minuten; store_sql: expressie voor het winkelpunt.
+    """
+    spec = SCENARIOS[name]
+    tol = float(tolerance_minutes)
+    slack = "0.0"
+    if spec["slack"]:
+        cases = " ".join(f"WHEN {_sql_literal(k)} THEN {v!r}" for k, v in spec["slack"].items())
+        slack = f"(CASE CAST({store_sql} AS VARCHAR) {cases} ELSE 0.0 END)"
+    value = column_sql(spec["value"])
+    conds = [f"{value} IS NOT NULL"]
+    if spec["lower"] is not None:
+        col, offset = spec["lower"]
+        conds.append(f"{value} >= {column_sql(col)} + {offset!r} - {tol!r} - {slack}")
+    if spec["upper"] is not None:
+        col, offset = spec["upper"]
+        conds.append(f"{value} <= {column_sql(col)} + {offset!r} + {tol!r} + {slack}")
+    return f"COALESCE({' AND '.join(conds)}, false)"
+
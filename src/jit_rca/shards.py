@@ -0,0 +1,278 @@
+# ================================================================
+# jit_rca/shards.py – maandshards voor oude orders (py3.9)
+#
+# jit.sqlite houdt enkel de recente ("hot") maanden in `orders`; oudere
+# maanden staan elk in een eigen database:
+#
+#   data/orders_shards/orders_YYYY-MM.sqlite   (live, wordt meegelezen)
+#   data/orders_archive/orders_YYYY-MM.sqlite.gz   (archief, niet meer gelezen)
+#
+# Lezers openen enkel de shards waarvan de maand de gevraagde periode
+# overlapt; een query op recente dagen raakt dus geen enkele shard, hoeveel
+# jaren historiek er ook bewaard worden. Dimensiecodes (store_id, cust_id)
+# verwijzen naar de dim_* tabellen in jit.sqlite.
+# ================================================================
+from __future__ import annotations
+
+import gzip
+import re
+import shutil
+import sqlite3
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from .ingest import BUSY_TIMEOUT_S, NATURAL_KEY, ORDERS_TABLE, _q, _table_columns, ensure_indexes
+
+__all__ = ["shard_dir", "archive_dir", "live_shards", "read_shards", "rotate", "archive_all"]
+
+# Aantal recente maanden (t.o.v. de nieuwste maand in de data) dat in jit.sqlite blijft; 0 = geen shards
+HOT_MONTHS = 3
+
+# Shards ouder dan dit aantal maanden gaan naar het archief; 0 = nooit archiveren
+RETENTION_MONTHS = 0
+
+SHARD_DIR = "orders_shards"
+ARCHIVE_DIR = "orders_archive"
+
+_SHARD_NAME = re.compile(r"^orders_(\d{4}-\d{2})\.sqlite$")
+
+
+def shard_dir(db_path: Union[str, Path]) -> Path:
+    return Path(db_path).parent / "data" / SHARD_DIR
+
+
+def archive_dir(db_path: Union[str, Path]) -> Path:
+    return Path(db_path).parent / "data" / ARCHIVE_DIR
+
+
+def shard_path(db_path: Union[str, Path], month: str) -> Path:
+    return shard_dir(db_path) / f"orders_{month}.sqlite"
+
+
+def _add_months(month: str, n: int) -> str:
+    y, m = int(month[:4]), int(month[5:7]) - 1 + n
+    return f"{y + m // 12:04d}-{m % 12 + 1:02d}"
+
+
+def _month_range(month: str) -> Tuple[str, str]:
+    """[eerste dag, eerste dag volgende maand) als 'YYYY-MM-DD' grenzen."""
+    return f"{month}-01", f"{_add_months(month, 1)}-01"
+
+
+def live_shards(
+    db_path: Union[str, Path],
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+) -> List[Tuple[str, Path]]:
+    """(maand, pad) van de live shards die [date_from, date_to] overlappen, oudste eerst."""
+    root = shard_dir(db_path)
+    if not root.is_dir():
+        return []
+    out = []
+    for p in root.iterdir():
+        m = _SHARD_NAME.match(p.name)
+        if m is None:
+            continue
+        month = m.group(1)
+        if date_from and month < date_from[:7]:
+            continue
+        if date_to and month > date_to[:7]:
+            continue
+        out.append((month, p))
+    return sorted(out)
+
+
+def _main_path(conn: sqlite3.Connection) -> Optional[Path]:
+    for _, name, file in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return Path(file) if file else None
+    return None
+
+
+def _connect_readonly(path: Path) -> sqlite3.Connection:
+    return sqlite3.connect(path.resolve().as_uri() + "?mode=ro", uri=True, timeout=BUSY_TIMEOUT_S)
+
+
+def read_shards(
+    conn: sqlite3.Connection,
+    read: Callable[[sqlite3.Connection], pd.DataFrame],
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+) -> List[pd.DataFrame]:
+    """
+    `read(shard_conn)` voor elke live shard die de periode overlapt (oudste eerst).
+    `conn` = verbinding met jit.sqlite, enkel om de shardmap te vinden. Elke
+    shard krijgt een eigen read-only verbinding i.p.v. een ATTACH: dat kan
+    ook binnen een lopende schrijftransactie op `conn` (zie refresh_stops).
+    """
+    path = _main_path(conn)
+    if path is None:
+        return []
+    frames = []
+    for _, shard in live_shards(path, date_from, date_to):
+        shard_conn = _connect_readonly(shard)
+        try:
+            if _table_columns(shard_conn, ORDERS_TABLE):
+                frames.append(read(shard_conn))
+        finally:
+            shard_conn.close()
+    return frames
+
+
+# ------------------------------------------------------------
+# Rotatie & archief
+# ------------------------------------------------------------
+
+def _prepare_shard(path: Path, info: List[tuple]) -> None:
+    """Shard met dezelfde kolommen (en types) als `orders` in jit.sqlite."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_S)
+    try:
+        existing = _table_columns(conn, ORDERS_TABLE)
+        with conn:
+            if not existing:
+                defs = ", ".join(f"{_q(name)} {type_}" for name, type_ in info)
+                conn.execute(f"CREATE TABLE {_q(ORDERS_TABLE)} ({defs})")
+            else:
+                for name, type_ in info:
+                    if name not in existing:
+                        conn.execute(f"ALTER TABLE {_q(ORDERS_TABLE)} ADD COLUMN {_q(name)} {type_}")
+            key = [name for name in NATURAL_KEY if name in dict(info)]
+            if key:
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_orders_natural_key "
+                    f"ON {_q(ORDERS_TABLE)} ({', '.join(_q(c) for c in key)})"
+                )
+        ensure_indexes(conn, analyze=False)
+    finally:
+        conn.close()
+
+
+def _move_month(conn: sqlite3.Connection, db_path: Union[str, Path], month: str) -> int:
+    """
+    Verplaats de orders van `month` uit jit.sqlite naar de shard van die maand.
+    Per NATURAL_KEY wordt de groep als geheel vervangen: alle shardrijen van elke
+    sleutel die in jit.sqlite voorkomt gaan weg, alle rijen van jit.sqlite voor
+    die maand komen erbij (een upsert schrijft sleutelgroepen ook altijd volledig).
+    Eerst wordt de shard gecommit, daarna pas worden de rijen in jit.sqlite
+    verwijderd: een onderbreking laat hooguit dubbele rijen achter, die de
+    volgende rotatie opnieuw per sleutelgroep vervangt.
+    """
+    info = [(r[1], r[2]) for r in conn.execute(f"PRAGMA table_info({_q(ORDERS_TABLE)})")]
+    path = shard_path(db_path, month)
+    _prepare_shard(path, info)
+
+    cols_sql = ", ".join(_q(name) for name, _ in info)
+    key = [name for name in NATURAL_KEY if name in dict(info)]
+    key_sql = ", ".join(_q(c) for c in key)
+    same_key = " AND ".join(f"s.{_q(c)} IS k.{_q(c)}" for c in key)
+    lo, hi = _month_range(month)
+    schema = "shard"
+    conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(path),))
+    try:
+        with conn:
+            if key:
+                # Eén rij per sleutel, zodat elke shardrij één keer gematcht wordt
+                conn.execute("DROP TABLE IF EXISTS temp._move_keys")
+                conn.execute(
+                    f"CREATE TEMP TABLE _move_keys AS SELECT DISTINCT {key_sql} "
+                    f"FROM main.{_q(ORDERS_TABLE)} WHERE date_dos >= ? AND date_dos < ?",
+                    (lo, hi),
+                )
+                conn.execute(
+                    f"DELETE FROM {schema}.{_q(ORDERS_TABLE)} WHERE rowid IN ("
+                    f"SELECT s.rowid FROM _move_keys k JOIN {schema}.{_q(ORDERS_TABLE)} s ON {same_key})"
+                )
+                conn.execute("DROP TABLE temp._move_keys")
+            n = conn.execute(
+                f"INSERT INTO {schema}.{_q(ORDERS_TABLE)} ({cols_sql}) "
+                f"SELECT {cols_sql} FROM main.{_q(ORDERS_TABLE)} "
+                f"WHERE date_dos >= ? AND date_dos < ? ORDER BY rowid",
+                (lo, hi),
+            ).rowcount
+    finally:
+        conn.execute(f"DETACH DATABASE {schema}")
+    with conn:
+        conn.execute(f"DELETE FROM main.{_q(ORDERS_TABLE)} WHERE date_dos >= ? AND date_dos < ?", (lo, hi))
+    return n
+
+
+def _archive(db_path: Union[str, Path], path: Path) -> List[str]:
+    """Comprimeer een shard naar het archief; retourneert de dagen die erin stonden."""
+    conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_S)
+    try:
+        days = []
+        if _table_columns(conn, ORDERS_TABLE):
+            days = [r[0] for r in conn.execute(
+                f"SELECT DISTINCT date_dos FROM {_q(ORDERS_TABLE)} WHERE date_dos IS NOT NULL"
+            )]
+    finally:
+        conn.close()
+
+    target_dir = archive_dir(db_path)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    target = target_dir / f"{path.name}.gz"
+    if target.exists():
+        # Dezelfde maand werd al eens gearchiveerd (bv. na een replace): niets overschrijven
+        target = target_dir / f"{path.stem}.{uuid.uuid4().hex[:8]}.sqlite.gz"
+    tmp = target.with_name(target.name + ".tmp")
+    with open(path, "rb") as src, gzip.open(tmp, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    tmp.rename(target)
+    path.unlink()
+    return sorted(days)
+
+
+def rotate(
+    db_path: Union[str, Path],
+    hot_months: int = HOT_MONTHS,
+    retention_months: int = RETENTION_MONTHS,
+) -> Dict[str, List[str]]:
+    """
+    Retentiebeleid toepassen na een ingest:
+
+    - orders van vóór de laatste `hot_months` maanden naar hun maandshard
+    - live shards ouder dan `retention_months` maanden naar het archief
+
+    De maanden tellen vanaf de nieuwste maand in de data (niet de kalender),
+    zodat een import van oude exports niets onverwacht archiveert.
+    Retourneert {"sharded": [maanden], "archived": [dagen]}; de gearchiveerde
+    dagen verdwijnen ook uit de afgeleide tabellen (zie jobs.post_ingest).
+    """
+    result: Dict[str, List[str]] = {"sharded": [], "archived": []}
+    if hot_months <= 0:
+        return result
+    conn = sqlite3.connect(str(db_path), timeout=BUSY_TIMEOUT_S)
+    try:
+        if not _table_columns(conn, ORDERS_TABLE):
+            return result
+        months = [r[0] for r in conn.execute(
+            f"SELECT DISTINCT substr(date_dos, 1, 7) FROM {_q(ORDERS_TABLE)} WHERE date_dos IS NOT NULL"
+        )]
+        newest = max([*months, *(m for m, _ in live_shards(db_path))], default=None)
+        if newest is None:
+            return result
+
+        first_hot = _add_months(newest, 1 - hot_months)
+        for month in sorted(m for m in months if m < first_hot):
+            _move_month(conn, db_path, month)
+            result["sharded"].append(month)
+    finally:
+        conn.close()
+
+    if retention_months > 0:
+        first_kept = _add_months(newest, 1 - max(retention_months, hot_months))
+        for month, path in live_shards(db_path, date_to=f"{_add_months(first_kept, -1)}-31"):
+            result["archived"] += _archive(db_path, path)
+    return result
+
+
+def archive_all(db_path: Union[str, Path]) -> List[str]:
+    """Alle live shards archiveren (na een replace is jit.sqlite de volledige dataset)."""
+    days: List[str] = []
+    for _, path in live_shards(db_path):
+        days += _archive(db_path, path)
+    return days
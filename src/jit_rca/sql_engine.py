@@ -0,0 +1,333 @@
+# ================================================================
+# jit_rca/sql_engine.py – optionele DuckDB aggregaties (py3.9)
+#
+# DuckDB leest de Parquet dataset van jit_rca.columnar rechtstreeks
+# (partitie-pruning op date_dos / RFX Activity) en voert de zware
+# groupby's in-process als SQL uit; enkel de geaggregeerde resultaten
+# komen in pandas. De uitkomsten zijn gelijk aan de pandas berekening
+# (zie scripts/check_sql_engine.py).
+# ================================================================
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import List, Mapping, Optional, Tuple, Union
+
+import pandas as pd
+
+from . import columnar
+from .analysis_views import CHANNEL_MAP, _empty_tables, _report_tables, _waiting_time_rootcause
+from .ingest import DAY_COLUMN, INT_DTYPES, MINUTE_COLUMNS
+from .scenarios import scenario_names, scenario_sql, scenario_time_columns
+
+try:  # optionele dependency
+    import duckdb
+except ImportError:  # pragma: no cover - afhankelijk van installatie
+    duckdb = None
+
+__all__ = ["available", "supports", "route_jit", "waits_by_activity", "wait_deliveries", "jit_analysis_tables"]
+
+# Kolommen die in de dataset moeten zitten (minutenkolommen van ingest)
+REQUIRED_COLUMNS = ["cnr_tour", "cnr_cust", "nm_short_unload", "Win FROM", "Win UNTIL", DAY_COLUMN,
+                    *MINUTE_COLUMNS.values()]
+
+_lock = threading.Lock()
+_conn = None
+
+
+def available() -> bool:
+    return duckdb is not None
+
+
+def supports(root: Union[str, Path]) -> bool:
+    """DuckDB geïnstalleerd, Parquet dataset aanwezig en met minutenkolommen."""
+    if not available() or not columnar.has_dataset(root):
+        return False
+    columns = json.loads((Path(root) / columnar.COLUMNS_FILE).read_text())
+    return all(c in columns for c in REQUIRED_COLUMNS)
+
+
+def _cursor():
+    # Eén in-memory database per proces; elke aanroep een eigen cursor (thread-safe)
+    global _conn
+    if duckdb is None:
+        raise RuntimeError("SQL engine vereist 'duckdb' (pip install duckdb).")
+    with _lock:
+        if _conn is None:
+            _conn = duckdb.connect(":memory:")
+        return _conn.cursor()
+
+
+def _query(sql: str, params: list) -> pd.DataFrame:
+    cur = _cursor()
+    try:
+        df = cur.execute(sql, params).df()
+    finally:
+        cur.close()
+    # Zelfde nullable integer types als load_orders (ingest.apply_dtypes)
+    return df.astype({c: t for c, t in INT_DTYPES.items() if c in df.columns})
+
+
+def _q(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _source(root: Union[str, Path]) -> str:
+    pattern = str(Path(root) / "**" / "*.parquet").replace("'", "''")
+    return f"read_parquet('{pattern}', hive_partitioning = true, hive_types_autocast = false)"
+
+
+def _where(
+    date_from: Optional[str],
+    date_to: Optional[str],
+    rfx_activity: Optional[str],
+    cnr_tour: Optional[str],
+) -> Tuple[str, list]:
+    """Zelfde filters als columnar.read_orders (partitiekolommen zijn tekst)."""
+    where: List[str] = []
+    params: list = []
+    if date_from:
+        where.append("date_dos >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("date_dos <= ?")
+        params.append(date_to)
+    if rfx_activity:
+        where.append('"RFX Activity" = ?')
+        params.append(str(rfx_activity))
+    if cnr_tour:
+        where.append("CAST(cnr_tour AS VARCHAR) = ?")
+        params.append(str(cnr_tour))
+    return (" WHERE " + " AND ".join(where) if where else ""), params
+
+
+def _at(time_col: str) -> str:
+    """Absolute minuten zoals api._abs_minutes (day_num * 1440 + minuten)."""
+    return f"({DAY_COLUMN} * 1440.0 + {MINUTE_COLUMNS[time_col]})"
+
+
+def route_jit(
+    root: Union[str, Path],
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    rfx_activity: Optional[str] = None,
+    cnr_tour: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Per (date_dos, cnr_tour): leveringen en orders met S1/S2 zoals compute_jit
+    (levering = dag, route, leverpunt; één JIT order => levering JIT), plus
+    jit_<scenario>_del / jit_<scenario>_ord per geregistreerd scenario.
+    """
+    where_sql, params = _where(date_from, date_to, rfx_activity, cnr_tour)
+    actual, win_from, win_until = _at("Actual"), _at("Win FROM"), _at("Win UNTIL")
+    names = scenario_names()
+    sc_flags = "".join(f",\n                   {scenario_sql(n, 0, _at, 'nm_short_unload')} AS sc_{n}" for n in names)
+    sc_any = "".join(f", bool_or(sc_{n}) AS sc_{n}" for n in names)
+
+    def sc_sum(kind: str) -> str:
+        return "".join(f", SUM(sc_{n}::INTEGER) AS jit_{n}_{kind}" for n in names)
+
+    sc_out = "".join(f", COALESCE(rd.jit_{n}_del, 0) AS jit_{n}_del, ro.jit_{n}_ord" for n in names)
+    sql = f"""
+        WITH o AS (
+            SELECT date_dos, cnr_tour, nm_short_unload,
+                   COALESCE({actual} >= {win_from} AND {actual} <= {win_until}, false) AS s1,
+                   COALESCE({actual} <= {win_until}, false) AS s2{sc_flags}
+            FROM {_source(root)}{where_sql}
+        ),
+        d AS (
+            SELECT date_dos, cnr_tour, bool_or(s1) AS s1, bool_or(s2) AS s2{sc_any}
+            FROM o WHERE date_dos IS NOT NULL AND cnr_tour IS NOT NULL AND nm_short_unload IS NOT NULL
+            GROUP BY date_dos, cnr_tour, nm_short_unload
+        ),
+        rd AS (
+            SELECT date_dos, cnr_tour, COUNT(*) AS deliveries,
+                   SUM(s1::INTEGER) AS jit_s1_del, SUM(s2::INTEGER) AS jit_s2_del{sc_sum("del")}
+            FROM d GROUP BY date_dos, cnr_tour
+        ),
+        ro AS (
+            SELECT date_dos, cnr_tour, COUNT(*) AS orders,
+                   SUM(s1::INTEGER) AS jit_s1_ord, SUM(s2::INTEGER) AS jit_s2_ord{sc_sum("ord")}
+            FROM o WHERE date_dos IS NOT NULL AND cnr_tour IS NOT NULL
+            GROUP BY date_dos, cnr_tour
+        )
+        SELECT ro.date_dos, ro.cnr_tour,
+               COALESCE(rd.deliveries, 0) AS deliveries,
+               COALESCE(rd.jit_s1_del, 0) AS jit_s1_del,
+               COALESCE(rd.jit_s2_del, 0) AS jit_s2_del,
+               ro.orders, ro.jit_s1_ord, ro.jit_s2_ord{sc_out}
+        FROM ro LEFT JOIN rd USING (date_dos, cnr_tour)
+        ORDER BY ro.date_dos, ro.cnr_tour
+    """
+    return _query(sql, params)
+
+
+# Levering voor de wachttijden: zoals api.waits_html (rijen zonder DurationA tellen niet mee;
+# een lege route is één levering, zoals in rollups.build_wait_day)
+_WAIT_KEYS = 'date_dos, cnr_tour, "RFX Activity", nm_short_unload'
+_WAIT_KEYS_PRESENT = (
+    'date_dos IS NOT NULL AND "RFX Activity" IS NOT NULL AND nm_short_unload IS NOT NULL AND DurationA IS NOT NULL'
+)
+
+
+def wait_deliveries(
+    root: Union[str, Path],
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    rfx_activity: Optional[str] = None,
+) -> pd.DataFrame:
+    """Gemiddelde DurationA per levering (date_dos, cnr_tour, RFX Activity, nm_short_unload)."""
+    where_sql, params = _where(date_from, date_to, rfx_activity, None)
+    sql = f"""
+        SELECT date_dos, cnr_tour, CAST("RFX Activity" AS INTEGER) AS "RFX Activity",
+               CAST(nm_short_unload AS VARCHAR) AS nm_short_unload, AVG(DurationA) AS avg_wait_min
+        FROM {_source(root)}{where_sql}{" AND" if where_sql else " WHERE"} {_WAIT_KEYS_PRESENT}
+        GROUP BY {_WAIT_KEYS}
+        ORDER BY {_WAIT_KEYS}
+    """
+    return _query(sql, params)
+
+
+def waits_by_activity(
+    root: Union[str, Path],
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+) -> pd.DataFrame:
+    """Per RFX Activity: leveringen, leverpunten, totale en gemiddelde wachttijd per levering."""
+    where_sql, params = _where(date_from, date_to, None, None)
+    sql = f"""
+        WITH d AS (
+            SELECT "RFX Activity", nm_short_unload, AVG(DurationA) AS avg_wait_min
+            FROM {_source(root)}{where_sql}{" AND" if where_sql else " WHERE"} {_WAIT_KEYS_PRESENT}
+            GROUP BY {_WAIT_KEYS}
+        )
+        SELECT CAST("RFX Activity" AS INTEGER) AS "RFX Activity",
+               COUNT(*) AS deliveries,
+               COUNT(DISTINCT nm_short_unload) AS leverpunten,
+               SUM(avg_wait_min) AS total_wait_min,
+               AVG(avg_wait_min) AS avg_wait_per_delivery
+        FROM d GROUP BY "RFX Activity" ORDER BY CAST("RFX Activity" AS INTEGER)
+    """
+    return _query(sql, params)
+
+
+def _channel_sql(column: str) -> str:
+    cases = " ".join(f"WHEN '{k}' THEN '{v}'" for k, v in CHANNEL_MAP.items())
+    return f"CASE CAST({column} AS VARCHAR) {cases} ELSE 'Overig' END"
+
+
+def jit_analysis_tables(
+    root: Union[str, Path],
+    tolerance_minutes: int = 0,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+) -> Mapping[str, pd.DataFrame]:
+    """
+    Zelfde tabellen als analysis_views.jit_analysis_tables, maar de order- en
+    leveringsaggregaties draaien als SQL op de Parquet dataset (ook de scenario's).
+    """
+    columns = json.loads((Path(root) / columnar.COLUMNS_FILE).read_text())
+    where_sql, params = _where(date_from, date_to, None, None)
+    tol = float(tolerance_minutes)
+    fm, um, am = (MINUTE_COLUMNS[c] for c in ("Win FROM", "Win UNTIL", "Actual"))
+    # Kolommen voor de wachttijdanalyse van late orders (enkel indien aanwezig)
+    wait_cols = [c for c in ("DurationP", "duration_A") if c in columns]
+    extra = "".join(f", {_q(c)}" for c in wait_cols)
+    # Scenario's: minutenkolommen die ze gebruiken en één vlag sc_<naam> per order / levering
+    names = scenario_names()
+    extra += "".join(f", {MINUTE_COLUMNS[c]}" for c in scenario_time_columns(names))
+    sc_flags = "".join(
+        f",\n                   (d IS NOT NULL AND {scenario_sql(n, tol, MINUTE_COLUMNS.get, 'nm_short_unload')}) AS sc_{n}"
+        for n in names
+    )
+    sc_any = "".join(f", bool_or(sc_{n}) AS sc_{n}" for n in names)
+    sc_deliv = "".join(f", SUM(sc_{n}::INTEGER) AS leveringen_jit_{n}" for n in names)
+
+    cur = _cursor()
+    try:
+        cur.execute(
+            f"""
+            CREATE OR REPLACE TEMP TABLE jit_orders AS
+            WITH o AS (
+                SELECT TRY_CAST(date_dos AS DATE) AS d, cnr_tour, cnr_cust, nm_short_unload,
+                       "Win FROM" AS wf, "Win UNTIL" AS wu,
+                       TRY_CAST("RFX Activity" AS INTEGER) AS rfx,
+                       {fm} AS fm, {um} AS um, {am} AS am{extra}
+                FROM {_source(root)}{where_sql}
+            )
+            SELECT *,
+                   COALESCE(d IS NOT NULL AND fm IS NOT NULL AND um IS NOT NULL AND am IS NOT NULL
+                            AND am >= fm - {tol} AND am <= um + {tol}, false) AS s1,
+                   COALESCE(d IS NOT NULL AND fm IS NOT NULL AND um IS NOT NULL AND am IS NOT NULL
+                            AND am <= um + {tol}, false) AS s2{sc_flags}
+            FROM o WHERE rfx IN (4, 5)
+            """,
+            params,
+        )
+        cur.execute(
+            f"""
+            CREATE OR REPLACE TEMP TABLE jit_deliveries AS
+            SELECT d, cnr_tour, cnr_cust, nm_short_unload, wf, wu,
+                   bool_or(s1) AS s1, bool_or(s2) AS s2{sc_any},
+                   MIN(rfx) AS rfx_activity,
+                   {_channel_sql("cnr_cust")} AS kanaal
+            FROM jit_orders
+            WHERE d IS NOT NULL AND cnr_tour IS NOT NULL AND cnr_cust IS NOT NULL
+              AND nm_short_unload IS NOT NULL AND wf IS NOT NULL AND wu IS NOT NULL
+            GROUP BY d, cnr_tour, cnr_cust, nm_short_unload, wf, wu
+            """
+        )
+
+        def df(sql: str) -> pd.DataFrame:
+            return cur.execute(sql).df()
+
+        sc_totals = "".join(f", (SELECT COALESCE(SUM(sc_{n}::INTEGER), 0) FROM jit_deliveries)" for n in names)
+        totals_row = cur.execute(
+            f"""
+            SELECT (SELECT COUNT(*) FROM jit_orders), (SELECT COALESCE(SUM(s1::INTEGER), 0) FROM jit_orders),
+                   (SELECT COALESCE(SUM(s2::INTEGER), 0) FROM jit_orders), (SELECT COUNT(*) FROM jit_deliveries),
+                   (SELECT COALESCE(SUM(s1::INTEGER), 0) FROM jit_deliveries),
+                   (SELECT COALESCE(SUM(s2::INTEGER), 0) FROM jit_deliveries){sc_totals}
+            """
+        ).fetchone()
+        totals = dict(zip(
+            ["total_orders", "jit_orders_s1", "jit_orders_s2", "total_deliveries", "jit_deliv_s1", "jit_deliv_s2",
+             *(f"jit_deliv_{n}" for n in names)],
+            (int(v) for v in totals_row),
+        ))
+        if totals["total_orders"] == 0 or totals["total_deliveries"] == 0:
+            return _empty_tables()
+
+        deliv_counts = (
+            "COUNT(*) AS leveringen_totaal, SUM(s1::INTEGER) AS leveringen_jit_S1, "
+            f"SUM(s2::INTEGER) AS leveringen_jit_S2{sc_deliv}"
+        )
+        daily_deliv = df(f"SELECT d AS date_dos, {deliv_counts} FROM jit_deliveries GROUP BY d ORDER BY d")
+        daily_orders = df(
+            "SELECT d AS date_dos, COUNT(*) AS orders_totaal, SUM(s1::INTEGER) AS orders_jit_S1, "
+            "SUM(s2::INTEGER) AS orders_jit_S2 FROM jit_orders WHERE d IS NOT NULL GROUP BY d ORDER BY d"
+        )
+        by_rfx = df(f"SELECT rfx_activity, {deliv_counts} FROM jit_deliveries GROUP BY 1 ORDER BY 1")
+        by_channel = df(f"SELECT kanaal, {deliv_counts} FROM jit_deliveries GROUP BY 1 ORDER BY 1")
+        routes = df(
+            f"SELECT d AS date_dos, cnr_tour, COUNT(*) AS leveringen_totaal, SUM(s2::INTEGER) AS leveringen_jit_S2"
+            f"{sc_deliv} FROM jit_deliveries GROUP BY 1, 2 ORDER BY 1, 2"
+        )
+        impact = df(
+            "SELECT CAST(nm_short_unload AS VARCHAR) AS nm_short_unload, COUNT(*) AS leveringen_totaal, "
+            "SUM((NOT s2)::INTEGER) AS non_jit_leveringen FROM jit_deliveries GROUP BY 1 ORDER BY 1"
+        )
+        # Enkel de late orders (Scenario 2) gaan naar pandas voor de wachttijd-buckets
+        late_cols = ", ".join(["CAST(nm_short_unload AS VARCHAR) AS nm_short_unload", *(_q(c) for c in wait_cols)])
+        late = df(f"SELECT false AS order_jit_s2, {late_cols} FROM jit_orders WHERE NOT s2")
+    finally:
+        cur.close()
+
+    for frame in (daily_deliv, daily_orders, routes):
+        frame["date_dos"] = pd.to_datetime(frame["date_dos"]).dt.date
+    counts = {
+        "daily_deliv": daily_deliv, "daily_orders": daily_orders, "by_rfx": by_rfx, "by_channel": by_channel,
+        "routes": routes, "impact": impact, "waits": _waiting_time_rootcause(late),
+    }
+    return _report_tables(totals, counts, names)
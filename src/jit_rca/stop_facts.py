@@ -0,0 +1,282 @@
+# ================================================================
+# jit_rca/stop_facts.py – gematerialiseerde stop-level tabel (py3.9)
+#
+# Eén rij per levering = (date_dos, cnr_tour, nm_short_unload), opgebouwd
+# uit `orders` na elke ingest (enkel de gewijzigde dagen). De outside-JIT,
+# RCA en transport pagina's lezen deze tabel i.p.v. orders te groeperen.
+# Orders zonder route of leverpunt krijgen ook een rij (is_delivery = 0),
+# zoals in jit_engine.evaluate: ze tellen mee als order, niet als levering.
+#
+# Tijden als absolute minuten (day_num * 1440 + minuten sinds middernacht):
+#   <tijd>_first_at = eerste niet-lege waarde (volgorde van de orderregels)
+#   <tijd>_min_at   = vroegste waarde
+# ================================================================
+from __future__ import annotations
+
+import sqlite3
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .analysis_views import CHANNEL_MAP
+from .ingest import DAY_COLUMN, MINUTE_COLUMNS, ORDERS_TABLE, _q, _records, _table_columns, add_time_minutes
+from .jit_engine import STOP_KEY, order_flags
+from .shards import read_shards
+
+STOPS_TABLE = "stops"
+
+# Tijdkolom in orders -> prefix in stops
+STOP_TIMES = {
+    "Win FROM": "win_from",
+    "Win UNTIL": "win_until",
+    "Planned": "planned",
+    "Actual": "actual",
+    "P_Depart": "p_depart",
+    "A_Depart": "a_depart",
+}
+
+STOP_COLUMNS = {
+    "date_dos": "TEXT",
+    "cnr_tour": "INTEGER",
+    "nm_short_unload": "TEXT",
+    "rfx_activity": "INTEGER",
+    "kanaal": "TEXT",                     # kanaal van de eerste klant (CHANNEL_MAP)
+    "day_num": "INTEGER",
+    "orders": "INTEGER",
+    "is_delivery": "INTEGER",             # 0 = onvolledige sleutel (geen route of leverpunt)
+    "orders_jit_s1": "INTEGER",
+    "orders_jit_s2": "INTEGER",
+    **{f"{p}_{kind}_at": "INTEGER" for p in STOP_TIMES.values() for kind in ("first", "min")},
+    "duration_p": "REAL",                 # DurationP (eerste niet-lege)
+    "duration_a": "REAL",                 # DurationA (eerste niet-lege)
+    "late_min": "REAL",                   # max(0, actual_min_at − win_until_first_at)
+    "outside_s2": "INTEGER",              # Actual > Win UNTIL, of een van beide ontbreekt
+    "jit_s1": "INTEGER",                  # minstens één order binnen [Win FROM, Win UNTIL]
+    "jit_s2": "INTEGER",                  # minstens één order met Actual ≤ Win UNTIL
+    "planned_pos": "INTEGER",             # positie tussen de leveringen van de route volgens planned_min_at
+    "actual_pos": "INTEGER",              # idem volgens actual_min_at
+    "route_dep_delay_min": "REAL",        # A_Depart − P_Depart van de route (eerste niet-lege)
+}
+
+STOPS_SCHEMA_SQL = (
+    f"CREATE TABLE IF NOT EXISTS {STOPS_TABLE} ("
+    + ", ".join(f"{_q(c)} {t}" for c, t in STOP_COLUMNS.items())
+    + f", PRIMARY KEY ({', '.join(STOP_KEY)}))"
+)
+STOPS_INDEX_SQL = f"CREATE INDEX IF NOT EXISTS idx_stops_activity_date ON {STOPS_TABLE} (rfx_activity, date_dos)"
+
+# Aantal dagen per herberekening (begrenst het geheugengebruik bij een volledige herbouw)
+REFRESH_DAYS = 31
+
+# Kolommen uit orders die nodig zijn
+_ORDER_COLUMNS = [
+    "date_dos", "cnr_tour", "nm_short_unload", "cnr_cust", "RFX Activity",
+    "DurationP", "DurationA", DAY_COLUMN, *MINUTE_COLUMNS.values(),
+]
+
+
+def init_stops(conn: sqlite3.Connection) -> None:
+    conn.execute(STOPS_SCHEMA_SQL)
+    conn.execute(STOPS_INDEX_SQL)
+
+
+def stops_outdated(conn: sqlite3.Connection) -> bool:
+    """True als de stops tabel ontbreekt of een ander schema heeft (volledige herbouw nodig)."""
+    return _table_columns(conn, STOPS_TABLE) != list(STOP_COLUMNS)
+
+
+def build_stops(orders: pd.DataFrame) -> pd.DataFrame:
+    """
+    Stop-level rijen uit orderregels (met minutenkolommen en day_num).
+    De volgorde van `orders` bepaalt wat 'eerste' is.
+    """
+    if orders.empty:
+        return pd.DataFrame(columns=list(STOP_COLUMNS))
+
+    day = orders[DAY_COLUMN].astype(float) * 1440.0
+    tmp = orders[STOP_KEY].copy()
+    tmp["rfx_activity"] = orders["RFX Activity"]
+    tmp[DAY_COLUMN] = orders[DAY_COLUMN]
+    tmp["cnr_cust"] = orders["cnr_cust"]
+    tmp["duration_p"] = pd.to_numeric(orders["DurationP"], errors="coerce")
+    tmp["duration_a"] = pd.to_numeric(orders["DurationA"], errors="coerce")
+    for col, prefix in STOP_TIMES.items():
+        tmp[f"{prefix}_at"] = day + orders[MINUTE_COLUMNS[col]].astype(float)
+    tmp["s1"], tmp["s2"] = order_flags(orders)
+
+    aggs = {
+        "rfx_activity": ("rfx_activity", "first"),
+        "cnr_cust": ("cnr_cust", "first"),
+        DAY_COLUMN: (DAY_COLUMN, "first"),
+        "orders": ("cnr_cust", "count"),
+        "orders_jit_s1": ("s1", "sum"),
+        "orders_jit_s2": ("s2", "sum"),
+    }
+    for prefix in STOP_TIMES.values():
+        aggs[f"{prefix}_first_at"] = (f"{prefix}_at", "first")
+        aggs[f"{prefix}_min_at"] = (f"{prefix}_at", "min")
+    aggs.update({
+        "duration_p": ("duration_p", "first"),
+        "duration_a": ("duration_a", "first"),
+        "jit_s1": ("s1", "any"),
+        "jit_s2": ("s2", "any"),
+    })
+    stops = tmp.groupby(STOP_KEY, as_index=False, sort=True, dropna=False).agg(**aggs)
+    stops["is_delivery"] = stops[STOP_KEY].notna().all(axis=1)
+
+    stops["kanaal"] = stops["cnr_cust"].astype(object).map(CHANNEL_MAP).fillna("Overig")
+
+    has_both = stops["actual_min_at"].notna() & stops["win_until_first_at"].notna()
+    stops["late_min"] = (stops["actual_min_at"] - stops["win_until_first_at"]).clip(lower=0.0)
+    stops["outside_s2"] = ~has_both | (stops["actual_min_at"] > stops["win_until_first_at"])
+
+    route = ["date_dos", "cnr_tour"]
+    for pos, at in (("planned_pos", "planned_min_at"), ("actual_pos", "actual_min_at")):
+        ordered = stops[stops["is_delivery"]].sort_values([at, "nm_short_unload"], kind="mergesort")
+        stops[pos] = ordered.groupby(route, sort=False).cumcount().reindex(stops.index) + 1
+
+    # Vertrekvertraging per route: eerste niet-lege P_Depart / A_Depart van de route
+    dep = tmp.groupby(route, sort=False)[["p_depart_at", "a_depart_at"]].first()
+    dep = (dep["a_depart_at"] - dep["p_depart_at"]).rename("route_dep_delay_min")
+    stops = stops.merge(dep.reset_index(), on=route, how="left")
+
+    for col in ("is_delivery", "outside_s2", "jit_s1", "jit_s2"):
+        stops[col] = stops[col].astype(int)
+    return stops[list(STOP_COLUMNS)]
+
+
+def _read_orders(
+    conn: sqlite3.Connection,
+    days: Sequence[Optional[str]],
+    columns: Sequence[str] = _ORDER_COLUMNS,
+) -> pd.DataFrame:
+    """Orderregels van `days` (jit.sqlite + overlappende maandshards), in de volgorde van de orderregels."""
+    marks = ", ".join("?" for _ in days)
+
+    def read(source: sqlite3.Connection) -> pd.DataFrame:
+        available = _table_columns(source, ORDERS_TABLE)
+        cols = [c for c in columns if c in available]
+        missing_minutes = [c for c in MINUTE_COLUMNS.values() if c not in available]
+        if missing_minutes or DAY_COLUMN not in available:
+            # Oude tabel zonder minutenkolommen: uit de tekstkolommen afleiden
+            cols += [c for c in MINUTE_COLUMNS if c in available]
+        select = ", ".join(_q(c) for c in dict.fromkeys(cols))
+        df = pd.read_sql_query(
+            f"SELECT {select} FROM {_q(ORDERS_TABLE)} WHERE date_dos IN ({marks}) ORDER BY rowid",
+            source,
+            params=list(days),
+        )
+        if missing_minutes or DAY_COLUMN not in available:
+            df = add_time_minutes(df)
+        return df
+
+    # Oude maanden staan in shards (zie jit_rca.shards)
+    frames = [*read_shards(conn, read, min(days), max(days)), read(conn)]
+    frames = [f for f in frames if not f.empty] or frames[-1:]
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    for c in columns:
+        if c not in df.columns:
+            df[c] = np.nan
+    return df
+
+
+def _order_days(conn: sqlite3.Connection) -> List[str]:
+    """Alle dagen met orders (jit.sqlite + live maandshards), gesorteerd."""
+    def distinct_days(source: sqlite3.Connection) -> pd.DataFrame:
+        return pd.read_sql_query(
+            f"SELECT DISTINCT date_dos FROM {_q(ORDERS_TABLE)} WHERE date_dos IS NOT NULL", source
+        )
+
+    frames = [*read_shards(conn, distinct_days), distinct_days(conn)]
+    return sorted({d for f in frames for d in f["date_dos"]})
+
+
+def refresh_stops(conn: sqlite3.Connection, dates: Optional[Iterable[str]] = None) -> int:
+    """
+    Herbereken de stops van `dates` (None = volledige herbouw) in één transactie;
+    lezers zien dus de oude of de nieuwe versie, nooit een mengvorm.
+    Retourneert het aantal geschreven stops.
+    """
+    if stops_outdated(conn):
+        with conn:
+            conn.execute(f"DROP TABLE IF EXISTS {STOPS_TABLE}")
+        dates = None
+    init_stops(conn)
+    if not _table_columns(conn, ORDERS_TABLE):
+        return 0
+    if dates is None:
+        days = _order_days(conn)
+    else:
+        days = sorted({d for d in dates if d is not None})
+
+    cols = ", ".join(_q(c) for c in STOP_COLUMNS)
+    marks = ", ".join("?" for _ in STOP_COLUMNS)
+    n = 0
+    with conn:
+        if dates is None:
+            conn.execute(f"DELETE FROM {STOPS_TABLE}")
+        for start in range(0, len(days), REFRESH_DAYS):
+            batch = days[start:start + REFRESH_DAYS]
+            if dates is not None:
+                conn.execute(
+                    f"DELETE FROM {STOPS_TABLE} WHERE date_dos IN ({', '.join('?' for _ in batch)})", batch
+                )
+            stops = build_stops(_read_orders(conn, batch))
+            conn.executemany(f"INSERT INTO {STOPS_TABLE} ({cols}) VALUES ({marks})", _records(stops))
+            n += len(stops)
+    return n
+
+
+def _where(
+    date_from: Optional[str],
+    date_to: Optional[str],
+    rfx_activity: Optional[str],
+    cnr_tour: Optional[str],
+) -> Tuple[str, list]:
+    where = []
+    params: list = []
+    if date_from and date_from == date_to:
+        where.append("date_dos = ?")
+        params.append(date_from)
+    else:
+        if date_from:
+            where.append("date_dos >= ?")
+            params.append(date_from)
+        if date_to:
+            where.append("date_dos <= ?")
+            params.append(date_to)
+    if rfx_activity:
+        where.append("rfx_activity = ?")
+        params.append(rfx_activity)
+    if cnr_tour:
+        where.append("cnr_tour = ?")
+        params.append(str(cnr_tour))
+    return (" WHERE " + " AND ".join(where) if where else ""), params
+
+
+def read_stops(
+    conn: sqlite3.Connection,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    rfx_activity: Optional[str] = None,
+    cnr_tour: Optional[str] = None,
+    deliveries_only: bool = False,
+) -> pd.DataFrame:
+    """
+    Stops volgens dezelfde filters als load_orders (via de primaire sleutel / index).
+    deliveries_only: enkel stops met een volledige sleutel (is_delivery).
+    """
+    where_sql, params = _where(date_from, date_to, rfx_activity, cnr_tour)
+    if deliveries_only:
+        where_sql += (" AND " if where_sql else " WHERE ") + "is_delivery = 1"
+    df = pd.read_sql_query(
+        f"SELECT * FROM {STOPS_TABLE}{where_sql} ORDER BY {', '.join(STOP_KEY)}", conn, params=params
+    )
+    df["cnr_tour"] = df["cnr_tour"].astype("Int64")
+    df["rfx_activity"] = df["rfx_activity"].astype("Int16")
+    for col in ("is_delivery", "outside_s2", "jit_s1", "jit_s2"):
+        df[col] = df[col].astype(bool)
+    for col in ("planned_pos", "actual_pos"):
+        df[col] = df[col].astype("Int64")
+    return df
@@ -0,0 +1,94 @@
+# ================================================================
+# jit_rca/timekernel.py – vectoriële HH:MM tijdkernel (py3.9)
+#
+# parse_minutes(): een volledige kolom "H:MM" / "HH:MM" / "H:MM:SS" /
+# "HH:MM:SS" -> gehele minuten sinds middernacht. De tekst wordt als
+# numpy unicode-array bekeken (één uint32 per teken), zodat cijfers,
+# dubbelpunten en lengtes per positie in één keer voor alle rijen
+# gecontroleerd worden; geen .apply of pd.to_datetime per waarde.
+# Andere notaties (bv. "2025-03-04 06:15:00") gaan naar pd.to_datetime.
+#
+# format_hhmm(): minuten -> "HH:MM", idem in bulk.
+# ================================================================
+from __future__ import annotations
+
+from typing import Any, Iterable, Union
+
+import numpy as np
+import pandas as pd
+
+__all__ = ["parse_minutes", "format_hhmm"]
+
+_ZERO = ord("0")
+_COLON = ord(":")
+
+
+# Langste notatie "HH:MM:SS" + één teken: langere tekst valt zo nooit in het snelle pad
+_WIDTH = 9
+
+
+def _fast_minutes(text: np.ndarray) -> np.ndarray:
+    """Minuten voor de rijen in exacte (H)H:MM[:SS] notatie, anders NaN."""
+    out = np.full(len(text), np.nan)
+    width = text.dtype.itemsize // 4
+    if width < 4:
+        return out
+    codes = text.view(np.uint32).reshape(len(text), width)[:, :_WIDTH]
+    if codes.shape[1] < _WIDTH:
+        codes = np.pad(codes, ((0, 0), (0, _WIDTH - codes.shape[1])))
+    length = np.count_nonzero(codes, axis=1)
+    d = codes.astype(np.int32) - _ZERO
+    digit = (d >= 0) & (d <= 9)
+    colon = codes == _COLON
+
+    # Uur met één cijfer ("6:05[:00]") of twee cijfers ("06:05[:00]"); c = positie van ":"
+    for c in (1, 2):
+        hours = d[:, 0] * 10 + d[:, 1] if c == 2 else d[:, 0]
+        minutes = d[:, c + 1] * 10 + d[:, c + 2]
+        seconds = d[:, c + 4] * 10 + d[:, c + 5]
+        ok = colon[:, c] & digit[:, :c].all(axis=1) & digit[:, c + 1] & digit[:, c + 2]
+        short = length == c + 3
+        long_ = (length == c + 6) & colon[:, c + 3] & digit[:, c + 4] & digit[:, c + 5] & (seconds < 60)
+        ok &= (short | long_) & (hours < 24) & (minutes < 60)
+        out[ok] = hours[ok] * 60 + minutes[ok]
+    return out
+
+
+def parse_minutes(values: Union[pd.Series, Iterable[Any]], fallback: bool = True) -> np.ndarray:
+    """
+    Minuten sinds middernacht (float, geheel; NaN = ontbrekend/ongeldig).
+    Seconden worden afgekapt, zoals de HH:MM weergave. fallback=False: enkel de
+    (H)H:MM[:SS] notatie, de rest wordt NaN.
+    """
+    s = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    out = np.full(len(s), np.nan)
+    present = np.flatnonzero(s.notna().to_numpy())
+    if present.size == 0:
+        return out
+
+    raw = s.to_numpy(dtype=object)[present]
+    out[present] = _fast_minutes(raw.astype(f"U{_WIDTH}"))
+
+    miss = np.isnan(out[present])
+    rest = present[miss]
+    if rest.size:
+        # Zelfde notatie met spaties rond de tijd
+        out[rest] = _fast_minutes(np.char.strip(np.asarray(raw[miss], dtype=str)))
+        rest = rest[np.isnan(out[rest])]
+    if fallback and rest.size:
+        t = pd.to_datetime(pd.Series(s.to_numpy(dtype=object)[rest]), errors="coerce")
+        out[rest] = (t.dt.hour * 60 + t.dt.minute).to_numpy(dtype=float, na_value=np.nan)
+    return out
+
+
+def format_hhmm(minutes: Union[pd.Series, np.ndarray, Iterable[float]], missing: Any = "") -> np.ndarray:
+    """Minuten (ook absolute minuten: modulo 24u) -> object-array "HH:MM"; NaN -> `missing`."""
+    m = np.asarray(minutes, dtype=float)
+    ok = ~np.isnan(m)
+    v = (np.floor(np.where(ok, m, 0.0)) % 1440).astype(np.int64)
+    h, mm = np.divmod(v, 60)
+    codes = np.stack([h // 10, h % 10, np.full_like(h, _COLON - _ZERO), mm // 10, mm % 10], axis=1) + _ZERO
+    text = np.ascontiguousarray(codes, dtype=np.uint32).view("<U5").ravel()
+    out = text.astype(object)
+    out[~ok] = missing
+    return out